@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
-import pandas as pd
-import os
+import sys
+
+sys.path.insert(0, 'user_data/scripts')
+
+from data_catalog import format_entry, refresh  # noqa: E402
 
 data_dir = 'user_data/data/okx/futures'
-files = [f for f in os.listdir(data_dir) if '5m' in f and 'feather' in f]
+# Served from the catalog sidecars - candle files are only read when they changed
+catalog = refresh(data_dir)
+files = [e for e in catalog.values() if e.get('timeframe') == '5m' and e.get('candle_type') == 'futures']
 print(f'Found {len(files)} 5m data files')
 
-for f in files[:3]:
-    filepath = os.path.join(data_dir, f)
-    df = pd.read_feather(filepath)
-    print(f'{f}: {df["date"].min()} to {df["date"].max()}, {len(df)} rows')
+for entry in files:
+    print(format_entry(entry))
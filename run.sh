@@ -67,6 +67,12 @@ case "${1:-help}" in
         ;;
     status)
         docker exec freqtrade-winter curl -s http://localhost:8080/api/v1/status 2>/dev/null || docker exec freqtrade-leveraged curl -s http://localhost:8080/api/v1/status 2>/dev/null || echo "No running containers found"
+        # 策略方法耗时/异常统计 (需在配置中开启 "strategy_profile": true)
+        if ls user_data/logs/strategy_profile_*.json >/dev/null 2>&1; then
+            echo ""
+            echo -e "${GREEN}⏱  策略方法耗时:${NC}"
+            python3 user_data/scripts/strategy_profile.py --dir user_data/logs --top 8
+        fi
         ;;
     profit)
         docker exec freqtrade-leveraged curl -s http://localhost:8080/api/v1/profit
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Backtest a matrix of strategies x timeranges x configs in one process pool.
+
+The parent reads every candle window the jobs need once (data_loader) into
+shared memory. Workers serve freqtrade's feather reads from those segments
+instead of re-parsing the files, so the trimming, validation and cleaning
+of the candles is still freqtrade's own. Reads outside the shared windows
+(informative pairs, detail timeframes) fall back to the files; each result
+row counts both kinds of reads. Each worker creates the exchange once per
+config. Results are printed as jobs finish and collected into one summary
+file.
+Usage: python backtest_matrix.py --timeranges 20240101-20240201 ... [--strategies ...] [--configs ...] [--jobs N]
+"""
+import argparse
+import ast
+import inspect
+import json
+import logging
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from data_catalog import parse_filename, timeframe_seconds  # noqa: E402
+from data_loader import load_table, pair_path  # noqa: E402
+
+USER_DATA = Path(__file__).resolve().parents[1]
+CONFIG_DIR = USER_DATA / 'config'
+STRATEGY_DIR = USER_DATA / 'strategies'
+RESULTS_DIR = USER_DATA / 'backtest_results'
+# Extra candle types backtesting reads for futures pairs
+FUTURES_EXTRA = ('mark', 'funding_rate')
+DAY_NS = 86400 * 10 ** 9
+
+# Worker state: resolved file path -> (shm, dates, columns, names, lo, hi)
+_segments: Dict[str, tuple] = {}
+# Worker state: config path -> exchange
+_exchanges: Dict[str, object] = {}
+# Worker state: candle reads served from shared memory / left to the files
+_reads = {'shared': 0, 'file': 0}
+# Parameters of the freqtrade read the workers replace
+LOADER_PARAMS = ('self', 'filename', 'timeframe', 'timerange')
+
+
+def cpu_limit() -> int:
+    """
+    CPUs this container may use: the cgroup quota (docker `cpus:`) if set,
+    otherwise the affinity mask.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    quota = None
+    try:
+        value, period = Path('/sys/fs/cgroup/cpu.max').read_text().split()
+        if value != 'max':
+            quota = int(value) / int(period)
+    except (OSError, ValueError):
+        try:
+            value = int(Path('/sys/fs/cgroup/cpu/cpu.cfs_quota_us').read_text())
+            period = int(Path('/sys/fs/cgroup/cpu/cpu.cfs_period_us').read_text())
+            if value > 0:
+                quota = value / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def strategy_attrs(name: str) -> dict:
+    """
+    timeframe / startup_candle_count of a strategy class, read from its
+    source so the parent never imports strategies.
+    """
+    tree = ast.parse((STRATEGY_DIR / f'{name}.py').read_text())
+    attrs = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == name:
+            for stmt in node.body:
+                if isinstance(stmt, ast.Assign) and isinstance(stmt.value, ast.Constant):
+                    for target in stmt.targets:
+                        if isinstance(target, ast.Name) and target.id in ('timeframe', 'startup_candle_count'):
+                            attrs[target.id] = stmt.value.value
+    return attrs
+
+
+def resolve_config(value: str) -> Path:
+    path = Path(value)
+    if not path.is_file():
+        path = CONFIG_DIR / (value if value.endswith('.json') else f'{value}.json')
+    return path.resolve()
+
+
+def read_config(path: Path) -> dict:
+    """
+    The config at `path` as freqtrade reads it (comments, add_config_files).
+    """
+    from freqtrade.configuration.load_config import load_from_files
+
+    return load_from_files([str(path)])
+
+
+def config_pairs(config: dict) -> List[str]:
+    pairs = list(config.get('exchange', {}).get('pair_whitelist', []))
+    for pairlist in config.get('pairlists', []):
+        pairs += [p for p in pairlist.get('config_pairs', []) if p not in pairs]
+    return pairs
+
+
+def config_datadir(config: dict) -> Path:
+    datadir = Path(config['datadir']) if config.get('datadir') else USER_DATA / 'data' / config['exchange']['name']
+    if config.get('trading_mode') == 'futures':
+        datadir = datadir / 'futures'
+    return datadir
+
+
+def _ns(day: str) -> int:
+    return int(datetime.strptime(day, '%Y%m%d').replace(tzinfo=timezone.utc).timestamp()) * 10 ** 9
+
+
+def _day(ns: int) -> str:
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc).strftime('%Y%m%d')
+
+
+def plan_windows(jobs: List[Tuple[str, str, Path]]) -> Dict[Path, Tuple[Optional[int], Optional[int]]]:
+    """
+    Date window (ns, None = open) of every file the jobs read: the union of
+    their timeranges, widened by the startup candles and one candle on each
+    side (freqtrade's read filter), rounded out to whole days.
+    """
+    windows: Dict[Path, list] = {}
+
+    def widen(path: Path, lo: Optional[int], hi: Optional[int]) -> None:
+        if not path.is_file():
+            return
+        if path not in windows:
+            windows[path] = [lo, hi]
+            return
+        cur = windows[path]
+        cur[0] = None if lo is None or cur[0] is None else min(cur[0], lo)
+        cur[1] = None if hi is None or cur[1] is None else max(cur[1], hi)
+
+    configs = {}
+    for strategy, timerange, config_path in jobs:
+        if config_path not in configs:
+            configs[config_path] = read_config(config_path)
+        config = configs[config_path]
+        attrs = strategy_attrs(strategy)
+        timeframe = config.get('timeframe') or attrs.get('timeframe', '5m')
+        startup = config.get('startup_candle_count') or attrs.get('startup_candle_count', 0)
+        step = timeframe_seconds(timeframe) * 10 ** 9
+        start, _, stop = timerange.partition('-')
+        lo = _ns(start) - (startup + 1) * step if start else None
+        hi = _ns(stop) + step if stop else None
+        lo = None if lo is None else lo - lo % DAY_NS
+        hi = None if hi is None else hi - hi % DAY_NS + DAY_NS
+        datadir = config_datadir(config)
+        for pair in config_pairs(config):
+            widen(pair_path(datadir, pair, timeframe), lo, hi)
+            if config.get('trading_mode') == 'futures':
+                symbol = pair.replace('/', '_').replace(':', '_')
+                for path in datadir.glob(f'{symbol}-*.feather'):
+                    if (parse_filename(path) or {}).get('candle_type') in FUTURES_EXTRA:
+                        widen(path, lo, hi)
+    return {path: tuple(window) for path, window in windows.items()}
+
+
+def share_candles(windows: Dict[Path, tuple]) -> Tuple[List[SharedMemory], dict]:
+    """
+    Copy each window into its own shared memory segment: one int64 date
+    column followed by the float64 value columns, column-major.
+    Returns the segments (owned by the caller) and the manifest for workers.
+    """
+    segments, manifest = [], {}
+    for path, (lo, hi) in windows.items():
+        timerange = f'{_day(lo) if lo is not None else ""}-{_day(hi) if hi is not None else ""}'
+        table = load_table(path, timerange)
+        names = [n for n in table.column_names if n != 'date']
+        rows = table.num_rows
+        shm = SharedMemory(create=True, size=max(1, rows * (len(names) + 1) * 8))
+        block = np.ndarray((len(names) + 1, rows), dtype=np.float64, buffer=shm.buf)
+        block.view(np.int64)[0] = table.column('date').cast('int64').to_numpy()
+        for i, name in enumerate(names, 1):
+            block[i] = table.column(name).to_numpy()
+        segments.append(shm)
+        manifest[str(path.resolve())] = (shm.name, rows, names, lo, hi)
+    return segments, manifest
+
+
+def _shared_frame(filename: Path, timeframe: str, timerange) -> Optional[pd.DataFrame]:
+    """
+    The rows freqtrade's own read would return (timerange widened by one
+    candle), or None if the shared window does not cover the request.
+    """
+    segment = _segments.get(str(Path(filename).resolve()))
+    if segment is None:
+        return None
+    _, dates, values, names, lo, hi = segment
+    widen = timeframe_seconds(timeframe) * 10 ** 9
+    start = timerange.startts * 10 ** 9 - widen if timerange and timerange.starttype == 'date' else None
+    stop = timerange.stopts * 10 ** 9 + widen if timerange and timerange.stoptype == 'date' else None
+    if (lo is not None and (start is None or start < lo)) or (hi is not None and (stop is None or stop > hi)):
+        return None
+    i0 = 0 if start is None else int(np.searchsorted(dates, start, side='left'))
+    i1 = len(dates) if stop is None else int(np.searchsorted(dates, stop, side='right'))
+    if i1 <= i0:
+        # freqtrade then reloads the whole file - let it
+        return None
+    frame = {'date': pd.to_datetime(dates[i0:i1], utc=True)}
+    frame.update({name: values[i, i0:i1].copy() for i, name in enumerate(names)})
+    return pd.DataFrame(frame)
+
+
+def checked_loader() -> tuple:
+    """
+    ArrowDataHandler and its _load_ohlcv_dataframe, once the method's
+    signature is checked against the replacement the workers install: a
+    freqtrade that renamed or changed it fails here rather than silently
+    reading every candle from disk.
+    """
+    from freqtrade.data.history.datahandlers.arrowdatahandler import ArrowDataHandler
+
+    original = getattr(ArrowDataHandler, '_load_ohlcv_dataframe', None)
+    params = tuple(inspect.signature(original).parameters) if callable(original) else None
+    if params != LOADER_PARAMS:
+        raise RuntimeError(f'ArrowDataHandler._load_ohlcv_dataframe{params or " is missing"}: shared candles '
+                           f'need the signature {LOADER_PARAMS} - check this freqtrade version')
+    return ArrowDataHandler, original
+
+
+def _init_worker(manifest: dict) -> None:
+    ArrowDataHandler, original = checked_loader()
+
+    for key, (name, rows, names, lo, hi) in manifest.items():
+        shm = SharedMemory(name=name)
+        block = np.ndarray((len(names) + 1, rows), dtype=np.float64, buffer=shm.buf)
+        _segments[key] = (shm, block.view(np.int64)[0], block[1:], names, lo, hi)
+
+    def load_ohlcv_dataframe(self, filename, timeframe, timerange):
+        frame = _shared_frame(filename, timeframe, timerange)
+        _reads['file' if frame is None else 'shared'] += 1
+        return frame if frame is not None else original(self, filename, timeframe, timerange)
+
+    ArrowDataHandler._load_ohlcv_dataframe = load_ohlcv_dataframe
+    logging.basicConfig(level=logging.WARNING)
+
+
+def run_job(strategy: str, timerange: str, config_path: str) -> dict:
+    """
+    Backtest one strategy over one timerange; returns a summary row.
+    """
+    from freqtrade.configuration import Configuration
+    from freqtrade.enums import RunMode
+    from freqtrade.optimize.optimize_reports import generate_backtest_stats
+    from freqtrade.optimize.backtesting import Backtesting
+    from freqtrade.resolvers import ExchangeResolver
+
+    row = {'strategy': strategy, 'timerange': timerange, 'config': Path(config_path).name}
+    started = time.monotonic()
+    reads = dict(_reads)
+    try:
+        config = Configuration({
+            'config': [config_path],
+            'user_data_dir': str(USER_DATA),
+            'strategy': strategy,
+            'timerange': timerange,
+            'export': 'none',
+        }, RunMode.BACKTEST).get_config()
+        exchange = _exchanges.get(config_path)
+        if exchange is None:
+            exchange = ExchangeResolver.load_exchange(config, load_leverage_tiers=True)
+            _exchanges[config_path] = exchange
+        backtesting = Backtesting(config, exchange=exchange)
+        data, bt_timerange = backtesting.load_bt_data()
+        min_date, max_date = backtesting.backtest_one_strategy(backtesting.strategylist[0], data, bt_timerange)
+        stats = generate_backtest_stats(data, backtesting.all_bt_content, min_date=min_date, max_date=max_date)
+        result = stats['strategy'][strategy]
+        row.update({
+            'trades': result['total_trades'],
+            'profit_pct': round(result['profit_total'] * 100, 2),
+            'profit_abs': round(result['profit_total_abs'], 4),
+            'winrate_pct': round(result.get('winrate', 0) * 100, 1),
+            'max_drawdown_pct': round(result.get('max_drawdown_account', 0) * 100, 2),
+            'profit_factor': round(result.get('profit_factor', 0), 2),
+        })
+    except Exception as e:
+        row['error'] = f'{type(e).__name__}: {e}'
+    row['seconds'] = round(time.monotonic() - started, 1)
+    row['shared_reads'] = _reads['shared'] - reads['shared']
+    row['file_reads'] = _reads['file'] - reads['file']
+    return row
+
+
+def format_row(row: dict) -> str:
+    head = f'{row["strategy"]:<26} {row["timerange"]:<18} {row["config"]:<28}'
+    if 'error' in row:
+        return f'{head} ERROR {row["error"]}'
+    return (f'{head} {row["trades"]:>6} trades  {row["profit_pct"]:>8.2f}%  win {row["winrate_pct"]:>5.1f}%  '
+            f'dd {row["max_drawdown_pct"]:>6.2f}%  pf {row["profit_factor"]:>5.2f}  '
+            f'({row["seconds"]}s, {row["shared_reads"]} shared / {row["file_reads"]} file reads)')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--strategies', nargs='*', help='default: every strategy in user_data/strategies')
+    parser.add_argument('--timeranges', nargs='+', required=True)
+    parser.add_argument('--configs', nargs='+', default=['base-futures.json'],
+                        help='names in user_data/config or paths')
+    parser.add_argument('--jobs', type=int, default=0, help='default: the container CPU limit')
+    parser.add_argument('--summary', help='default: backtest_results/matrix-<date>.json')
+    args = parser.parse_args()
+
+    strategies = args.strategies or sorted(p.stem for p in STRATEGY_DIR.glob('*.py') if not p.stem.startswith('_'))
+    configs = [resolve_config(c) for c in args.configs]
+    jobs = [(s, t, c) for c in configs for t in args.timeranges for s in strategies]
+    workers = min(args.jobs or cpu_limit(), len(jobs))
+
+    started = time.monotonic()
+    checked_loader()
+    segments, manifest = share_candles(plan_windows(jobs))
+    size = sum(shm.size for shm in segments)
+    print(f'{len(jobs)} jobs on {workers} workers, {len(segments)} candle windows '
+          f'({size / 2 ** 20:.1f} MiB shared) loaded in {time.monotonic() - started:.1f}s')
+
+    rows = []
+    try:
+        with ProcessPoolExecutor(workers, mp_context=get_context('spawn'),
+                                 initializer=_init_worker, initargs=(manifest,)) as pool:
+            futures = [pool.submit(run_job, s, t, str(c)) for s, t, c in jobs]
+            for future in as_completed(futures):
+                rows.append(future.result())
+                print(format_row(rows[-1]), flush=True)
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    order = {job: i for i, job in enumerate((s, t, c.name) for s, t, c in jobs)}
+    rows.sort(key=lambda r: order[(r['strategy'], r['timerange'], r['config'])])
+    summary = Path(args.summary) if args.summary else \
+        RESULTS_DIR / f'matrix-{datetime.now():%Y-%m-%d_%H-%M-%S}.json'
+    summary.parent.mkdir(parents=True, exist_ok=True)
+    summary.write_text(json.dumps({
+        'created': datetime.now(timezone.utc).isoformat(),
+        'workers': workers,
+        'seconds': round(time.monotonic() - started, 1),
+        'results': rows,
+    }, indent=2))
+    errors = sum('error' in r for r in rows)
+    print(f'{len(rows)} jobs, {errors} failed, {time.monotonic() - started:.1f}s total -> {summary}')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
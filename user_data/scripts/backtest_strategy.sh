@@ -13,6 +13,11 @@ echo "Strategy: $strategy_name"
 echo "Time Range: $timerange"
 echo "============================================"
 
+# Check data coverage from the catalog (no candles are loaded)
+python3 data_catalog.py --datadir ../data/okx/futures check \
+    --config ../config/base-futures.json --timerange "$timerange" \
+    || echo "Warning: data does not fully cover $timerange"
+
 # Run backtest
 freqtrade backtest \
     --config ../config/base-futures.json \
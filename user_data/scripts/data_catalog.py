@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Metadata catalog for the downloaded candle files.
+
+Keeps a sidecar JSON per feather file in <datadir>/.catalog with the date
+range, row count, timeframe, gaps, duplicate timestamps and a content hash.
+Sidecars are only rebuilt when a file's mtime or size changed, so listing
+the data or checking backtest coverage never loads candles.
+Usage: python data_catalog.py [--datadir DIR] [list|refresh|check] [...]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyarrow.feather as feather
+
+USER_DATA = Path(__file__).resolve().parents[1]
+DEFAULT_DATADIR = USER_DATA / 'data/okx/futures'
+CATALOG_DIR = '.catalog'
+CATALOG_VERSION = 1
+# Gap ranges kept per file (the first ones); gap_count and missing_candles
+# always cover every gap
+MAX_GAPS = 50
+
+TIMEFRAME_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    return int(timeframe[:-1]) * TIMEFRAME_SECONDS[timeframe[-1]]
+
+
+def parse_filename(path: Path) -> Optional[dict]:
+    """
+    BTC_USDT_USDT-5m-futures.feather -> pair, timeframe, candle type.
+    """
+    parts = path.stem.split('-')
+    if len(parts) != 3:
+        return None
+    symbol, timeframe, candle_type = parts
+    base, quote, *settle = symbol.split('_')
+    pair = f'{base}/{quote}' + (f':{settle[0]}' if settle else '')
+    return {'pair': pair, 'timeframe': timeframe, 'candle_type': candle_type}
+
+
+def _iso(ns: int) -> str:
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc).isoformat()
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_entry(path: Path) -> dict:
+    """
+    Scan one file (date column only) and return its catalog entry.
+    """
+    stat = path.stat()
+    entry = {
+        'version': CATALOG_VERSION,
+        'file': path.name,
+        **(parse_filename(path) or {}),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': _sha256(path),
+        'rows': 0,
+        'start': None,
+        'end': None,
+        'interval_seconds': None,
+        'duplicates': 0,
+        'gap_count': 0,
+        'missing_candles': 0,
+        'gaps': [],
+    }
+    dates = feather.read_table(path, columns=['date']).column('date')
+    if len(dates) == 0:
+        return entry
+    ns = np.sort(dates.cast('int64').to_numpy())
+
+    diffs = np.diff(ns)
+    duplicates = int((diffs == 0).sum())
+    diffs_unique = diffs[diffs > 0]
+    step = timeframe_seconds(entry['timeframe']) * 10 ** 9 if 'timeframe' in entry else 0
+    if entry.get('candle_type') == 'funding_rate' and len(diffs_unique):
+        # Funding is stored under the 1h name but settles every few hours
+        values, counts = np.unique(diffs_unique, return_counts=True)
+        step = int(values[counts.argmax()])
+
+    entry.update({
+        'rows': len(ns),
+        'start': _iso(ns[0]),
+        'end': _iso(ns[-1]),
+        'interval_seconds': step // 10 ** 9 if step else None,
+        'duplicates': duplicates,
+    })
+    if step:
+        gap_idx = np.flatnonzero(diffs > step)
+        entry['gap_count'] = len(gap_idx)
+        entry['missing_candles'] = int((diffs[gap_idx] // step - 1).sum())
+        entry['gaps'] = [[_iso(ns[i]), _iso(ns[i + 1])] for i in gap_idx[:MAX_GAPS]]
+    return entry
+
+
+def refresh(datadir: Path = DEFAULT_DATADIR, force: bool = False) -> Dict[str, dict]:
+    """
+    Bring the sidecars up to date and return the catalog keyed by file name.
+    Files whose mtime and size match their sidecar are not opened.
+    """
+    datadir = Path(datadir)
+    catalog_dir = datadir / CATALOG_DIR
+    catalog_dir.mkdir(exist_ok=True)
+    catalog = {}
+    for path in sorted(datadir.glob('*.feather')):
+        sidecar = catalog_dir / f'{path.stem}.json'
+        stat = path.stat()
+        entry = None
+        if not force and sidecar.is_file():
+            try:
+                entry = json.loads(sidecar.read_text())
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None and (entry.get('version') != CATALOG_VERSION
+                                      or entry.get('size') != stat.st_size
+                                      or entry.get('mtime_ns') != stat.st_mtime_ns):
+                entry = None
+        if entry is None:
+            entry = build_entry(path)
+            tmp = sidecar.with_suffix('.json.tmp')
+            tmp.write_text(json.dumps(entry, indent=2))
+            os.replace(tmp, sidecar)
+        catalog[path.name] = entry
+
+    for sidecar in catalog_dir.glob('*.json'):
+        if f'{sidecar.stem}.feather' not in catalog:
+            sidecar.unlink()
+    return catalog
+
+
+def find(catalog: Dict[str, dict], pair: str, timeframe: str, candle_type: str = 'futures') -> Optional[dict]:
+    for entry in catalog.values():
+        if (entry.get('pair'), entry.get('timeframe'), entry.get('candle_type')) == (pair, timeframe, candle_type):
+            return entry
+    return None
+
+
+def parse_timerange(timerange: str) -> tuple:
+    """
+    'YYYYMMDD-YYYYMMDD' (either side may be empty) -> (start, end) datetimes or None.
+    """
+    def parse(value: str) -> Optional[datetime]:
+        if not value:
+            return None
+        return datetime.strptime(value, '%Y%m%d').replace(tzinfo=timezone.utc)
+    start, _, end = timerange.partition('-')
+    return parse(start), parse(end)
+
+
+def coverage(catalog: Dict[str, dict], pairs: List[str], timeframe: str, timerange: str = '',
+             candle_type: str = 'futures') -> List[str]:
+    """
+    Problems that would affect a backtest of `pairs` over `timerange`:
+    missing files, ranges outside the data and gaps or duplicates inside it.
+    Gaps past the listed ranges are reported from the file's totals.
+    An empty list means the data covers the request.
+    """
+    start, end = parse_timerange(timerange)
+    step = timeframe_seconds(timeframe)
+    problems = []
+    for pair in pairs:
+        entry = find(catalog, pair, timeframe, candle_type)
+        if entry is None:
+            problems.append(f'{pair} {timeframe}: no {candle_type} data file')
+            continue
+        if entry['rows'] == 0:
+            problems.append(f'{pair} {timeframe}: data file is empty')
+            continue
+        first = datetime.fromisoformat(entry['start'])
+        last = datetime.fromisoformat(entry['end'])
+        if start is not None and first > start:
+            problems.append(f'{pair} {timeframe}: data starts {first:%Y-%m-%d %H:%M}, after {start:%Y-%m-%d}')
+        if end is not None and (end - last).total_seconds() > step:
+            problems.append(f'{pair} {timeframe}: data ends {last:%Y-%m-%d %H:%M}, before {end:%Y-%m-%d}')
+        if entry['duplicates']:
+            problems.append(f'{pair} {timeframe}: {entry["duplicates"]} duplicate candles')
+        for gap_start, gap_end in entry['gaps']:
+            gap_start, gap_end = datetime.fromisoformat(gap_start), datetime.fromisoformat(gap_end)
+            if (end is None or gap_start < end) and (start is None or gap_end > start):
+                problems.append(f'{pair} {timeframe}: gap {gap_start:%Y-%m-%d %H:%M} -> {gap_end:%Y-%m-%d %H:%M}')
+        unlisted = entry['gap_count'] - len(entry['gaps'])
+        if unlisted > 0:
+            # Unlisted gaps all come after the last listed one
+            after = datetime.fromisoformat(entry['gaps'][-1][1])
+            if end is None or after < end:
+                problems.append(f'{pair} {timeframe}: {unlisted} more gaps after {after:%Y-%m-%d %H:%M} '
+                                f'({entry["gap_count"]} gaps, {entry["missing_candles"]} missing candles '
+                                f'in the file)')
+    return problems
+
+
+def format_entry(entry: dict) -> str:
+    if entry['rows'] == 0:
+        return f'{entry["file"]:<40} empty'
+    issues = []
+    if entry['gap_count']:
+        issues.append(f'{entry["gap_count"]} gaps / {entry["missing_candles"]} missing')
+    if entry['duplicates']:
+        issues.append(f'{entry["duplicates"]} duplicates')
+    return (f'{entry["file"]:<40} {entry["start"][:16]} to {entry["end"][:16]}  '
+            f'{entry["rows"]:>7} rows  {", ".join(issues) or "ok"}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--datadir', default=str(DEFAULT_DATADIR))
+    sub = parser.add_subparsers(dest='command')
+    ls = sub.add_parser('list', help='show the catalog (default)')
+    ls.add_argument('--timeframe')
+    ls.add_argument('--candle-type')
+    sub.add_parser('refresh', help='rebuild every sidecar').add_argument('--force', action='store_true')
+    check = sub.add_parser('check', help='validate coverage before a backtest')
+    check.add_argument('--config', help='take the pairs from exchange.pair_whitelist')
+    check.add_argument('--pairs', nargs='*', default=[])
+    check.add_argument('--timeframe', default='5m')
+    check.add_argument('--timerange', default='')
+    check.add_argument('--candle-type', default='futures')
+    args = parser.parse_args()
+
+    command = args.command or 'list'
+    catalog = refresh(Path(args.datadir), force=command == 'refresh' and args.force)
+
+    if command == 'check':
+        pairs = list(args.pairs)
+        if args.config:
+            config = json.loads(Path(args.config).read_text())
+            pairs += config.get('exchange', {}).get('pair_whitelist', [])
+        problems = coverage(catalog, pairs, args.timeframe, args.timerange, args.candle_type)
+        for problem in problems:
+            print(problem)
+        print(f'{len(pairs)} pairs checked, {len(problems)} problems')
+        return 1 if problems else 0
+
+    for entry in catalog.values():
+        if getattr(args, 'timeframe', None) and entry.get('timeframe') != args.timeframe:
+            continue
+        if getattr(args, 'candle_type', None) and entry.get('candle_type') != args.candle_type:
+            continue
+        print(format_entry(entry))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Timerange-pushdown loader for the feather candle files.
+
+Files are opened memory-mapped and only the requested columns of the record
+batches overlapping the timerange (plus the startup candles before it) are
+read. The rows are located by binary search on the sorted `date` column
+before any DataFrame is built, so load time and memory follow the requested
+window instead of the file size.
+
+Files written by freqtrade are lz4-compressed in 64k-row batches; the
+`convert` command rewrites them uncompressed in smaller batches, which makes
+the reads zero-copy and the batch granularity finer. freqtrade reads both.
+Usage: python data_loader.py [--datadir DIR] load PAIR [--timeframe 5m] [--timerange ...]
+       python data_loader.py [--datadir DIR] convert [--batch-rows N] [FILE ...]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from pandas import DataFrame
+
+USER_DATA = Path(__file__).resolve().parents[1]
+DEFAULT_DATADIR = USER_DATA / 'data/okx/futures'
+# One day of 5m candles per batch after `convert`
+CONVERT_BATCH_ROWS = 288
+
+# (path, mtime_ns, size) -> (first date per batch, last date per batch, rows per batch)
+_batch_index: Dict[tuple, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+
+def pair_path(datadir: Path, pair: str, timeframe: str, candle_type: str = 'futures') -> Path:
+    """
+    BTC/USDT:USDT -> <datadir>/BTC_USDT_USDT-<timeframe>-<candle_type>.feather
+    """
+    symbol = pair.replace('/', '_').replace(':', '_')
+    return Path(datadir) / f'{symbol}-{timeframe}-{candle_type}.feather'
+
+
+def _to_ns(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y%m%d').replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 10 ** 9)
+
+
+def parse_timerange(timerange: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    'YYYYMMDD-YYYYMMDD' (either side may be empty) -> (start, stop) in ns.
+    """
+    start, _, stop = (timerange or '').partition('-')
+    return _to_ns(start or None), _to_ns(stop or None)
+
+
+def _reader(path: Path, columns: Optional[List[str]] = None) -> ipc.RecordBatchFileReader:
+    source = pa.memory_map(str(path))
+    if columns is None:
+        return ipc.open_file(source)
+    names = ipc.open_file(source).schema.names
+    missing = [c for c in columns if c not in names]
+    if missing:
+        raise KeyError(f'{path.name} has no column(s) {missing}')
+    options = ipc.IpcReadOptions(included_fields=[names.index(c) for c in columns])
+    return ipc.open_file(source, options=options)
+
+
+def _dates(batch: pa.RecordBatch) -> np.ndarray:
+    return batch.column('date').cast(pa.int64()).to_numpy()
+
+
+def batch_index(path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    First date, last date and row count of every record batch, read from the
+    date column only and cached until the file changes.
+    """
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    index = _batch_index.get(key)
+    if index is None:
+        reader = _reader(path, ['date'])
+        first, last, rows = [], [], []
+        for i in range(reader.num_record_batches):
+            dates = _dates(reader.get_batch(i))
+            first.append(dates[0] if len(dates) else np.iinfo(np.int64).max)
+            last.append(dates[-1] if len(dates) else np.iinfo(np.int64).min)
+            rows.append(len(dates))
+        index = (np.array(first, dtype=np.int64), np.array(last, dtype=np.int64), np.array(rows))
+        _batch_index[key] = index
+    return index
+
+
+def load_table(path: Path, timerange: str = '', startup_candles: int = 0,
+               columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    Rows with start <= date <= stop plus up to `startup_candles` rows before
+    start (freqtrade's timerange semantics), restricted to `columns`
+    (`date` is always included).
+    """
+    path = Path(path)
+    if columns is not None and 'date' not in columns:
+        columns = ['date'] + list(columns)
+    reader = _reader(path, columns)
+    if reader.num_record_batches == 0:
+        return reader.read_all()
+
+    start, stop = parse_timerange(timerange)
+    first, last, rows = batch_index(path)
+    offsets = np.concatenate([[0], np.cumsum(rows)])
+    date_reader = _reader(path, ['date'])
+
+    # Global row positions of start and stop: binary search over the batch
+    # bounds, then within the single batch holding each of them
+    row_start, row_stop = 0, int(offsets[-1])
+    if start is not None:
+        b = int(np.searchsorted(last, start, side='left'))
+        if b < len(rows):
+            row_start = int(offsets[b] + np.searchsorted(_dates(date_reader.get_batch(b)), start, side='left'))
+        else:
+            row_start = row_stop
+    if stop is not None:
+        b = int(np.searchsorted(first, stop, side='right')) - 1
+        row_stop = 0 if b < 0 else int(
+            offsets[b] + np.searchsorted(_dates(date_reader.get_batch(b)), stop, side='right'))
+    row_start = max(0, row_start - startup_candles)
+    if row_stop <= row_start:
+        return reader.schema.empty_table()
+
+    # Read only the batches holding those rows
+    b0 = int(np.searchsorted(offsets, row_start, side='right')) - 1
+    b1 = int(np.searchsorted(offsets, row_stop, side='left'))
+    table = pa.Table.from_batches([reader.get_batch(i) for i in range(b0, b1)], schema=reader.schema)
+    return table.slice(row_start - int(offsets[b0]), row_stop - row_start)
+
+
+def load_ohlcv(datadir: Path, pair: str, timeframe: str, timerange: str = '', startup_candles: int = 0,
+               candle_type: str = 'futures', columns: Optional[List[str]] = None) -> DataFrame:
+    """
+    Candles of one pair for a timerange as a DataFrame (date is tz-aware UTC).
+    """
+    table = load_table(pair_path(datadir, pair, timeframe, candle_type), timerange,
+                       startup_candles, columns)
+    # The pandas metadata describes the full file's index - not needed here
+    return table.replace_schema_metadata(None).to_pandas()
+
+
+def convert(path: Path, batch_rows: int = CONVERT_BATCH_ROWS) -> None:
+    """
+    Rewrite a feather file uncompressed in `batch_rows` batches (atomically).
+    """
+    path = Path(path)
+    with pa.memory_map(str(path)) as source:
+        table = ipc.open_file(source).read_all()
+    tmp = path.with_suffix('.feather.tmp')
+    with ipc.new_file(str(tmp), table.schema) as writer:
+        writer.write_table(table, max_chunksize=batch_rows)
+    os.replace(tmp, path)
+    _batch_index.clear()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--datadir', default=str(DEFAULT_DATADIR))
+    sub = parser.add_subparsers(dest='command', required=True)
+    load = sub.add_parser('load', help='load a timerange and print a summary')
+    load.add_argument('pair')
+    load.add_argument('--timeframe', default='5m')
+    load.add_argument('--timerange', default='')
+    load.add_argument('--startup-candles', type=int, default=0)
+    load.add_argument('--candle-type', default='futures')
+    load.add_argument('--columns', nargs='*')
+    conv = sub.add_parser('convert', help='rewrite files uncompressed in small batches')
+    conv.add_argument('files', nargs='*', help='default: every feather file in --datadir')
+    conv.add_argument('--batch-rows', type=int, default=CONVERT_BATCH_ROWS)
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        files = [Path(f) for f in args.files] or sorted(Path(args.datadir).glob('*.feather'))
+        for path in files:
+            convert(path, args.batch_rows)
+            print(f'{path.name}: {path.stat().st_size} bytes')
+        return 0
+
+    df = load_ohlcv(Path(args.datadir), args.pair, args.timeframe, args.timerange,
+                    args.startup_candles, args.candle_type, args.columns)
+    if df.empty:
+        print(f'{args.pair} {args.timeframe}: no candles in {args.timerange or "file"}')
+        return 1
+    print(f'{args.pair} {args.timeframe}: {len(df)} rows, {df["date"].iloc[0]} to {df["date"].iloc[-1]}, '
+          f'columns {list(df.columns)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
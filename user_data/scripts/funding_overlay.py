@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Funding-rate and mark-price overlay aligned onto the candle frames.
+
+The 8-hourly funding rates (*-1h-funding_rate.feather) and the hourly mark
+candles (*-1h-mark.feather) are joined as-of onto a pair's 1m/5m candles
+with binary searches over the sorted dates, so there are no per-row
+lookups. Per candle the overlay holds:
+
+  funding_rate   last funding rate settled at or before the candle opened
+  funding_fee    rate * mark price of a settlement falling inside the
+                 candle (quote paid per unit of base held long), else 0
+  mark           close of the last hourly mark candle completed by the
+                 candle's close (no look-ahead)
+
+Overlays are persisted in <datadir>/.overlay and refreshed incrementally:
+when the candles, rates or marks were appended to, only the rows the new
+data can change are recomputed. `costs` uses the cumulative funding_fee to
+price the funding of every trade of a screening run (or a trades CSV) in
+one pass, next to its mark-based PnL at the exit.
+Usage: python funding_overlay.py build [--config okx-futures] [--timeframe 5m] [--pairs ...]
+       python funding_overlay.py costs FutureBuyHoldV2 [--config highfreq-config] [--trades CSV]
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from backtest_matrix import config_datadir, config_pairs, resolve_config  # noqa: E402
+from data_catalog import timeframe_seconds  # noqa: E402
+from data_loader import load_table, pair_path  # noqa: E402
+
+OVERLAY_DIR = '.overlay'
+OVERLAY_VERSION = 1
+MARK_TIMEFRAME = '1h'
+COLUMNS = ('funding_rate', 'funding_fee', 'mark')
+
+
+def _series(path: Path, columns: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Date (int64 ns) and `columns` of a feather file as numpy arrays.
+    """
+    if not path.is_file():
+        return {'date': np.array([], dtype=np.int64), **{c: np.array([]) for c in columns}}
+    table = load_table(path, columns=columns)
+    out = {'date': table.column('date').cast(pa.timestamp('ns', tz='UTC')).to_numpy().astype(np.int64)}
+    for column in columns:
+        out[column] = table.column(column).to_numpy(zero_copy_only=False).astype(np.float64)
+    return out
+
+
+def _source_state(path: Path, dates: np.ndarray) -> dict:
+    stat = path.stat() if path.is_file() else None
+    return {
+        'size': stat.st_size if stat else 0,
+        'mtime_ns': stat.st_mtime_ns if stat else 0,
+        'start': int(dates[0]) if len(dates) else None,
+        'end': int(dates[-1]) if len(dates) else None,
+    }
+
+
+def join(dates: np.ndarray, timeframe: str, funding: Dict[str, np.ndarray],
+         mark: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Overlay columns for candles opening at `dates` (sorted int64 ns).
+    `funding` has date/open (the rate), `mark` hourly date/open/close.
+    """
+    step = timeframe_seconds(timeframe) * 10 ** 9
+    hour = timeframe_seconds(MARK_TIMEFRAME) * 10 ** 9
+    nan = np.full(len(dates), np.nan)
+
+    # Last settlement at or before the candle's open
+    i = np.searchsorted(funding['date'], dates, side='right') - 1
+    funding_rate = np.where(i >= 0, funding['open'][np.maximum(i, 0)], nan) if len(funding['date']) else nan
+
+    # Settlements inside [open, open + timeframe): rate * mark open at that hour
+    funding_fee = np.zeros(len(dates))
+    if len(funding['date']) and len(dates):
+        k = np.searchsorted(mark['date'], funding['date'], side='right') - 1
+        settle_mark = np.where(k >= 0, mark['open'][np.maximum(k, 0)], np.nan) if len(mark['date']) else \
+            np.full(len(funding['date']), np.nan)
+        candle = np.searchsorted(dates, funding['date'], side='right') - 1
+        inside = (candle >= 0) & (funding['date'] < dates[np.maximum(candle, 0)] + step)
+        np.add.at(funding_fee, candle[inside], (funding['open'] * settle_mark)[inside])
+
+    # Last hourly mark candle closed by the candle's close
+    j = np.searchsorted(mark['date'] + hour, dates + step, side='right') - 1
+    mark_close = np.where(j >= 0, mark['close'][np.maximum(j, 0)], nan) if len(mark['date']) else nan
+    return {'funding_rate': funding_rate, 'funding_fee': funding_fee, 'mark': mark_close}
+
+
+def overlay_path(datadir: Path, pair: str, timeframe: str) -> Path:
+    return Path(datadir) / OVERLAY_DIR / pair_path(datadir, pair, timeframe).name
+
+
+def refresh(datadir: Path, pair: str, timeframe: str, force: bool = False) -> dict:
+    """
+    Bring a pair's overlay up to date and return its sidecar. Rows that new
+    candles, settlements or mark candles cannot change are kept as stored.
+    """
+    datadir = Path(datadir)
+    sources = {
+        'candles': pair_path(datadir, pair, timeframe),
+        'funding': pair_path(datadir, pair, MARK_TIMEFRAME, 'funding_rate'),
+        'mark': pair_path(datadir, pair, MARK_TIMEFRAME, 'mark'),
+    }
+    path = overlay_path(datadir, pair, timeframe)
+    sidecar = path.with_suffix('.json')
+    stored = None
+    if not force and sidecar.is_file() and path.is_file():
+        try:
+            stored = json.loads(sidecar.read_text())
+        except (OSError, ValueError):
+            stored = None
+    if stored is not None and stored.get('version') != OVERLAY_VERSION:
+        stored = None
+    if stored is not None and all(
+            stored['sources'][name]['size'] == (p.stat().st_size if p.is_file() else 0)
+            and stored['sources'][name]['mtime_ns'] == (p.stat().st_mtime_ns if p.is_file() else 0)
+            for name, p in sources.items()):
+        return dict(stored, recomputed=0)
+
+    candles = _series(sources['candles'], [])
+    funding = _series(sources['funding'], ['open'])
+    mark = _series(sources['mark'], ['open', 'close'])
+    states = {'candles': _source_state(sources['candles'], candles['date']),
+              'funding': _source_state(sources['funding'], funding['date']),
+              'mark': _source_state(sources['mark'], mark['date'])}
+
+    # Appended sources only change rows from just before what was stored;
+    # anything else (rewritten history, new start) rebuilds the overlay
+    since = None
+    if stored is not None and all(stored['sources'][name]['start'] == states[name]['start']
+                                  and (stored['sources'][name]['end'] or -1) <= (states[name]['end'] or -1)
+                                  for name in states):
+        step = timeframe_seconds(timeframe) * 10 ** 9
+        hour = timeframe_seconds(MARK_TIMEFRAME) * 10 ** 9
+        old = {name: stored['sources'][name]['end'] for name in states}
+        bounds = [old['candles'] + 1 if old['candles'] is not None else None]
+        if old['funding'] != states['funding']['end']:
+            # a new settlement lands in the candle holding it
+            bounds.append(old['funding'] - step + 1 if old['funding'] is not None else None)
+        if old['mark'] != states['mark']['end']:
+            # rows that could see a mark candle closing after the stored last one
+            bounds.append(old['mark'] + hour - step + 1 if old['mark'] is not None else None)
+        if None not in bounds:
+            since = min(bounds)
+
+    keep = 0
+    if since is not None:
+        keep = int(np.searchsorted(candles['date'], since, side='left'))
+    new = join(candles['date'][keep:], timeframe, funding, mark)
+    columns = {'date': pa.array(candles['date'][keep:], pa.timestamp('ns', tz='UTC'))}
+    columns.update({c: pa.array(new[c]) for c in COLUMNS})
+    table = pa.table(columns)
+    if keep:
+        table = pa.concat_tables([load_table(path).slice(0, keep), table])
+
+    path.parent.mkdir(exist_ok=True)
+    tmp = path.with_suffix('.feather.tmp')
+    with ipc.new_file(str(tmp), table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    entry = {'version': OVERLAY_VERSION, 'pair': pair, 'timeframe': timeframe, 'rows': table.num_rows,
+             'sources': states}
+    tmp = sidecar.with_suffix('.json.tmp')
+    tmp.write_text(json.dumps(entry, indent=2))
+    os.replace(tmp, sidecar)
+    return dict(entry, recomputed=table.num_rows - keep)
+
+
+def load_overlay(datadir: Path, pair: str, timeframe: str, timerange: str = '') -> pd.DataFrame:
+    """
+    A pair's overlay for a timerange (refreshed first), date tz-aware UTC.
+    """
+    refresh(datadir, pair, timeframe)
+    table = load_table(overlay_path(datadir, pair, timeframe), timerange)
+    return table.replace_schema_metadata(None).to_pandas()
+
+
+def trade_costs(trades: pd.DataFrame, datadir: Path, timeframe: str) -> pd.DataFrame:
+    """
+    Funding and mark PnL of each trade, as ratios of its stake:
+
+      funding_ratio       funding received (negative: paid) over settlements
+                          in [open_date, close_date), at the trade's leverage
+      mark_profit_ratio   PnL at the exit candle's mark (the last completed
+                          hourly mark close, so up to an hour stale)
+      net_profit_ratio    profit_ratio + funding_ratio
+
+    `trades` needs pair, open_date, close_date, open_rate and leverage
+    (is_short and profit_ratio are optional).
+    """
+    out = trades.copy()
+    for column in ('funding_ratio', 'mark_profit_ratio'):
+        out[column] = np.nan
+    open_ns = pd.to_datetime(out['open_date'], utc=True).values.astype('datetime64[ns]').astype(np.int64)
+    close_ns = pd.to_datetime(out['close_date'], utc=True).values.astype('datetime64[ns]').astype(np.int64)
+    side = np.where(out['is_short'].astype(bool), -1.0, 1.0) if 'is_short' in out else np.ones(len(out))
+    leverage = out['leverage'].to_numpy(np.float64)
+    open_rate = out['open_rate'].to_numpy(np.float64)
+    funding_ratio = np.full(len(out), np.nan)
+    mark_ratio = np.full(len(out), np.nan)
+    for pair, rows in out.groupby('pair').indices.items():
+        overlay = load_overlay(datadir, pair, timeframe)
+        if overlay.empty:
+            continue
+        dates = overlay['date'].values.astype('datetime64[ns]').astype(np.int64)
+        paid = np.concatenate([[0.0], np.cumsum(overlay['funding_fee'].to_numpy())])
+        a = np.searchsorted(dates, open_ns[rows], side='left')
+        b = np.searchsorted(dates, close_ns[rows], side='left')
+        # Longs pay positive rates; funding_fee is per unit of base held
+        funding_ratio[rows] = -side[rows] * (paid[b] - paid[a]) * leverage[rows] / open_rate[rows]
+        exit_candle = np.clip(np.searchsorted(dates, close_ns[rows], side='right') - 1, 0, len(dates) - 1)
+        mark = overlay['mark'].to_numpy()[exit_candle]
+        mark_ratio[rows] = side[rows] * (mark / open_rate[rows] - 1) * leverage[rows]
+    out['funding_ratio'] = funding_ratio
+    out['mark_profit_ratio'] = mark_ratio
+    if 'profit_ratio' in out:
+        out['net_profit_ratio'] = out['profit_ratio'] + out['funding_ratio'].fillna(0.0)
+    return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='refresh the overlays of the config whitelist')
+    build.add_argument('--config', default='okx-futures', help='config name or path (pairs, datadir)')
+    build.add_argument('--timeframe', default='5m')
+    build.add_argument('--pairs', nargs='*', help='default: the config whitelist')
+    build.add_argument('--force', action='store_true', help='rebuild instead of refreshing incrementally')
+    costs = sub.add_parser('costs', help='funding and mark PnL of screening-backtest trades')
+    costs.add_argument('strategies', nargs='*')
+    costs.add_argument('--config', default='highfreq-config', help='config name or path (pairs, fee, datadir)')
+    costs.add_argument('--timerange', default='')
+    costs.add_argument('--pairs', nargs='*', help='default: the config whitelist')
+    costs.add_argument('--leverage-map', action='store_true',
+                       help='trade at leverage_config instead of what leverage() returns to freqtrade')
+    costs.add_argument('--trades', help='price this trades CSV (screen_backtest.py --trades) instead')
+    costs.add_argument('--timeframe', default='1m', help='candle timeframe of --trades')
+    costs.add_argument('--output', help='write the priced trades to this CSV file')
+    args = parser.parse_args()
+
+    config = json.loads(resolve_config(args.config).read_text())
+    datadir = config_datadir(config)
+    pairs = args.pairs or config_pairs(config)
+
+    if args.command == 'build':
+        for pair in pairs:
+            if not pair_path(datadir, pair, args.timeframe).is_file():
+                print(f'{pair} {args.timeframe}: no candles')
+                continue
+            entry = refresh(datadir, pair, args.timeframe, args.force)
+            print(f'{pair} {args.timeframe}: {entry["rows"]} rows, {entry["recomputed"]} recomputed')
+        return 0
+
+    runs = []
+    if args.trades:
+        runs.append(('trades', pd.read_csv(args.trades), args.timeframe))
+    if args.strategies:
+        from screen_backtest import load_strategy, run_strategy
+        for name in args.strategies:
+            timeframe = load_strategy(name, config).timeframe
+            trades, _ = run_strategy(name, config, pairs, datadir, args.timerange, 'exit_long', args.leverage_map)
+            runs.append((name, trades, timeframe))
+    priced = []
+    for name, trades, timeframe in runs:
+        if trades.empty:
+            print(f'{name}: no trades')
+            continue
+        trades = trade_costs(trades, datadir, timeframe)
+        report = {
+            'trades': len(trades),
+            'with_funding_data': int(trades['funding_ratio'].notna().sum()),
+            'funding_total': round(float(trades['funding_ratio'].sum()), 6),
+            'mark_profit_total': round(float(trades['mark_profit_ratio'].sum()), 6),
+        }
+        if 'profit_ratio' in trades:
+            report.update(profit_total=round(float(trades['profit_ratio'].sum()), 6),
+                          net_profit_total=round(float(trades['net_profit_ratio'].sum()), 6))
+        print(f'{name}: {json.dumps(report)}')
+        priced.append(trades.assign(strategy=name) if 'strategy' not in trades else trades)
+    if args.output and priced:
+        pd.concat(priced, ignore_index=True).to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
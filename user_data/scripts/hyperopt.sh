@@ -15,6 +15,13 @@ echo "Time Range: $timerange"
 echo "Epochs: $epochs"
 echo "============================================"
 
+# Strategies whose hyperopt parameters include indicator periods need
+# their indicators recomputed every epoch
+analyze_per_epoch=""
+case "$strategy_name" in
+    FutureTrendV1|FutureMeanRevV1|FutureHighFreqV1) analyze_per_epoch="--analyze-per-epoch" ;;
+esac
+
 # Create hyperopt directory
 mkdir -p hyperopt_results
 
@@ -25,7 +32,7 @@ freqtrade hyperopt \
     --strategy "$strategy_name" \
     --timerange "$timerange" \
     --epochs $epochs \
-    --spaces all \
+    --spaces all $analyze_per_epoch \
     --hyperopt-loss SharpeHyperOptLoss \
     --print-all \
     --json-save "hyperopt_results/$strategy_name_$timerange.json" \
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Kernel parity check and benchmark.
+
+Runs every kernel of user_data/strategies/_kernels.py on a candle file and
+compares it with its pandas/talib reference (NaN layout and values), then
+times it against the code path it replaced in the strategies - Python
+loops, np.roll lags that wrap the last rows around to the start, pandas
+Series round trips.
+Usage: python kernel_parity.py [--data FILE] [--rows N] [--repeat N] [--rtol X]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+import talib.abstract as ta
+
+USER_DATA = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(USER_DATA / 'strategies'))
+
+import _kernels as k  # noqa: E402
+
+
+class Case(NamedTuple):
+    name: str
+    kernel: Callable
+    reference: Callable
+    # the code path the kernel replaced
+    legacy: Callable
+
+
+def loop_true_range(df: pd.DataFrame) -> list:
+    # FutureBuyHoldV2._calculate_atr before the kernels
+    high, low, close = df['high'].values, df['low'].values, df['close'].values
+    tr = []
+    for i in range(len(close)):
+        if i == 0:
+            tr.append(high[i] - low[i])
+        else:
+            tr.append(max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1])))
+    return tr
+
+
+def talib_true_range(df: pd.DataFrame) -> np.ndarray:
+    tr = ta.TRANGE(df)
+    tr[0] = df['high'].iat[0] - df['low'].iat[0]
+    return tr
+
+
+def cases(df: pd.DataFrame) -> List[Case]:
+    close = df['close']
+    c, h, lo = close.values, df['high'].values, df['low'].values
+    rsi = ta.RSI(df, timeperiod=14)
+    rsi_values = rsi.values
+    return [
+        Case('shift(9)', lambda: k.shift(c, 9), lambda: close.shift(9).values,
+             lambda: close.shift(9).values),
+        # NineSecondSniper's 9-bar move (close - close 9 bars ago) / close 9 bars ago
+        Case('pct_change(9)', lambda: k.pct_change(c, 9), lambda: close.pct_change(9).values,
+             lambda: ((close - close.shift(9)) / close.shift(9)).values),
+        # FutureMLV1/V2 momentum: the np.roll lag wraps the last rows around
+        Case('momentum(12)', lambda: k.pct_change(c, 12), lambda: (close / close.shift(12) - 1).values,
+             lambda: c / np.roll(c, 12) - 1),
+        Case('diff(6)', lambda: k.diff(rsi_values, 6), lambda: rsi.diff(6).values,
+             lambda: rsi - np.roll(rsi, 6)),
+        Case('rolling_std(12)', lambda: k.rolling_std(k.pct_change(c), 12),
+             lambda: close.pct_change().rolling(12).std().values,
+             lambda: pd.Series(c).pct_change().rolling(12).std().values),
+        Case('rolling_mean(20)', lambda: k.rolling_mean(c, 20), lambda: close.rolling(20).mean().values,
+             lambda: pd.Series(c).rolling(20).mean().values),
+        Case('ewm_mean(20)', lambda: k.ewm_mean(c, 20), lambda: close.ewm(span=20, adjust=False).mean().values,
+             lambda: pd.Series(c).ewm(span=20, adjust=False).mean().values),
+        Case('true_range', lambda: k.true_range(h, lo, c), lambda: talib_true_range(df),
+             lambda: loop_true_range(df)),
+        # FutureBuyHoldV2's ATR: a simple moving average of the true range
+        Case('sma_atr(14)', lambda: k.rolling_mean(k.true_range(h, lo, c), 14),
+             lambda: pd.Series(talib_true_range(df)).rolling(14).mean().values,
+             lambda: pd.Series(loop_true_range(df)).rolling(14).mean().values),
+        Case('atr(14)', lambda: k.atr(h, lo, c, 14), lambda: ta.ATR(df, timeperiod=14).values,
+             lambda: ta.ATR(df['high'].values, df['low'].values, df['close'].values, timeperiod=14)),
+        Case('sar', lambda: k.sar(h, lo, 0.02, 0.2), lambda: ta.SAR(df, acceleration=0.02, maximum=0.2).values,
+             lambda: ta.SAR(df['high'].values, df['low'].values, acceleration=0.02, maximum=0.2)),
+    ]
+
+
+def compare(values: np.ndarray, reference: np.ndarray, rtol: float) -> tuple:
+    values, reference = np.asarray(values, dtype=np.float64), np.asarray(reference, dtype=np.float64)
+    if values.shape != reference.shape or not np.array_equal(np.isnan(values), np.isnan(reference)):
+        return False, float('nan')
+    valid = ~np.isnan(reference)
+    finite = valid & np.isfinite(reference)
+    if not np.array_equal(values[valid & ~finite], reference[valid & ~finite]):
+        return False, float('nan')
+    diff = np.abs(values[finite] - reference[finite])
+    max_diff = float(diff.max()) if diff.size else 0.0
+    return bool(np.all(diff <= rtol * np.abs(reference[finite]) + 1e-12)), max_diff
+
+
+def best_ms(func: Callable, repeat: int) -> float:
+    number = max(1, repeat)
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=str(USER_DATA / 'data/okx/futures/BTC_USDT_USDT-1m-futures.feather'))
+    parser.add_argument('--rows', type=int, default=0, help='last N candles (default: all)')
+    parser.add_argument('--repeat', type=int, default=20, help='calls per timing round')
+    parser.add_argument('--rtol', type=float, default=1e-9)
+    args = parser.parse_args()
+
+    df = pd.read_feather(args.data)
+    if args.rows:
+        df = df.iloc[-args.rows:].reset_index(drop=True)
+    print(f'{len(df)} candles from {Path(args.data).name}')
+    print(f'  {"kernel":<18} {"max_abs_diff":>12}  {"parity":<8} {"legacy ms":>10} {"kernel ms":>10} {"speedup":>8}')
+    failed = False
+    for case in cases(df):
+        ok, max_diff = compare(case.kernel(), case.reference(), args.rtol)
+        failed |= not ok
+        legacy, kernel = best_ms(case.legacy, args.repeat), best_ms(case.kernel, args.repeat)
+        print(f'  {case.name:<18} {max_diff:>12.3e}  {"ok" if ok else "MISMATCH":<8} {legacy:>10.3f} '
+              f'{kernel:>10.3f} {legacy / kernel:>7.1f}x')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,998 @@
+#!/usr/bin/env python3
+"""
+Local OKX stand-in replaying the downloaded futures candles.
+
+`serve` answers the public OKX v5 REST endpoints freqtrade and ccxt use in
+dry-run - instruments, trade and mark candles, tickers, order book, funding
+rate and its history, position tiers, server time - and the candle/ticker
+websocket channels, from the feather files of a config's pairs. The market
+moves on a replay clock: simulated time starts at --start and runs --speed
+times faster than the wall clock (1x real time up to 1000x).
+
+Each pair replays one tape timeframe (the config's by default); longer
+timeframes are aggregated from it (see resample_cache). The candle still
+forming is built from the tape candle in progress, walked open -> low ->
+high -> close (open -> high -> low -> close when it falls) on the tick
+grid, so nothing after the simulated moment is visible and tickers and
+the order book move within a candle. Websocket candles are pushed when a
+candle closes, not on the next poll. Funding rates come from the
+funding_rate files (0 outside them); mark candles are the trade candles.
+Private endpoints are not replayed: a dry-run bot fills its own orders
+against the replayed ticker and order book.
+
+`bench` starts the server, then runs a dry-run bot in this process with
+its clock (time.time, time.sleep and freqtrade's datetime.now) moved onto
+the replay clock, so throttling, candle refreshes and outdated-data checks
+follow the accelerated market. The market runs at 1x until the bot has loaded its
+markets and history. Each bot iteration is timed, and every new candle a pair's
+analysed dataframe ends on is recorded with the wall time from the candle
+close to the end of the iteration that decided on it: the report gives
+candle-to-decision latency, the share of closed candles decided on (the
+rest were skipped because iterations fell behind) and the server's request
+counts.
+Usage: python okx_replay.py serve [--config live-leveraged-config] [--speed 60] [--start YYYYMMDD[HHMM]] [--port 8765]
+       python okx_replay.py bench [--config ...] [--strategy AdaptiveHighRiskStrategy] [--speed 60] [--duration 120] [--report FILE]
+"""
+import argparse
+import asyncio
+import json
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from aiohttp import WSMsgType, web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from backtest_matrix import config_datadir, config_pairs, resolve_config  # noqa: E402
+from data_catalog import timeframe_seconds  # noqa: E402
+from data_loader import pair_path  # noqa: E402
+from funding_overlay import MARK_TIMEFRAME, _series  # noqa: E402
+from resample_cache import resample  # noqa: E402
+
+USER_DATA = Path(__file__).resolve().parents[1]
+# The config and strategy `run.sh trade` starts
+DEFAULT_CONFIG = 'live-leveraged-config'
+DEFAULT_STRATEGY = 'AdaptiveHighRiskStrategy'
+DEFAULT_PORT = 8765
+MAX_SPEED = 1000.0
+DAY_MS = 86400 * 1000
+FUNDING_INTERVAL_MS = 8 * 3600 * 1000
+# Tape candles before the default start, for the bot's startup candles
+DEFAULT_HISTORY_DAYS = 1
+# Base currency per contract of OKX's USDT-margined swaps (1 if not listed)
+CONTRACT_VALUES = {'BTC': 0.01, 'ETH': 0.1, 'SOL': 1, 'XRP': 100, 'DOGE': 1000, 'LTC': 1,
+                   'LINK': 1, 'UNI': 1, 'OP': 1, 'ARB': 10}
+LOT_SIZE = 0.01
+# Position tiers served for every pair: (max notional in quote, max leverage, maintenance margin rate)
+TIERS = ((50_000, 100, 0.004), (500_000, 50, 0.005), (5_000_000, 20, 0.01), (50_000_000, 10, 0.02))
+# Order book levels hold this share of a tape candle's average volume
+BOOK_LEVEL_SHARE = 0.05
+PRIVATE_PREFIXES = ('/api/v5/account', '/api/v5/trade', '/api/v5/asset', '/api/v5/users',
+                    '/api/v5/finance', '/api/v5/copytrading', '/api/v5/tradingBot')
+
+# The real clock, kept before `bench` moves time.time onto the replay clock
+_wall_time = time.time
+_wall_sleep = time.sleep
+_wall_time_ns = time.time_ns
+_real_datetime = datetime
+
+
+class ReplayClock:
+    """
+    Simulated time: `start` (ms) at wall time `wall_start`, then `speed`
+    replayed seconds per wall second. A held clock runs at real time (it
+    never stops: ccxt's rate limiter refills on time.time) until resume()
+    switches it to `speed`.
+    """
+
+    def __init__(self, start: int, speed: float, wall_start: Optional[float] = None, held: bool = False):
+        self.start = start
+        self.speed = speed
+        self.wall_start = _wall_time() if wall_start is None else wall_start
+        self.held = held
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'ReplayClock':
+        return cls(state['start'], state['speed'], state['wall_start'], state['held'])
+
+    @property
+    def rate(self) -> float:
+        return 1.0 if self.held else self.speed
+
+    def now(self) -> float:
+        """
+        Simulated time in seconds.
+        """
+        return self.start / 1000 + (_wall_time() - self.wall_start) * self.rate
+
+    def now_ms(self) -> int:
+        return int(self.now() * 1000)
+
+    def wall_at(self, ms: int) -> float:
+        """
+        Wall time at which simulated time reaches `ms`.
+        """
+        return self.wall_start + (ms - self.start) / 1000 / self.rate
+
+    def resume(self) -> None:
+        if self.held:
+            self.start, self.wall_start, self.held = self.now_ms(), _wall_time(), False
+
+    def state(self) -> dict:
+        return {'start': self.start, 'speed': self.speed, 'wall_start': self.wall_start, 'held': self.held,
+                'now': self.now_ms()}
+
+
+def _decimals(prices: np.ndarray) -> int:
+    """
+    Decimals of the price grid (the tick size is 10 ** -decimals).
+    """
+    for decimals in range(9):
+        scaled = prices * 10 ** decimals
+        if np.all(np.abs(scaled - np.round(scaled)) < 1e-6 * np.maximum(np.abs(scaled), 1)):
+            return decimals
+    return 8
+
+
+def _num(value: float) -> str:
+    return format(float(value), '.12g')
+
+
+class Tape:
+    """
+    One pair's candles, funding rates and derived market data on the replay
+    clock. Dates are in ms.
+    """
+
+    def __init__(self, pair: str, timeframe: str, candles: Dict[str, np.ndarray], funding: Dict[str, np.ndarray]):
+        self.pair = pair
+        self.base, self.quote = pair.split(':')[0].split('/')
+        self.uly = f'{self.base}-{self.quote}'
+        self.inst_id = f'{self.uly}-SWAP'
+        self.contract_value = CONTRACT_VALUES.get(self.base, 1.0)
+        self.timeframe = timeframe
+        self.step = timeframe_seconds(timeframe) * 1000
+        self._candles_ns = candles
+        self.candles = dict(candles, date=candles['date'] // 10 ** 6)
+        self.dates = self.candles['date']
+        self.decimals = _decimals(self.candles['close'])
+        self.tick = 10.0 ** -self.decimals
+        self.funding_dates = funding['date'] // 10 ** 6
+        self.funding_rates = funding['open']
+        self._frames = {timeframe: self.candles}
+
+    def px(self, price: float) -> str:
+        return f'{price:.{self.decimals}f}'
+
+    def frame(self, timeframe: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Candles of `timeframe` aggregated from the tape, or None when it is
+        not a multiple of the tape's timeframe.
+        """
+        frame = self._frames.get(timeframe)
+        if frame is None:
+            if timeframe_seconds(timeframe) * 1000 % self.step:
+                return None
+            frame = resample(self._candles_ns, self.timeframe, timeframe)
+            frame = self._frames[timeframe] = dict(frame, date=frame['date'] // 10 ** 6)
+        return frame
+
+    def index(self, now: int) -> int:
+        """
+        The tape candle open at `now` (or the last one before a gap), -1
+        before the tape starts.
+        """
+        return int(np.searchsorted(self.dates, now, side='right')) - 1
+
+    def partial(self, i: int, now: int) -> tuple:
+        """
+        (open, high, low, close, volume) of the part of tape candle `i`
+        traded by `now`: the price walks open -> low -> high -> close
+        (open -> high -> low -> close for a falling candle) in three equal
+        legs, on the tick grid.
+        """
+        c = self.candles
+        o, h, l, close, v = c['open'][i], c['high'][i], c['low'][i], c['close'][i], c['volume'][i]
+        traded = min(max((now - self.dates[i]) / self.step, 0.0), 1.0)
+        path = (o, l, h, close) if close >= o else (o, h, l, close)
+        leg = min(int(traded * 3), 2)
+        price = path[leg] + (path[leg + 1] - path[leg]) * (traded * 3 - leg)
+        price = round(price / self.tick) * self.tick
+        seen = path[:leg + 1] + (price,)
+        return o, max(seen), min(seen), price, v * traded
+
+    def forming(self, timeframe: str, now: int) -> Optional[list]:
+        """
+        [date, open, high, low, close, volume] of the `timeframe` candle in
+        progress at `now`, None before its first tape candle.
+        """
+        step = timeframe_seconds(timeframe) * 1000
+        bucket = now - now % step
+        i = self.index(now)
+        if i < 0 or self.dates[i] < bucket:
+            return None
+        j = int(np.searchsorted(self.dates, bucket))
+        o, h, l, close, v = self.partial(i, now)
+        if j < i:
+            c = self.candles
+            o = c['open'][j]
+            h = max(h, c['high'][j:i].max())
+            l = min(l, c['low'][j:i].min())
+            v += c['volume'][j:i].sum()
+        return [bucket, o, h, l, close, v]
+
+    def _row(self, candle, confirm: str, mark: bool) -> list:
+        date, o, h, l, close, v = candle
+        row = [str(int(date)), self.px(o), self.px(h), self.px(l), self.px(close)]
+        if not mark:
+            row += [_num(v / self.contract_value), _num(v), _num(v * close)]
+        return row + [confirm]
+
+    def candle_rows(self, timeframe: str, now: int, before: Optional[int] = None, after: Optional[int] = None,
+                    limit: int = 100, mark: bool = False) -> Optional[list]:
+        """
+        OKX candle rows newest first: the closed candles and the one in
+        progress with before < date < after, at most `limit`. None when the
+        timeframe can't be built from the tape.
+        """
+        frame = self.frame(timeframe)
+        if frame is None:
+            return None
+        step = timeframe_seconds(timeframe) * 1000
+        dates = frame['date']
+        closed = int(np.searchsorted(dates, now - step, side='right'))
+        lo = 0 if before is None else int(np.searchsorted(dates, before, side='right'))
+        hi = closed if after is None else min(closed, int(np.searchsorted(dates, after)))
+        rows = []
+        forming = self.forming(timeframe, now)
+        if forming is not None and (before is None or forming[0] > before) \
+                and (after is None or forming[0] < after) and (closed == 0 or forming[0] > dates[closed - 1]):
+            rows.append(self._row(forming, '0', mark))
+        columns = [frame[name] for name in ('date', 'open', 'high', 'low', 'close', 'volume')]
+        for k in range(hi - 1, max(lo, hi - (limit - len(rows))) - 1, -1):
+            rows.append(self._row([values[k] for values in columns], '1', mark))
+        return rows
+
+    def push_rows(self, timeframe: str, now: int, last_bucket: Optional[int]) -> tuple:
+        """
+        Websocket candle rows (oldest first) since the push of `last_bucket`:
+        the candle that closed since then, if any, and the one in progress.
+        Returns (rows, bucket in progress).
+        """
+        step = timeframe_seconds(timeframe) * 1000
+        bucket = now - now % step
+        rows = []
+        if last_bucket is not None and last_bucket < bucket:
+            frame = self.frame(timeframe)
+            k = int(np.searchsorted(frame['date'], last_bucket))
+            if k < len(frame['date']) and frame['date'][k] == last_bucket:
+                rows.append(self._row([frame[name][k] for name in ('date', 'open', 'high', 'low', 'close', 'volume')],
+                                      '1', False))
+        forming = self.forming(timeframe, now)
+        if forming is not None:
+            rows.append(self._row(forming, '0', False))
+        return rows, bucket
+
+    def last_price(self, now: int) -> Optional[float]:
+        i = self.index(now)
+        return None if i < 0 else self.partial(i, now)[3]
+
+    def ticker(self, now: int) -> Optional[dict]:
+        i = self.index(now)
+        if i < 0:
+            return None
+        c = self.candles
+        _, h, l, price, v = self.partial(i, now)
+        day = int(np.searchsorted(self.dates, now - DAY_MS, side='right'))
+        if day < i:
+            h = max(h, c['high'][day:i].max())
+            l = min(l, c['low'][day:i].min())
+            v += c['volume'][day:i].sum()
+        sod_utc0 = c['open'][max(self.index(now - now % DAY_MS), 0)]
+        utc8 = now + 8 * 3600 * 1000
+        sod_utc8 = c['open'][max(self.index(utc8 - utc8 % DAY_MS - 8 * 3600 * 1000), 0)]
+        size = self.level_size(i)
+        return {'instType': 'SWAP', 'instId': self.inst_id, 'last': self.px(price), 'lastSz': _num(LOT_SIZE),
+                'askPx': self.px(price + self.tick), 'askSz': size, 'bidPx': self.px(price), 'bidSz': size,
+                'open24h': self.px(c['open'][min(day, i)]), 'high24h': self.px(h), 'low24h': self.px(l),
+                'volCcy24h': _num(v), 'vol24h': _num(v / self.contract_value), 'sodUtc0': self.px(sod_utc0),
+                'sodUtc8': self.px(sod_utc8), 'ts': str(now)}
+
+    def level_size(self, i: int) -> str:
+        volume = self.candles['volume'][max(i - 60, 0):i + 1].mean()
+        contracts = max(round(volume * BOOK_LEVEL_SHARE / self.contract_value, 2), LOT_SIZE)
+        return _num(contracts)
+
+    def book(self, now: int, depth: int) -> Optional[dict]:
+        """
+        A `depth`-level order book one tick wide around the last price.
+        """
+        i = self.index(now)
+        if i < 0:
+            return None
+        price = self.partial(i, now)[3]
+        size = self.level_size(i)
+        return {'asks': [[self.px(price + (k + 1) * self.tick), size, '0', '1'] for k in range(depth)],
+                'bids': [[self.px(price - k * self.tick), size, '0', '1'] for k in range(depth)],
+                'ts': str(now)}
+
+    def funding_rate(self, now: int) -> dict:
+        """
+        The rate settled last at or before `now` (0 without funding data).
+        """
+        k = int(np.searchsorted(self.funding_dates, now, side='right')) - 1
+        rate = self.funding_rates[k] if k >= 0 else 0.0
+        settled = self.funding_dates[k] if k >= 0 else now - now % FUNDING_INTERVAL_MS
+        next_time = settled + FUNDING_INTERVAL_MS
+        return {'instType': 'SWAP', 'instId': self.inst_id, 'fundingRate': _num(rate), 'nextFundingRate': '',
+                'fundingTime': str(next_time), 'nextFundingTime': str(next_time + FUNDING_INTERVAL_MS),
+                'method': 'current_period', 'settState': 'settled', 'settFundingRate': _num(rate),
+                'premium': '0', 'interestRate': '0', 'ts': str(now)}
+
+    def funding_history(self, now: int, before: Optional[int], after: Optional[int], limit: int) -> list:
+        dates = self.funding_dates
+        lo = 0 if before is None else int(np.searchsorted(dates, before, side='right'))
+        hi = int(np.searchsorted(dates, now, side='right'))
+        if after is not None:
+            hi = min(hi, int(np.searchsorted(dates, after)))
+        return [{'instType': 'SWAP', 'instId': self.inst_id, 'fundingRate': _num(self.funding_rates[k]),
+                 'realizedRate': _num(self.funding_rates[k]), 'fundingTime': str(int(dates[k])),
+                 'method': 'current_period'} for k in range(hi - 1, max(lo, hi - limit) - 1, -1)]
+
+    def instrument(self) -> dict:
+        return {'instType': 'SWAP', 'instId': self.inst_id, 'uly': self.uly, 'instFamily': self.uly,
+                'baseCcy': '', 'quoteCcy': '', 'settleCcy': self.quote, 'ctVal': _num(self.contract_value),
+                'ctMult': '1', 'ctValCcy': self.base, 'ctType': 'linear', 'optType': '', 'stk': '',
+                'listTime': str(int(self.dates[0])), 'expTime': '', 'lever': str(TIERS[0][1]),
+                'tickSz': self.px(self.tick), 'lotSz': _num(LOT_SIZE), 'minSz': _num(LOT_SIZE),
+                'maxLmtSz': '100000000', 'maxMktSz': '100000000', 'maxLmtAmt': '', 'maxMktAmt': '',
+                'alias': '', 'state': 'live', 'ruleType': 'normal', 'category': '1'}
+
+    def tiers(self, margin_mode: str) -> list:
+        """
+        TIERS in contracts at the tape's first price.
+        """
+        contract = self.contract_value * self.candles['close'][0]
+        out, low = [], 0.0
+        for n, (notional, leverage, mmr) in enumerate(TIERS, 1):
+            high = round(notional / contract)
+            out.append({'tier': str(n), 'instId': '', 'uly': self.uly, 'instFamily': self.uly,
+                        'minSz': _num(low), 'maxSz': _num(high), 'mmr': _num(mmr), 'imr': _num(1 / leverage),
+                        'maxLever': str(leverage), 'optMgnFactor': '0', 'quoteMaxLoan': '', 'baseMaxLoan': '',
+                        'tdMode': margin_mode})
+            low = high
+        return out
+
+
+def load_tapes(config: dict, timeframe: str) -> List[Tape]:
+    """
+    A tape per config pair with candles of `timeframe`; pairs without are
+    left out (freqtrade then drops them from the whitelist).
+    """
+    datadir = config_datadir(config)
+    tapes = []
+    for pair in config_pairs(config):
+        candles = _series(pair_path(datadir, pair, timeframe), ['open', 'high', 'low', 'close', 'volume'])
+        if not len(candles['date']):
+            print(f'  {pair}: no {timeframe} candles in {datadir} - not listed')
+            continue
+        funding = _series(pair_path(datadir, pair, MARK_TIMEFRAME, 'funding_rate'), ['open'])
+        tapes.append(Tape(pair, timeframe, candles, funding))
+    return tapes
+
+
+def _bar_timeframe(bar: str) -> str:
+    """
+    OKX bar ('1m', '1H', '6Hutc', '1Dutc') -> freqtrade timeframe.
+    """
+    bar = bar.replace('utc', '')
+    return bar[:-1] + bar[-1].lower() if bar[-1] in 'HDW' else bar
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    # ccxt sends some timestamps as floats ('1654142750778.0')
+    return int(float(value)) if value not in (None, '') else None
+
+
+class ReplayServer:
+    """
+    The aiohttp application answering OKX's public REST and websocket API
+    from the tapes on a replay clock.
+    """
+
+    def __init__(self, tapes: List[Tape], clock: ReplayClock, push_interval: float = 0.5):
+        self.tapes = {tape.inst_id: tape for tape in tapes}
+        self.by_uly = {tape.uly: tape for tape in tapes}
+        self.clock = clock
+        self.push_interval = push_interval
+        self.requests: Counter = Counter()
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.pushes = 0
+        self.connections = 0
+        self._unknown = set()
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._timed])
+        routes = {
+            '/api/v5/public/time': self.public_time,
+            '/api/v5/public/instruments': self.instruments,
+            '/api/v5/public/funding-rate': self.funding_rate,
+            '/api/v5/public/funding-rate-history': self.funding_rate_history,
+            '/api/v5/public/position-tiers': self.position_tiers,
+            '/api/v5/market/ticker': self.ticker,
+            '/api/v5/market/tickers': self.tickers,
+            '/api/v5/market/books': self.books,
+            '/api/v5/market/candles': self.candles,
+            '/api/v5/market/history-candles': self.candles,
+            '/api/v5/market/mark-price-candles': self.mark_candles,
+            '/api/v5/market/history-mark-price-candles': self.mark_candles,
+        }
+        for path, handler in routes.items():
+            app.router.add_get(path, handler)
+        app.router.add_get('/ws/v5/{access}', self.websocket)
+        app.router.add_get('/replay/clock', self.replay_clock)
+        app.router.add_post('/replay/resume', self.replay_resume)
+        app.router.add_get('/replay/stats', self.replay_stats)
+        app.router.add_route('*', '/{tail:.*}', self.unsupported)
+        return app
+
+    @web.middleware
+    async def _timed(self, request: web.Request, handler):
+        if request.path.startswith('/ws/'):
+            return await handler(request)
+        started = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            self.requests[request.path] += 1
+            self.seconds[request.path] += time.perf_counter() - started
+
+    @staticmethod
+    def ok(data: list) -> web.Response:
+        return web.json_response({'code': '0', 'msg': '', 'data': data})
+
+    @staticmethod
+    def error(code: str, msg: str, status: int = 200) -> web.Response:
+        return web.json_response({'code': code, 'msg': msg, 'data': []}, status=status)
+
+    def _tape(self, request: web.Request) -> Optional[Tape]:
+        return self.tapes.get(request.query.get('instId', ''))
+
+    async def public_time(self, request: web.Request) -> web.Response:
+        return self.ok([{'ts': str(self.clock.now_ms())}])
+
+    async def instruments(self, request: web.Request) -> web.Response:
+        if request.query.get('instType') != 'SWAP':
+            return self.ok([])
+        return self.ok([tape.instrument() for tape in self.tapes.values()])
+
+    async def _candles(self, request: web.Request, mark: bool) -> web.Response:
+        tape = self._tape(request)
+        if tape is None:
+            return self.error('51001', "Instrument ID doesn't exist")
+        timeframe = _bar_timeframe(request.query.get('bar', '1m'))
+        limit = min(_int(request.query.get('limit')) or 100, 100 if mark else 300)
+        rows = tape.candle_rows(timeframe, self.clock.now_ms(), _int(request.query.get('before')),
+                                _int(request.query.get('after')), limit, mark)
+        if rows is None:
+            return self.error('51000', f'Parameter bar error: {tape.pair} replays {tape.timeframe} candles, '
+                                       f'{timeframe} is not a multiple')
+        return self.ok(rows)
+
+    async def candles(self, request: web.Request) -> web.Response:
+        return await self._candles(request, False)
+
+    async def mark_candles(self, request: web.Request) -> web.Response:
+        return await self._candles(request, True)
+
+    async def ticker(self, request: web.Request) -> web.Response:
+        tape = self._tape(request)
+        ticker = tape and tape.ticker(self.clock.now_ms())
+        return self.ok([ticker]) if ticker else self.error('51001', "Instrument ID doesn't exist")
+
+    async def tickers(self, request: web.Request) -> web.Response:
+        if request.query.get('instType') != 'SWAP':
+            return self.ok([])
+        now = self.clock.now_ms()
+        return self.ok([ticker for ticker in (tape.ticker(now) for tape in self.tapes.values()) if ticker])
+
+    async def books(self, request: web.Request) -> web.Response:
+        tape = self._tape(request)
+        book = tape and tape.book(self.clock.now_ms(), min(_int(request.query.get('sz')) or 1, 400))
+        return self.ok([book]) if book else self.error('51001', "Instrument ID doesn't exist")
+
+    async def funding_rate(self, request: web.Request) -> web.Response:
+        tape = self._tape(request)
+        if tape is None:
+            return self.error('51001', "Instrument ID doesn't exist")
+        return self.ok([tape.funding_rate(self.clock.now_ms())])
+
+    async def funding_rate_history(self, request: web.Request) -> web.Response:
+        tape = self._tape(request)
+        if tape is None:
+            return self.error('51001', "Instrument ID doesn't exist")
+        limit = min(_int(request.query.get('limit')) or 100, 100)
+        return self.ok(tape.funding_history(self.clock.now_ms(), _int(request.query.get('before')),
+                                            _int(request.query.get('after')), limit))
+
+    async def position_tiers(self, request: web.Request) -> web.Response:
+        uly = request.query.get('instFamily') or request.query.get('uly', '')
+        tape = self.by_uly.get(uly)
+        if tape is None:
+            return self.error('51001', "Instrument ID doesn't exist")
+        return self.ok(tape.tiers(request.query.get('tdMode', 'cross')))
+
+    async def unsupported(self, request: web.Request) -> web.Response:
+        if request.path not in self._unknown:
+            self._unknown.add(request.path)
+            print(f'  not replayed: {request.method} {request.path}')
+        if request.path.startswith(PRIVATE_PREFIXES):
+            return self.error('50113', 'okx_replay serves public endpoints only - run the bot in dry-run', 401)
+        return self.error('50000', f'okx_replay does not replay {request.path}', 404)
+
+    async def replay_clock(self, request: web.Request) -> web.Response:
+        return web.json_response(self.clock.state())
+
+    async def replay_resume(self, request: web.Request) -> web.Response:
+        self.clock.resume()
+        return web.json_response(self.clock.state())
+
+    async def replay_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict:
+        return {'clock': self.clock.state(), 'connections': self.connections, 'pushes': self.pushes,
+                'requests': {path: {'count': count, 'ms': round(self.seconds[path] * 1000, 3)}
+                             for path, count in self.requests.most_common()}}
+
+    def _subscription(self, arg: dict) -> Optional[str]:
+        """
+        Why a subscription can't be served, or None.
+        """
+        channel, inst_id = arg.get('channel', ''), arg.get('instId', '')
+        if inst_id not in self.tapes:
+            return f"channel:{channel},instId:{inst_id} doesn't exist"
+        if channel == 'tickers':
+            return None
+        if channel.startswith('candle') and not channel.startswith('candle-'):
+            if self.tapes[inst_id].frame(_bar_timeframe(channel[len('candle'):])) is not None:
+                return None
+        return f"channel:{channel},instId:{inst_id} doesn't exist"
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        # (channel, instId) -> bucket of the candle pushed last
+        subscriptions: Dict[tuple, Optional[int]] = {}
+        pusher = asyncio.ensure_future(self._push(ws, subscriptions))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                if message.data == 'ping':
+                    await ws.send_str('pong')
+                    continue
+                try:
+                    request_ = json.loads(message.data)
+                except ValueError:
+                    await ws.send_json({'event': 'error', 'code': '60012', 'msg': f'Illegal request: {message.data}'})
+                    continue
+                op = request_.get('op')
+                if op == 'login':
+                    await ws.send_json({'event': 'login', 'code': '0', 'msg': ''})
+                elif op in ('subscribe', 'unsubscribe'):
+                    for arg in request_.get('args', []):
+                        problem = self._subscription(arg)
+                        if problem:
+                            await ws.send_json({'event': 'error', 'code': '60018', 'msg': problem})
+                            continue
+                        key = (arg['channel'], arg['instId'])
+                        if op == 'subscribe':
+                            subscriptions.setdefault(key, None)
+                        else:
+                            subscriptions.pop(key, None)
+                        await ws.send_json({'event': op, 'arg': arg})
+                else:
+                    await ws.send_json({'event': 'error', 'code': '60012', 'msg': f'Illegal request: {message.data}'})
+        finally:
+            pusher.cancel()
+        return ws
+
+    async def _push(self, ws: web.WebSocketResponse, subscriptions: Dict[tuple, Optional[int]]) -> None:
+        """
+        Push the subscribed channels every `push_interval` seconds and right
+        after each candle close.
+        """
+        while not ws.closed:
+            now = self.clock.now_ms()
+            boundaries = []
+            for key in list(subscriptions):
+                channel, inst_id = key
+                tape = self.tapes[inst_id]
+                if channel == 'tickers':
+                    ticker = tape.ticker(now)
+                    data = [ticker] if ticker else []
+                else:
+                    timeframe = _bar_timeframe(channel[len('candle'):])
+                    data, subscriptions[key] = tape.push_rows(timeframe, now, subscriptions[key])
+                    step = timeframe_seconds(timeframe) * 1000
+                    boundaries.append(now - now % step + step)
+                if data:
+                    await ws.send_json({'arg': {'channel': channel, 'instId': inst_id}, 'data': data})
+                    self.pushes += 1
+            wait = self.push_interval
+            if boundaries:
+                # 1 ms past the close, so the candle is closed when pushed
+                wait = min(wait, max(self.clock.wall_at(min(boundaries) + 1) - _wall_time(), 0.0))
+            await asyncio.sleep(wait)
+
+
+def parse_start(value: str) -> int:
+    """
+    YYYYMMDD or YYYYMMDDHHMM (UTC) -> ms.
+    """
+    start = _real_datetime.strptime(value, '%Y%m%d%H%M' if len(value) == 12 else '%Y%m%d')
+    return int(start.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _iso(ms: int) -> str:
+    return _real_datetime.fromtimestamp(ms / 1000, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+
+def serve(args) -> int:
+    config = json.loads(resolve_config(args.config).read_text())
+    timeframe = args.tape_timeframe or config.get('timeframe', '5m')
+    print(f'Loading {timeframe} tapes for {args.config}')
+    tapes = load_tapes(config, timeframe)
+    if not tapes:
+        print('No pair has candles to replay')
+        return 1
+    step = timeframe_seconds(timeframe) * 1000
+    if args.start:
+        start = parse_start(args.start)
+    else:
+        start = max(int(tape.dates[0]) for tape in tapes) + DEFAULT_HISTORY_DAYS * DAY_MS
+    start -= start % step
+    end = min(int(tape.dates[-1]) for tape in tapes) + step
+    if start >= end:
+        print(f'--start {_iso(start)} is past the common end of the tapes ({_iso(end)})')
+        return 1
+    clock = ReplayClock(start, args.speed, held=args.hold)
+    server = ReplayServer(tapes, clock, args.push_interval)
+    app = server.app()
+
+    async def summary(app: web.Application) -> None:
+        print(json.dumps(server.stats(), indent=2))
+
+    app.on_cleanup.append(summary)
+    hours = (end - start) / 3600 / 1000
+    print(f'Replaying {len(tapes)} pairs from {_iso(start)} at {args.speed:g}x ({hours:.1f}h of tape, '
+          f'{hours * 3600 / args.speed:.0f}s wall) on http://{args.host}:{args.port}'
+          + (' - at 1x until POST /replay/resume' if args.hold else ''), flush=True)
+    web.run_app(app, host=args.host, port=args.port, print=None, access_log=None)
+    return 0
+
+
+class _ReplayDatetimeType(type):
+    # isinstance/issubclass checks against the patched datetime keep
+    # accepting datetimes made before the patch or by C code
+    def __instancecheck__(cls, instance) -> bool:
+        return isinstance(instance, _real_datetime)
+
+    def __subclasscheck__(cls, subclass) -> bool:
+        return issubclass(subclass, _real_datetime)
+
+
+def warp_clock(clock: ReplayClock) -> Callable[[], int]:
+    """
+    Move this process's time.time/time_ns/sleep onto `clock`, and
+    datetime.now/utcnow/today as freqtrade and ccxt see them: the names
+    their modules bound at import (`from time import time`, `from datetime
+    import datetime`, which dt_now() and dt_ts() read) are replaced by ones
+    reading `clock`. datetime.datetime itself stays the real class, so
+    datetimes still pickle (e.g. to the ML strategies' training workers).
+    Returns the function doing that replacement; call it again once more
+    modules are imported. Monotonic clocks (asyncio, perf_counter) keep
+    wall time.
+    """
+    class ReplayDatetime(_real_datetime, metaclass=_ReplayDatetimeType):
+        def __new__(cls, *args, **kwargs):
+            # Constructed datetimes are real ones
+            return _real_datetime(*args, **kwargs)
+
+        @classmethod
+        def now(cls, tz=None):
+            return _real_datetime.fromtimestamp(clock.now(), tz)
+
+        @classmethod
+        def utcnow(cls):
+            return _real_datetime.fromtimestamp(clock.now(), timezone.utc).replace(tzinfo=None)
+
+        @classmethod
+        def today(cls):
+            return cls.now()
+
+    def replay_sleep(seconds: float) -> None:
+        _wall_sleep(seconds / clock.rate)
+
+    def replay_time_ns() -> int:
+        return int(clock.now() * 10 ** 9)
+
+    replacements = ((_real_datetime, ReplayDatetime), (_wall_time, clock.now),
+                    (_wall_time_ns, replay_time_ns), (_wall_sleep, replay_sleep))
+
+    def patch_modules() -> int:
+        patched = 0
+        for name, module in list(sys.modules.items()):
+            if name.partition('.')[0] not in ('freqtrade', 'ccxt'):
+                continue
+            for attribute, value in list(vars(module).items()):
+                for real, replay in replacements:
+                    if value is real:
+                        setattr(module, attribute, replay)
+                        patched += 1
+        return patched
+
+    time.time = clock.now
+    time.time_ns = replay_time_ns
+    time.sleep = replay_sleep
+    patch_modules()
+    return patch_modules
+
+
+class DecisionRecorder:
+    """
+    Bot iteration times and candle-to-decision latencies, in wall seconds.
+    """
+
+    def __init__(self, clock: ReplayClock, timeframe: str):
+        self.clock = clock
+        self.step = timeframe_seconds(timeframe) * 1000
+        self.iterations: List[float] = []
+        self.latencies: List[float] = []
+        self.skipped = 0
+        # pair -> (first candle seen, last candle decided on)
+        self.candles: Dict[str, List[int]] = {}
+
+    def record(self, bot, started: float, finished: float) -> None:
+        self.iterations.append(finished - started)
+        if self.clock.held:
+            return
+        for pair in bot.active_pair_whitelist:
+            dataframe, _ = bot.dataprovider.get_analyzed_dataframe(pair, bot.strategy.timeframe)
+            if dataframe.empty:
+                continue
+            candle = int(dataframe['date'].iat[-1].timestamp() * 1000)
+            seen = self.candles.get(pair)
+            if seen is None:
+                # The first candle analysed is a baseline, not a decision
+                self.candles[pair] = [candle, candle]
+                continue
+            if candle <= seen[1]:
+                continue
+            self.skipped += (candle - seen[1]) // self.step - 1
+            seen[1] = candle
+            self.latencies.append(finished - self.clock.wall_at(candle + self.step))
+
+    def report(self) -> dict:
+        now = self.clock.now_ms()
+        last_closed = now - now % self.step - self.step
+        closed = sum(max((last_closed - first) // self.step, 0) for first, _ in self.candles.values())
+        decided = len(self.latencies)
+
+        def quantiles(values: List[float]) -> dict:
+            if not values:
+                return {}
+            ms = np.asarray(values) * 1000
+            return {'p50': round(float(np.percentile(ms, 50)), 3), 'p95': round(float(np.percentile(ms, 95)), 3),
+                    'max': round(float(ms.max()), 3), 'mean': round(float(ms.mean()), 3)}
+
+        wall = 0.0 if self.clock.held else _wall_time() - self.clock.wall_start
+        return {'wall_seconds': round(wall, 3), 'replayed_seconds': round(wall * self.clock.speed, 1),
+                'iterations': len(self.iterations), 'iteration_ms': quantiles(self.iterations),
+                'candles_closed': int(closed), 'candles_decided': decided, 'candles_skipped': int(self.skipped),
+                'decided_share': round(decided / closed, 4) if closed else None,
+                'decisions_per_wall_second': round(decided / wall, 3) if wall else None,
+                'latency_ms': quantiles(self.latencies),
+                'latency_replayed_seconds': {key: round(value * self.clock.speed / 1000, 3)
+                                             for key, value in quantiles(self.latencies).items()}}
+
+
+def _get(url: str, data: Optional[bytes] = None, timeout: float = 5.0) -> dict:
+    with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=timeout) as response:
+        return json.load(response)
+
+
+def wait_for_server(url: str, process: subprocess.Popen, timeout: float = 120.0) -> dict:
+    deadline = _wall_time() + timeout
+    while True:
+        try:
+            return _get(url + '/replay/clock', timeout=1.0)
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f'replay server exited with code {process.returncode}')
+            if _wall_time() > deadline:
+                raise
+            _wall_sleep(0.2)
+
+
+def bot_overlay(url: str, speed: float, config: dict) -> dict:
+    """
+    Config merged over the bot's `config`: dry-run against the replay
+    server, its API server and Telegram (if configured) disabled.
+    """
+    ccxt = {'urls': {'api': {'rest': url, 'ws': 'ws' + url[len('http'):] + '/ws/v5'}},
+            # ccxt pings the websocket on the wall clock but times the
+            # pongs on the (replayed) time.time
+            'streaming': {'maxPingPongMisses': 2.0 * speed + 2}}
+    overlay = {'dry_run': True, 'db_url': 'sqlite://', 'initial_state': 'running',
+               'exchange': {'name': 'okx', 'key': '', 'secret': '', 'password': '', 'api_key': '',
+                            'ccxt_config': ccxt, 'ccxt_async_config': ccxt}}
+    for section in ('api_server', 'telegram'):
+        if section in config:
+            overlay[section] = {'enabled': False}
+    return overlay
+
+
+class DurationElapsed(Exception):
+    """
+    Ends the bot's Worker loop once bench's --duration is over.
+    """
+
+
+def run_bot(args, clock: ReplayClock, url: str, workdir: Path) -> dict:
+    """
+    Run the dry-run bot against the replay server for --duration wall
+    seconds and return its DecisionRecorder report.
+    """
+    from freqtrade.commands import Arguments
+    from freqtrade.configuration.directory_operations import create_userdata_dir
+    from freqtrade.configuration.load_config import load_config_file
+    from freqtrade.freqtradebot import FreqtradeBot
+    from freqtrade.worker import Worker
+
+    patch_modules = warp_clock(clock)
+
+    overlay = workdir / 'replay-overlay.json'
+    config_file = str(resolve_config(args.config))
+    overlay.write_text(json.dumps(bot_overlay(url, clock.speed, load_config_file(config_file))))
+    # A scratch user_data dir keeps replayed leverage tiers out of the real cache
+    userdir = create_userdata_dir(str(workdir / 'user_data'), create_dir=True)
+    argv = ['trade', '--config', config_file, '--config', str(overlay),
+            '--strategy', args.strategy, '--strategy-path', str(USER_DATA / 'strategies'),
+            '--userdir', str(userdir), '--db-url', 'sqlite://']
+    if args.logfile:
+        argv += ['--logfile', args.logfile]
+    parsed = Arguments(argv).get_parsed_arg()
+
+    recorder: Optional[DecisionRecorder] = None
+    process = FreqtradeBot.process
+
+    def timed_process(bot) -> None:
+        started = _wall_time()
+        process(bot)
+        recorder.record(bot, started, _wall_time())
+
+    FreqtradeBot.process = timed_process
+    worker = Worker(parsed)
+    # Modules the bot imported while starting up (exchange, pairlists, rpc)
+    patch_modules()
+    recorder = DecisionRecorder(clock, worker.freqtrade.config['timeframe'])
+    # The bot has its markets and history: speed the market up
+    state = _get(url + '/replay/resume', data=b'')
+    clock.start, clock.wall_start, clock.held = state['start'], state['wall_start'], state['held']
+    deadline = _wall_time() + args.duration
+    iterate = worker._worker
+
+    def bounded_iterate(old_state):
+        # Checked between iterations, so the bot never stops halfway through
+        # one (e.g. inside a database transaction)
+        if _wall_time() >= deadline:
+            raise DurationElapsed
+        return iterate(old_state=old_state)
+
+    worker._worker = bounded_iterate
+    try:
+        worker.run()
+    except DurationElapsed:
+        pass
+    finally:
+        worker.exit()
+    return recorder.report()
+
+
+def bench(args) -> int:
+    url = f'http://{args.host}:{args.port}'
+    command = [sys.executable, str(Path(__file__).resolve()), 'serve', '--config', args.config,
+               '--speed', str(args.speed), '--host', args.host, '--port', str(args.port), '--hold',
+               '--push-interval', str(args.push_interval)]
+    if args.start:
+        command += ['--start', args.start]
+    if args.tape_timeframe:
+        command += ['--tape-timeframe', args.tape_timeframe]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    lines: List[str] = []
+    reader = threading.Thread(target=lambda: lines.extend(server.stdout), daemon=True)
+    reader.start()
+    try:
+        clock = ReplayClock.from_state(wait_for_server(url, server))
+        with tempfile.TemporaryDirectory(prefix='okx_replay_') as workdir:
+            report = run_bot(args, clock, url, Path(workdir))
+        report['server'] = _get(url + '/replay/stats')
+    except Exception:
+        print(''.join(lines), end='')
+        raise
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    report = {'config': args.config, 'strategy': args.strategy, 'speed': args.speed,
+              'start': _iso(report['server']['clock']['start']), **report}
+
+    print(f'\n{args.strategy} on {args.config} at {args.speed:g}x from {report["start"]}: '
+          f'{report["wall_seconds"]:.0f}s wall = {report["replayed_seconds"] / 60:.0f} replayed minutes')
+    print(f'  iterations            {report["iterations"]}  ' + _format(report['iteration_ms'], 'ms'))
+    print(f'  candles decided       {report["candles_decided"]} of {report["candles_closed"]} closed '
+          f'({report["candles_skipped"]} skipped), {report["decisions_per_wall_second"]}/s')
+    print('  close -> decision     ' + _format(report['latency_ms'], 'ms'))
+    print('  (replayed time)       ' + _format(report['latency_replayed_seconds'], 's'))
+    requests = report['server']['requests']
+    print(f'  server                {sum(r["count"] for r in requests.values())} requests, '
+          f'{report["server"]["pushes"]} websocket pushes')
+    for path, row in list(requests.items())[:8]:
+        print(f'    {path:<44} {row["count"]:>6}  {row["ms"]:>9.1f} ms')
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2))
+        print(f'Report written to {args.report}')
+    return 0
+
+
+def _format(quantiles: dict, unit: str) -> str:
+    return '  '.join(f'{key} {value:g}{unit}' for key, value in quantiles.items()) or '-'
+
+
+def _speed(value: str) -> float:
+    speed = float(value)
+    if not 1.0 <= speed <= MAX_SPEED:
+        raise argparse.ArgumentTypeError(f'speed must be between 1 and {MAX_SPEED:g}')
+    return speed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('serve', 'bench'):
+        p = sub.add_parser(name)
+        p.add_argument('--config', default=DEFAULT_CONFIG, help='config whose pairs (and timeframe) are replayed')
+        p.add_argument('--speed', type=_speed, default=1.0, help=f'replayed seconds per wall second (1-{MAX_SPEED:g})')
+        p.add_argument('--start', default='', help='YYYYMMDD[HHMM] UTC (default: a day into the common data)')
+        p.add_argument('--tape-timeframe', default='', help='candle files replayed (default: the config timeframe)')
+        p.add_argument('--host', default='127.0.0.1')
+        p.add_argument('--port', type=int, default=DEFAULT_PORT)
+        p.add_argument('--push-interval', type=float, default=0.5,
+                       help='wall seconds between websocket pushes within a candle')
+    sub.choices['serve'].add_argument('--hold', action='store_true',
+                                      help='run at 1x until POST /replay/resume')
+    bench_parser = sub.choices['bench']
+    bench_parser.add_argument('--strategy', default=DEFAULT_STRATEGY)
+    bench_parser.add_argument('--duration', type=float, default=120.0, help='wall seconds to run the bot')
+    bench_parser.add_argument('--report', default='', help='write the report as JSON')
+    bench_parser.add_argument('--logfile', default='', help="the bot's log file (default: stderr)")
+    args = parser.parse_args()
+    return serve(args) if args.command == 'serve' else bench(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
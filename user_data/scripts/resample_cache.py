@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Higher-timeframe candles derived from one downloaded base timeframe.
+
+The 1m candles of a pair are aggregated into 5m/15m/1h (any multiple) in
+one vectorized pass: bucket starts are found with a single comparison of
+the floored dates, and open/high/low/close/volume are reduced per bucket
+with ufunc.reduceat. Each timeframe is built from the coarsest one already
+built that divides it (1h from 15m from 5m), so only the first step reads
+every 1m row. The last bucket is dropped until the base candles complete
+it, as exchanges only serve closed candles.
+
+Results are persisted in <datadir>/.resampled (feather plus a JSON sidecar
+of the base file's state). When the base file was appended to, only the
+buckets from the first one the new candles can touch are recomputed and
+appended; rewritten history rebuilds the file. `verify` compares the
+derived candles with downloaded files of the same timeframe, and `install`
+writes derived candles under freqtrade's file name for pairs that have no
+download of that timeframe, so one 1m download serves every timeframe.
+Usage: python resample_cache.py build [--config okx-futures] [--pairs ...] [--timeframes 5m 15m 1h]
+       python resample_cache.py verify [--pairs ...] [--timeframes 5m 15m 1h]
+       python resample_cache.py install [--pairs ...] [--timeframes 5m 15m 1h]
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from backtest_matrix import config_datadir, config_pairs, resolve_config  # noqa: E402
+from data_catalog import timeframe_seconds  # noqa: E402
+from data_loader import load_table, pair_path  # noqa: E402
+
+RESAMPLE_DIR = '.resampled'
+RESAMPLE_VERSION = 1
+BASE_TIMEFRAME = '1m'
+TIMEFRAMES = ('5m', '15m', '1h')
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+# Relative differences verify tolerates: prices are copied, volumes summed
+PRICE_TOLERANCE = 1e-12
+VOLUME_TOLERANCE = 1e-6
+# Installed files are listed here so verify does not compare them with themselves
+INSTALLED_FILE = 'installed.json'
+
+
+def _series(path: Path) -> Dict[str, np.ndarray]:
+    """
+    Date (int64 ns) and OHLCV of a candle file as numpy arrays.
+    """
+    if not path.is_file():
+        return {'date': np.array([], dtype=np.int64), **{c: np.array([]) for c in PRICE_COLUMNS + ('volume',)}}
+    table = load_table(path, columns=list(PRICE_COLUMNS) + ['volume'])
+    out = {'date': table.column('date').cast(pa.timestamp('ns', tz='UTC')).to_numpy().astype(np.int64)}
+    for column in PRICE_COLUMNS + ('volume',):
+        out[column] = table.column(column).to_numpy(zero_copy_only=False).astype(np.float64)
+    return out
+
+
+def resample(candles: Dict[str, np.ndarray], base: str, timeframe: str) -> Dict[str, np.ndarray]:
+    """
+    `candles` (sorted, timeframe `base`) aggregated into `timeframe`
+    buckets aligned to the epoch, without the last bucket if `candles` do
+    not reach its final `base` candle. Buckets with no candle are absent.
+    """
+    step = timeframe_seconds(timeframe) * 10 ** 9
+    base_step = timeframe_seconds(base) * 10 ** 9
+    if step % base_step:
+        raise ValueError(f'{timeframe} is not a multiple of {base}')
+    dates = candles['date']
+    if not len(dates):
+        return {name: values[:0] for name, values in candles.items()}
+    bucket = dates - dates % step
+    starts = np.flatnonzero(np.concatenate([[True], bucket[1:] != bucket[:-1]]))
+    ends = np.concatenate([starts[1:], [len(dates)]]) - 1
+    out = {
+        'date': bucket[starts],
+        'open': candles['open'][starts],
+        'high': np.maximum.reduceat(candles['high'], starts),
+        'low': np.minimum.reduceat(candles['low'], starts),
+        'close': candles['close'][ends],
+        'volume': np.add.reduceat(candles['volume'], starts),
+    }
+    if dates[-1] < out['date'][-1] + step - base_step:
+        out = {name: values[:-1] for name, values in out.items()}
+    return out
+
+
+def resample_all(candles: Dict[str, np.ndarray], base: str, timeframes: List[str]) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Every timeframe of `timeframes`, each built from the coarsest one
+    already built that divides it.
+    """
+    built = {base: candles}
+    for timeframe in sorted(timeframes, key=timeframe_seconds):
+        seconds = timeframe_seconds(timeframe)
+        source = max((tf for tf in built if seconds % timeframe_seconds(tf) == 0), key=timeframe_seconds)
+        built[timeframe] = resample(built[source], source, timeframe)
+    return {timeframe: built[timeframe] for timeframe in timeframes}
+
+
+def cache_path(datadir: Path, pair: str, timeframe: str) -> Path:
+    return Path(datadir) / RESAMPLE_DIR / pair_path(datadir, pair, timeframe).name
+
+
+def _table(candles: Dict[str, np.ndarray]) -> pa.Table:
+    columns = {'date': pa.array(candles['date'], pa.timestamp('ns', tz='UTC'))}
+    columns.update({c: pa.array(candles[c], pa.float64()) for c in PRICE_COLUMNS + ('volume',)})
+    return pa.table(columns)
+
+
+def _replace(path: Path, table: pa.Table) -> None:
+    path.parent.mkdir(exist_ok=True)
+    tmp = path.with_suffix('.feather.tmp')
+    with ipc.new_file(str(tmp), table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def refresh(datadir: Path, pair: str, timeframes: List[str] = TIMEFRAMES, base: str = BASE_TIMEFRAME,
+            force: bool = False) -> Dict[str, dict]:
+    """
+    Bring a pair's derived timeframes up to date and return their
+    sidecars. Buckets the appended base candles cannot change are kept
+    as stored.
+    """
+    datadir = Path(datadir)
+    source = pair_path(datadir, pair, base)
+    stat = source.stat() if source.is_file() else None
+    state = {'file': source.name, 'size': stat.st_size if stat else 0, 'mtime_ns': stat.st_mtime_ns if stat else 0}
+
+    stored: Dict[str, Optional[dict]] = {}
+    for timeframe in timeframes:
+        path = cache_path(datadir, pair, timeframe)
+        sidecar = path.with_suffix('.json')
+        entry = None
+        if not force and sidecar.is_file() and path.is_file():
+            try:
+                entry = json.loads(sidecar.read_text())
+            except (OSError, ValueError):
+                entry = None
+        if entry is not None and (entry.get('version') != RESAMPLE_VERSION or entry['source']['file'] != source.name):
+            entry = None
+        stored[timeframe] = entry
+    if all(entry is not None and entry['source']['size'] == state['size']
+           and entry['source']['mtime_ns'] == state['mtime_ns'] for entry in stored.values()):
+        return {tf: dict(entry, recomputed=0) for tf, entry in stored.items()}
+
+    candles = _series(source)
+    dates = candles['date']
+    state.update(start=int(dates[0]) if len(dates) else None, end=int(dates[-1]) if len(dates) else None)
+
+    # Appended base candles can only change buckets from the one holding the
+    # first candle after the stored end; the coarsest timeframe sets how far
+    # back the base candles have to be re-read
+    keep_from: Dict[str, Optional[int]] = {}
+    for timeframe, entry in stored.items():
+        since = None
+        if entry is not None and entry['source']['start'] == state['start'] \
+                and entry['source']['end'] is not None and entry['source']['end'] <= (state['end'] or -1):
+            step = timeframe_seconds(timeframe) * 10 ** 9
+            first_new = entry['source']['end'] + timeframe_seconds(base) * 10 ** 9
+            since = first_new - first_new % step
+        keep_from[timeframe] = since
+    incremental = all(since is not None for since in keep_from.values())
+    read_from = min(keep_from.values()) if incremental and keep_from else None
+    first = int(np.searchsorted(dates, read_from, side='left')) if read_from is not None else 0
+    new = resample_all({name: values[first:] for name, values in candles.items()}, base, list(timeframes))
+
+    entries = {}
+    for timeframe in timeframes:
+        path = cache_path(datadir, pair, timeframe)
+        derived = new[timeframe]
+        keep = 0
+        if incremental:
+            # Buckets before keep_from[timeframe] are stored; anything the
+            # wider re-read recomputed before that is identical and dropped
+            start = int(np.searchsorted(derived['date'], keep_from[timeframe], side='left'))
+            derived = {name: values[start:] for name, values in derived.items()}
+            old = load_table(path).replace_schema_metadata(None)
+            keep = int(np.searchsorted(old.column('date').cast(pa.int64()).to_numpy(),
+                                       keep_from[timeframe], side='left'))
+            table = pa.concat_tables([old.slice(0, keep), _table(derived)])
+        else:
+            table = _table(derived)
+        _replace(path, table)
+        entry = {'version': RESAMPLE_VERSION, 'pair': pair, 'timeframe': timeframe, 'base': base,
+                 'rows': table.num_rows, 'source': state}
+        sidecar = path.with_suffix('.json')
+        tmp = sidecar.with_suffix('.json.tmp')
+        tmp.write_text(json.dumps(entry, indent=2))
+        os.replace(tmp, sidecar)
+        entries[timeframe] = dict(entry, recomputed=table.num_rows - keep)
+    return entries
+
+
+def load_resampled(datadir: Path, pair: str, timeframe: str, timerange: str = '', startup_candles: int = 0,
+                   base: str = BASE_TIMEFRAME) -> pd.DataFrame:
+    """
+    A pair's derived candles for a timerange (refreshed first), shaped
+    like load_ohlcv()'s.
+    """
+    refresh(datadir, pair, [timeframe], base)
+    table = load_table(cache_path(datadir, pair, timeframe), timerange, startup_candles)
+    return table.replace_schema_metadata(None).to_pandas()
+
+
+def _installed(datadir: Path) -> List[str]:
+    path = Path(datadir) / RESAMPLE_DIR / INSTALLED_FILE
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return []
+
+
+def install(datadir: Path, pair: str, timeframe: str) -> bool:
+    """
+    Write the derived candles where freqtrade looks for `timeframe`,
+    unless a file is already there. Returns whether it wrote one.
+    """
+    target = pair_path(datadir, pair, timeframe)
+    installed = _installed(datadir)
+    if target.is_file() and target.name not in installed:
+        return False
+    _replace(target, load_table(cache_path(datadir, pair, timeframe)).replace_schema_metadata(None))
+    if target.name not in installed:
+        path = Path(datadir) / RESAMPLE_DIR / INSTALLED_FILE
+        path.write_text(json.dumps(sorted(installed + [target.name]), indent=2))
+    return True
+
+
+def verify(datadir: Path, pair: str, timeframe: str) -> Optional[dict]:
+    """
+    Derived vs downloaded candles of `timeframe` over the dates both have:
+    rows compared, rows differing beyond the tolerances, the largest
+    relative differences, and buckets only one side has. None when there
+    is no downloaded file to compare with.
+    """
+    downloaded = pair_path(datadir, pair, timeframe)
+    if not downloaded.is_file() or downloaded.name in _installed(datadir):
+        return None
+    derived = _series(cache_path(datadir, pair, timeframe))
+    reference = _series(downloaded)
+    if not len(derived['date']) or not len(reference['date']):
+        return {'compared': 0}
+    # Compare within the span both cover; outside it one side simply has no data
+    lo = max(derived['date'][0], reference['date'][0])
+    hi = min(derived['date'][-1], reference['date'][-1])
+    both, i, j = np.intersect1d(derived['date'], reference['date'], assume_unique=True, return_indices=True)
+    result = {
+        'compared': len(both),
+        'only_derived': int(((derived['date'] >= lo) & (derived['date'] <= hi)).sum()) - len(both),
+        'only_downloaded': int(((reference['date'] >= lo) & (reference['date'] <= hi)).sum()) - len(both),
+    }
+    if not len(both):
+        return result
+    mismatched = np.zeros(len(both), dtype=bool)
+    for column in PRICE_COLUMNS + ('volume',):
+        a, b = derived[column][i], reference[column][j]
+        relative = np.abs(a - b) / np.maximum(np.abs(b), 1e-300)
+        mismatched |= relative > (VOLUME_TOLERANCE if column == 'volume' else PRICE_TOLERANCE)
+        result[f'max_rel_diff_{column}'] = float(relative.max())
+    result['mismatched'] = int(mismatched.sum())
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', choices=('build', 'verify', 'install'))
+    parser.add_argument('--config', default='okx-futures', help='config name or path (pairs, datadir)')
+    parser.add_argument('--pairs', nargs='*', help='default: the config whitelist')
+    parser.add_argument('--base', default=BASE_TIMEFRAME, help='downloaded timeframe to derive from')
+    parser.add_argument('--timeframes', nargs='+', default=list(TIMEFRAMES))
+    parser.add_argument('--force', action='store_true', help='rebuild instead of refreshing incrementally')
+    args = parser.parse_args()
+
+    config = json.loads(resolve_config(args.config).read_text())
+    datadir = config_datadir(config)
+    pairs = args.pairs or config_pairs(config)
+    failed = False
+    for pair in pairs:
+        if not pair_path(datadir, pair, args.base).is_file():
+            print(f'{pair}: no {args.base} candles')
+            continue
+        entries = refresh(datadir, pair, args.timeframes, args.base, args.force)
+        for timeframe, entry in entries.items():
+            if args.command == 'build':
+                print(f'{pair} {timeframe}: {entry["rows"]} rows, {entry["recomputed"]} recomputed')
+            elif args.command == 'install':
+                written = install(datadir, pair, timeframe)
+                print(f'{pair} {timeframe}: {"installed" if written else "downloaded file kept"}')
+            else:
+                result = verify(datadir, pair, timeframe)
+                if result is None:
+                    print(f'{pair} {timeframe}: no downloaded file to verify against')
+                    continue
+                failed |= bool(result.get('mismatched'))
+                print(f'{pair} {timeframe}: {json.dumps(result)}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
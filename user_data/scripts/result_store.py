@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+SQLite store for the freqtrade backtest results.
+
+`ingest` reads each backtest-result-*.zip / .meta.json pair once into
+<results>/results.sqlite. The store has one row per strategy run (keyed
+by the meta run_id), one row per trade and one row per scalar metric.
+Strategy sources, configs and market_change frames are stored once per
+content hash, so repeated runs of the same code add no copies. The query
+commands then read the indexed tables instead of unzipping every run.
+Usage: python result_store.py [--results DIR] [--db FILE] ingest [--prune] [ZIP ...]
+       python result_store.py best [--metric profit_factor] [--strategy NAME] [--lowest]
+       python result_store.py [runs|trades RUN_ID|extract RUN_ID KIND|sql QUERY]
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import zipfile
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+USER_DATA = Path(__file__).resolve().parents[1]
+DEFAULT_RESULTS = USER_DATA / 'backtest_results'
+DB_NAME = 'results.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ingested TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    strategy TEXT NOT NULL,
+    file TEXT NOT NULL,
+    timerange TEXT,
+    timeframe TEXT,
+    timeframe_detail TEXT,
+    backtest_start_ts INTEGER,
+    backtest_end_ts INTEGER,
+    run_start_time INTEGER,
+    trading_mode TEXT,
+    pairs TEXT,
+    source_hash TEXT,
+    config_hash TEXT,
+    market_change_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_strategy ON runs (strategy, timerange);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (key, run_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS trades (
+    run_id TEXT NOT NULL,
+    pair TEXT NOT NULL,
+    is_short INTEGER,
+    open_ts INTEGER,
+    close_ts INTEGER,
+    open_rate REAL,
+    close_rate REAL,
+    amount REAL,
+    stake_amount REAL,
+    leverage REAL,
+    profit_ratio REAL,
+    profit_abs REAL,
+    funding_fees REAL,
+    trade_duration INTEGER,
+    exit_reason TEXT,
+    enter_tag TEXT,
+    is_open INTEGER
+);
+CREATE INDEX IF NOT EXISTS trades_run ON trades (run_id, pair);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    compressed INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+TRADE_COLUMNS = ['pair', 'is_short', 'open_timestamp', 'close_timestamp', 'open_rate', 'close_rate', 'amount',
+                 'stake_amount', 'leverage', 'profit_ratio', 'profit_abs', 'funding_fees', 'trade_duration',
+                 'exit_reason', 'enter_tag', 'is_open']
+
+
+def connect(db: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db))
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def put_blob(conn: sqlite3.Connection, kind: str, data: bytes) -> str:
+    """
+    Store `data` once under its sha256 and return the hash. Feather files
+    are already compressed and are kept as they are.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    if conn.execute('SELECT 1 FROM blobs WHERE hash = ?', (digest,)).fetchone() is None:
+        compressed = kind != 'market_change'
+        conn.execute('INSERT INTO blobs VALUES (?, ?, ?, ?, ?)',
+                     (digest, kind, int(compressed), len(data), zlib.compress(data, 6) if compressed else data))
+    return digest
+
+
+def get_blob(conn: sqlite3.Connection, digest: str) -> Optional[bytes]:
+    row = conn.execute('SELECT compressed, data FROM blobs WHERE hash = ?', (digest,)).fetchone()
+    if row is None:
+        return None
+    return zlib.decompress(row[1]) if row[0] else bytes(row[1])
+
+
+def _member(names: List[str], suffix: str) -> Optional[str]:
+    return next((n for n in names if n.endswith(suffix)), None)
+
+
+def ingest_file(conn: sqlite3.Connection, meta_path: Path) -> int:
+    """
+    Ingest one .meta.json and its zip (if present); returns the number of
+    runs written. A run_id already stored from a newer backtest is kept.
+    """
+    stem = meta_path.name[:-len('.meta.json')]
+    meta = json.loads(meta_path.read_text())
+    zip_path = meta_path.with_name(f'{stem}.zip')
+    results, config_hash, market_hash, sources = {}, None, None, {}
+    if zip_path.is_file():
+        with zipfile.ZipFile(zip_path) as archive:
+            names = archive.namelist()
+            results = json.loads(archive.read(f'{stem}.json'))['strategy']
+            if (name := _member(names, '_config.json')) is not None:
+                config_hash = put_blob(conn, 'config', archive.read(name))
+            if (name := _member(names, '_market_change.feather')) is not None:
+                market_hash = put_blob(conn, 'market_change', archive.read(name))
+            for strategy in meta:
+                if (name := _member(names, f'_{strategy}.py')) is not None:
+                    sources[strategy] = put_blob(conn, 'source', archive.read(name))
+
+    written = 0
+    for strategy, info in meta.items():
+        run_id = info['run_id']
+        existing = conn.execute('SELECT run_start_time FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+        if existing is not None and (existing[0] or 0) > info.get('backtest_start_time', 0):
+            continue
+        result = results.get(strategy, {})
+        conn.execute('DELETE FROM metrics WHERE run_id = ?', (run_id,))
+        conn.execute('DELETE FROM trades WHERE run_id = ?', (run_id,))
+        conn.execute('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+            run_id, strategy, stem, result.get('timerange') or _timerange(info),
+            info.get('timeframe'), info.get('timeframe_detail') or None,
+            info.get('backtest_start_ts'), info.get('backtest_end_ts'), info.get('backtest_start_time'),
+            result.get('trading_mode'), json.dumps(result['pairlist']) if 'pairlist' in result else None,
+            sources.get(strategy), config_hash, market_hash,
+        ))
+        conn.executemany('INSERT INTO metrics VALUES (?, ?, ?)', [
+            (run_id, key, float(value)) for key, value in result.items() if isinstance(value, (int, float))
+        ])
+        conn.executemany(f'INSERT INTO trades VALUES ({", ".join("?" * (len(TRADE_COLUMNS) + 1))})', [
+            (run_id, *(trade.get(c) for c in TRADE_COLUMNS)) for trade in result.get('trades', [])
+        ])
+        written += 1
+    return written
+
+
+def _timerange(info: dict) -> Optional[str]:
+    if not info.get('backtest_start_ts') or not info.get('backtest_end_ts'):
+        return None
+    start, end = (datetime.fromtimestamp(info[k], tz=timezone.utc).strftime('%Y%m%d')
+                  for k in ('backtest_start_ts', 'backtest_end_ts'))
+    return f'{start}-{end}'
+
+
+def ingest(conn: sqlite3.Connection, results_dir: Path, files: Iterable[Path] = (), prune: bool = False) -> tuple:
+    """
+    Ingest every result pair whose zip/meta changed since its last ingest.
+    With `prune`, the ingested zip and meta files are deleted afterwards.
+    Returns (files ingested, runs written).
+    """
+    metas = [Path(str(f).replace('.zip', '.meta.json')) for f in files] or \
+        sorted(Path(results_dir).glob('backtest-result-*.meta.json'))
+    count = runs = 0
+    for meta_path in metas:
+        zip_path = meta_path.with_name(meta_path.name.replace('.meta.json', '.zip'))
+        stats = [p.stat() for p in (meta_path, zip_path) if p.is_file()]
+        size, mtime = sum(s.st_size for s in stats), max(s.st_mtime_ns for s in stats)
+        row = conn.execute('SELECT size, mtime_ns FROM files WHERE name = ?', (meta_path.name,)).fetchone()
+        if row != (size, mtime):
+            with conn:
+                runs += ingest_file(conn, meta_path)
+                conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                             (meta_path.name, size, mtime, datetime.now(timezone.utc).isoformat()))
+            count += 1
+        if prune:
+            for path in (meta_path, zip_path):
+                path.unlink(missing_ok=True)
+    return count, runs
+
+
+def best(conn: sqlite3.Connection, metric: str = 'profit_factor', strategy: Optional[str] = None,
+         lowest: bool = False) -> List[tuple]:
+    """
+    (strategy, timerange, run_id, value, trades) of the best run per
+    strategy and timerange by `metric`.
+    """
+    return conn.execute(f"""
+        SELECT strategy, timerange, run_id, value, trades FROM (
+            SELECT r.strategy, r.timerange, r.run_id, m.value,
+                   (SELECT value FROM metrics t WHERE t.key = 'total_trades' AND t.run_id = r.run_id) AS trades,
+                   ROW_NUMBER() OVER (PARTITION BY r.strategy, r.timerange
+                                      ORDER BY m.value {'ASC' if lowest else 'DESC'}) AS rank
+            FROM metrics m JOIN runs r USING (run_id)
+            WHERE m.key = ? AND (? IS NULL OR r.strategy = ?)
+        ) WHERE rank = 1 ORDER BY strategy, timerange
+    """, (metric, strategy, strategy)).fetchall()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--results', default=str(DEFAULT_RESULTS))
+    parser.add_argument('--db', help=f'default: <results>/{DB_NAME}')
+    sub = parser.add_subparsers(dest='command', required=True)
+    ing = sub.add_parser('ingest', help='load new or changed results into the store')
+    ing.add_argument('files', nargs='*', help='default: every result in --results')
+    ing.add_argument('--prune', action='store_true', help='delete the zip/meta files once ingested')
+    top = sub.add_parser('best', help='best run per strategy and timerange')
+    top.add_argument('--metric', default='profit_factor')
+    top.add_argument('--strategy')
+    top.add_argument('--lowest', action='store_true', help='smallest value wins (e.g. max_drawdown_account)')
+    sub.add_parser('runs', help='list the stored runs').add_argument('--strategy')
+    sub.add_parser('trades', help='trades of one run').add_argument('run_id')
+    ext = sub.add_parser('extract', help='write a stored strategy source, config or market_change')
+    ext.add_argument('run_id')
+    ext.add_argument('kind', choices=['source', 'config', 'market_change'])
+    ext.add_argument('-o', '--output', help='default: stdout')
+    sub.add_parser('sql', help='run a query').add_argument('query')
+    args = parser.parse_args()
+
+    results_dir = Path(args.results)
+    conn = connect(Path(args.db) if args.db else results_dir / DB_NAME)
+
+    if args.command == 'ingest':
+        count, runs = ingest(conn, results_dir, [Path(f) for f in args.files], args.prune)
+        total = conn.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+        print(f'{count} result files ingested, {runs} runs written, {total} runs stored')
+    elif args.command == 'best':
+        for strategy, timerange, run_id, value, trades in best(conn, args.metric, args.strategy, args.lowest):
+            print(f'{strategy:<26} {timerange or "-":<18} {args.metric} {value:>10.4f}  '
+                  f'{int(trades or 0):>6} trades  {run_id}')
+    elif args.command == 'runs':
+        for row in conn.execute("""
+                SELECT r.run_id, r.strategy, r.timerange, r.timeframe, r.file,
+                       (SELECT value FROM metrics m WHERE m.key = 'profit_total' AND m.run_id = r.run_id)
+                FROM runs r WHERE ? IS NULL OR r.strategy = ? ORDER BY r.run_start_time""",
+                                (args.strategy, args.strategy)):
+            run_id, strategy, timerange, timeframe, file, profit = row
+            profit = '-' if profit is None else f'{profit * 100:.2f}%'
+            print(f'{run_id[:12]}  {strategy:<26} {timerange or "-":<18} {timeframe or "-":<4} {profit:>9}  {file}')
+    elif args.command == 'trades':
+        cursor = conn.execute('SELECT pair, is_short, open_ts, close_ts, profit_ratio, exit_reason FROM trades '
+                              'WHERE run_id LIKE ? ORDER BY open_ts', (f'{args.run_id}%',))
+        for pair, is_short, open_ts, close_ts, profit, reason in cursor:
+            opened, closed = (datetime.fromtimestamp(ts / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M')
+                              if ts else '-' for ts in (open_ts, close_ts))
+            print(f'{pair:<16} {"short" if is_short else "long ":<5} {opened} -> {closed}  '
+                  f'{profit * 100:>7.2f}%  {reason}')
+    elif args.command == 'extract':
+        row = conn.execute(f'SELECT {args.kind}_hash FROM runs WHERE run_id LIKE ?', (f'{args.run_id}%',)).fetchone()
+        data = get_blob(conn, row[0]) if row and row[0] else None
+        if data is None:
+            print(f'no {args.kind} stored for {args.run_id}', file=sys.stderr)
+            return 1
+        if args.output:
+            Path(args.output).write_bytes(data)
+        else:
+            sys.stdout.buffer.write(data)
+    else:
+        cursor = conn.execute(args.query)
+        if cursor.description:
+            print('\t'.join(c[0] for c in cursor.description))
+        for row in cursor:
+            print('\t'.join(str(v) for v in row))
+    conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
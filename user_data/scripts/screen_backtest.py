@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""
+Vectorized screening backtest: a fast pre-screen before a full freqtrade run.
+
+The strategy's own populate_* methods produce the signals. Exits follow
+freqtrade's backtesting rules for long trades: minimal_roi, stoploss and
+trailing stop (evaluated against each candle's high/low), exit signals, and
+fees on both legs at the trade's leverage. Instead of walking candles one by
+one, the exit of every possible entry is searched in one numpy pass over a
+(entries x window) matrix. Trades are then chained per pair: the next trade
+opens on the first entry candle after the previous exit.
+Each pair is simulated as if it always had a free trade slot. Custom
+stoploss, custom exit, position adjustment, protections and funding fees
+are not simulated.
+
+`check` runs the strategy source archived in each backtest-result zip over
+the same candles, and compares the trades with the ones freqtrade recorded.
+Usage: python screen_backtest.py run STRATEGY ... [--timerange 20220501-20221231] [--config okx-futures]
+       python screen_backtest.py check [ZIP ...] [--replay]
+"""
+import argparse
+import importlib
+import json
+import sys
+import time
+import types
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from backtest_matrix import config_datadir, config_pairs, resolve_config  # noqa: E402
+from data_catalog import timeframe_seconds  # noqa: E402
+from data_loader import load_ohlcv, pair_path, parse_timerange  # noqa: E402
+
+USER_DATA = Path(__file__).resolve().parents[1]
+STRATEGY_DIR = USER_DATA / 'strategies'
+RESULTS_DIR = USER_DATA / 'backtest_results'
+# freqtrade passes the exchange's tier limit as max_leverage; offline we use
+# OKX's cap for its USDT swaps
+MAX_LEVERAGE = 100.0
+# Candles the exit searches look ahead: the speculative pass over every
+# entry candidate, and the first per-trade pass (later ones adapt)
+SPECULATIVE_WINDOW = 16
+FIRST_WINDOW = 64
+MAX_WINDOW = 4096
+# Matrix cells per speculative pass
+BATCH_CELLS = 1 << 21
+
+EXIT_REASONS = ('exit_signal', 'stop_loss', 'roi', 'trailing_stop_loss', 'force_exit')
+EXIT_SIGNAL, STOP_LOSS, ROI, TRAILING_STOP_LOSS, FORCE_EXIT = range(len(EXIT_REASONS))
+
+
+def exit_rules(source) -> dict:
+    """
+    Exit settings of a strategy instance, or of a strategy's entry in a
+    backtest result (same attribute names).
+    """
+    get = source.get if isinstance(source, dict) else (lambda key, default=None: getattr(source, key, default))
+    roi = sorted((int(k), float(v)) for k, v in (get('minimal_roi') or {}).items())
+    return {
+        'roi_minutes': np.array([k for k, _ in roi], dtype=np.int64),
+        'roi_values': np.array([v for _, v in roi], dtype=np.float64),
+        'stoploss': abs(float(get('stoploss'))),
+        'trailing_stop': bool(get('trailing_stop', False)),
+        'trailing_stop_positive': get('trailing_stop_positive'),
+        'trailing_stop_positive_offset': float(get('trailing_stop_positive_offset', 0.0) or 0.0),
+        'trailing_only_offset_is_reached': bool(get('trailing_only_offset_is_reached', False)),
+        'use_exit_signal': bool(get('use_exit_signal', True)),
+        'exit_profit_only': bool(get('exit_profit_only', False)),
+        'exit_profit_offset': float(get('exit_profit_offset', 0.0) or 0.0),
+        'ignore_roi_if_entry_signal': bool(get('ignore_roi_if_entry_signal', False)),
+    }
+
+
+def _round_up(price, tick):
+    # freqtrade rounds stops up to the price tick (nan: unknown, leave as is)
+    return np.where(np.isnan(tick), price, np.ceil(np.round(price / tick, 6)) * tick)
+
+
+def _round(price, tick):
+    return np.where(np.isnan(tick), price, np.round(price / tick) * tick)
+
+
+def _profit(rate, open_value, fee: float, leverage: float):
+    # Trade.calc_profit_ratio for a long without funding fees
+    return np.round((rate * (1 - fee) / open_value - 1) * leverage, 8)
+
+
+def _exit_pass(candles: dict, entries: np.ndarray, window: int, end: np.ndarray, rules: dict,
+               leverage: np.ndarray, fee: float, timeframe_minutes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Exit candle, reason and rate of a trade opened at each of `entries`,
+    searching `window` candles ahead (up to the row's `end`, the last candle
+    of its pair). Exit -1: not found within the window.
+    """
+    open_, high, low = candles['open'], candles['high'], candles['low']
+    cells = entries[:, None] + np.arange(window)
+    valid = cells <= end[:, None]
+    cells = np.minimum(cells, end[:, None])
+    lev = leverage[:, None]
+    tick = candles['tick'][entries]
+    entry_open = open_[entries][:, None]
+    open_value = entry_open * (1 + fee)
+    o, h, lo = open_[cells], high[cells], low[cells]
+
+    duration = candles['minutes'][cells] - candles['minutes'][entries][:, None]
+    profit_high = _profit(h, open_value, fee, lev)
+    roi_index = np.searchsorted(rules['roi_minutes'], duration, side='right') - 1
+    roi = np.concatenate([rules['roi_values'], [np.inf]])[roi_index]
+    roi_hit = profit_high > roi
+    if rules['ignore_roi_if_entry_signal']:
+        roi_hit &= ~candles['enter'][cells]
+
+    # Stop at each candle: the initial stop raised by the trailing stop
+    # candidate of every earlier candle (a running max), then by this
+    # candle's own candidate unless its low already hit the stop
+    stoploss, offset = rules['stoploss'], rules['trailing_stop_positive_offset']
+    positive = rules['trailing_stop_positive']
+    initial = _round_up(entry_open * (1 - stoploss / lev), tick[:, None])
+    if rules['trailing_stop']:
+        pct = np.where(profit_high > offset, positive, stoploss) if positive is not None else stoploss
+        candidate = _round_up(h * (1 - pct / lev), tick[:, None])
+        if rules['trailing_only_offset_is_reached']:
+            candidate = np.where(profit_high < offset, -np.inf, candidate)
+        before = np.empty_like(candidate)
+        before[:, 0] = -np.inf
+        np.maximum.accumulate(candidate[:, :-1], axis=1, out=before[:, 1:])
+        stop_before = np.maximum(initial, before)
+        stop = np.where(stop_before >= lo, stop_before, np.maximum(stop_before, candidate))
+    else:
+        stop = np.broadcast_to(initial, cells.shape)
+    stop_hit = stop >= lo
+
+    signal = np.zeros(cells.shape, dtype=bool)
+    if rules['use_exit_signal']:
+        signal = candles['exit'][cells] & ~candles['enter'][cells]
+        if rules['exit_profit_only']:
+            signal &= _profit(o, open_value, fee, lev) > rules['exit_profit_offset']
+
+    hit = (signal | stop_hit | roi_hit) & valid
+    col = hit.argmax(axis=1)
+    rows = np.arange(len(entries))
+    found = hit[rows, col]
+    exit_idx = np.where(found, entries + col, -1)
+    # No exit up to the last candle: force exit at its open
+    reaches_end = ~found & (entries + window - 1 >= end)
+    exit_idx[reaches_end] = end[reaches_end]
+
+    # Reason in should_exit's order: signal, stoploss, roi, trailing stop
+    open_value = open_value[:, 0]
+    stop, o, h, lo, dur = stop[rows, col], o[rows, col], h[rows, col], lo[rows, col], duration[rows, col]
+    trailing = stop > initial[:, 0]
+    s, t, r = signal[rows, col], stop_hit[rows, col], roi_hit[rows, col]
+    reason = np.where(s, EXIT_SIGNAL, np.where(t & ~trailing, STOP_LOSS, np.where(r, ROI, TRAILING_STOP_LOSS)))
+    reason[~found] = FORCE_EXIT
+
+    rate = np.where(stop > h, o, stop)
+    if rules['trailing_stop']:
+        # Trailing stop hit within the entry candle: assume the price went
+        # just far enough to move the stop, then straight down to it
+        if rules['trailing_only_offset_is_reached'] and positive:
+            worst = o * (1 + offset - positive / leverage)
+        else:
+            worst = o * (1 - (stoploss if positive is None else positive) / leverage)
+        rate = np.where((reason == TRAILING_STOP_LOSS) & (dur == 0), np.maximum(lo, worst), rate)
+
+    # ROI exits at the rate giving exactly the ROI, or at the open when a
+    # newer (lower) ROI step starts on this candle and the open is above it
+    is_roi = reason == ROI
+    if is_roi.any():
+        step = roi_index[rows, col][is_roi]
+        roi_rate = open_value[is_roi] * (1 + rules['roi_values'][step] / leverage[is_roi]) / (1 - fee)
+        step_start = rules['roi_minutes'][step]
+        new_roi = (dur[is_roi] > 0) & (dur[is_roi] == step_start) & (step_start % timeframe_minutes == 0) \
+            & (o[is_roi] > roi_rate)
+        rate[is_roi] = np.where(new_roi, o[is_roi], np.minimum(np.maximum(roi_rate, lo[is_roi]), h[is_roi]))
+    exit_signal = reason == EXIT_SIGNAL
+    rate[exit_signal] = o[exit_signal]
+    rate[~found] = open_[end[~found]]
+    rate = _round(rate, tick)
+    return exit_idx, reason, rate
+
+
+def simulate(pairs: Dict[str, dict], starts: Dict[str, int], rules: dict, leverage: Dict[str, float],
+             fee: float, timeframe: str, entries: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Trades of each pair. `pairs` maps pair -> numpy arrays date
+    (datetime64[ns]), open, high, low, and boolean enter / exit signals
+    already shifted onto the candle they act on. Trades open from candle
+    `starts[pair]` on; the last candle ends the backtest. An optional
+    'tick' array is the price tick a trade opened on that candle rounds its
+    stops and exit rates to (nan: unrounded). `entries` forces
+    the entry candles (replaying another backtest) instead of the signals.
+
+    Each pass searches the exit of the open trade of every pair at once;
+    the next trade of a pair opens at its first entry candle after that exit.
+    """
+    names = list(pairs)
+    if not names:
+        return {}
+    sizes = np.array([len(pairs[p]['open']) for p in names], dtype=np.int64)
+    first = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    last = first + sizes - 1
+    candles = {k: np.concatenate([pairs[p][k] for p in names]) for k in ('date', 'open', 'high', 'low', 'enter', 'exit')}
+    candles['tick'] = np.concatenate([pairs[p]['tick'] if 'tick' in pairs[p] else np.full(n, np.nan)
+                                      for p, n in zip(names, sizes)])
+    candles['minutes'] = candles['date'].astype('datetime64[m]').astype(np.int64)
+    timeframe_minutes = max(1, timeframe_seconds(timeframe) // 60)
+
+    candidates = []
+    for i, pair in enumerate(names):
+        signal = pairs[pair]['enter'] & ~pairs[pair]['exit']
+        c = entries[pair] if entries is not None and pair in entries else (
+            np.array([], dtype=np.int64) if entries is not None else np.flatnonzero(signal))
+        c = c[(c >= starts.get(pair, 0)) & (c < sizes[i] - 1)]
+        candidates.append(c + first[i])
+    lev = np.array([leverage.get(p, 1.0) for p in names], dtype=np.float64)
+
+    # Speculative pass: the exit of every candidate within a few candles.
+    # Short trades chain straight from it; the others are searched below
+    speculative = []
+    for i, c in enumerate(candidates):
+        exits = np.full(len(c), -1)
+        reasons = np.zeros(len(c), dtype=np.int64)
+        rates = np.zeros(len(c))
+        step = max(1, BATCH_CELLS // SPECULATIVE_WINDOW)
+        for j in range(0, len(c), step):
+            part = slice(j, j + step)
+            exits[part], reasons[part], rates[part] = _exit_pass(
+                candles, c[part], SPECULATIVE_WINDOW, np.full(len(c[part]), last[i]), rules,
+                np.full(len(c[part]), lev[i]), fee, timeframe_minutes)
+        speculative.append((exits, reasons, rates, np.searchsorted(c, exits, side='right')))
+
+    position = np.zeros(len(names), dtype=np.int64)
+    taken = [[] for _ in names]
+    window = FIRST_WINDOW
+    active = list(range(len(names)))
+    while active:
+        # Follow each pair's chain while the speculative pass has the exit
+        for i in active:
+            c, (exits, reasons, rates, following) = candidates[i], speculative[i]
+            k = position[i]
+            while k < len(c) and exits[k] >= 0:
+                taken[i].append((c[k], exits[k], reasons[k], rates[k]))
+                k = following[k]
+            position[i] = k
+        active = [i for i in active if position[i] < len(candidates[i])]
+        if not active:
+            break
+        # Then search the exit of the next (longer) trade of every pair at once
+        rows = np.array(active)
+        entry = np.array([candidates[i][position[i]] for i in active])
+        exit_idx = np.full(len(rows), -1)
+        reason = np.zeros(len(rows), dtype=np.int64)
+        rate = np.zeros(len(rows))
+        todo, size = np.arange(len(rows)), window
+        while len(todo):
+            e, r, p = _exit_pass(candles, entry[todo], size, last[rows[todo]], rules, lev[rows[todo]], fee,
+                                 timeframe_minutes)
+            exit_idx[todo], reason[todo], rate[todo] = e, r, p
+            todo, size = todo[e < 0], size * 4
+        # Next window: long enough for the longest trade of this pass
+        window = int(min(max(FIRST_WINDOW, 2 ** np.ceil(np.log2(np.max(exit_idx - entry) + 1))), MAX_WINDOW))
+        for k, i in enumerate(active):
+            taken[i].append((entry[k], exit_idx[k], reason[k], rate[k]))
+            position[i] = np.searchsorted(candidates[i], exit_idx[k], side='right')
+
+    trades = {}
+    for i, pair in enumerate(names):
+        entry_idx, exit_idx, reason, close_rate = (np.array(v) for v in zip(*taken[i])) if taken[i] else \
+            (np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([]))
+        open_rate = candles['open'][entry_idx]
+        trades[pair] = {
+            'open_date': candles['date'][entry_idx],
+            'close_date': candles['date'][exit_idx],
+            'open_rate': open_rate,
+            'close_rate': close_rate,
+            'exit_reason': reason,
+            'profit_ratio': _profit(close_rate, open_rate * (1 + fee), fee, lev[i]),
+            'leverage': np.full(len(entry_idx), lev[i]),
+        }
+    return trades
+
+
+def signal_candles(dataframe: pd.DataFrame, exit_column: str = 'exit_long') -> dict:
+    """
+    Numpy candles with the signals shifted one candle, as freqtrade does,
+    and the price tick of each candle (see price_ticks).
+    """
+    def shifted(column: str) -> np.ndarray:
+        if column not in dataframe:
+            return np.zeros(len(dataframe), dtype=bool)
+        values = (dataframe[column].fillna(0).to_numpy() == 1)
+        return np.concatenate([[False], values[:-1]])
+
+    return {
+        'date': dataframe['date'].values.astype('datetime64[ns]'),
+        'open': dataframe['open'].to_numpy(np.float64),
+        'high': dataframe['high'].to_numpy(np.float64),
+        'low': dataframe['low'].to_numpy(np.float64),
+        'enter': shifted('enter_long'),
+        'exit': shifted(exit_column if exit_column in dataframe else 'sell'),
+        'tick': price_ticks(dataframe),
+    }
+
+
+def price_ticks(dataframe: pd.DataFrame) -> np.ndarray:
+    """
+    Price tick of each candle as freqtrade's backtesting derives it offline:
+    10 ** -(most decimals any OHLC price has in the candle's month).
+    Vectorized equivalent of freqtrade's get_tick_size_over_time.
+    """
+    prices = dataframe[['open', 'high', 'low', 'close']].to_numpy(np.float64)
+    decimals = np.full(prices.shape, 14)
+    for digits in range(13, -1, -1):
+        scaled = prices * 10.0 ** digits
+        exact = np.abs(scaled - np.round(scaled)) < 1e-9 * np.maximum(1.0, np.abs(scaled))
+        decimals[exact] = digits
+    month = dataframe['date'].values.astype('datetime64[M]')
+    months, index = np.unique(month, return_inverse=True)
+    most = np.zeros(len(months), dtype=np.int64)
+    np.maximum.at(most, index, decimals.max(axis=1))
+    return 10.0 ** -most[index].astype(np.float64)
+
+
+def trades_frame(pair_trades: Dict[str, Dict[str, np.ndarray]]) -> pd.DataFrame:
+    frames = [pd.DataFrame(trades).assign(pair=pair) for pair, trades in pair_trades.items()]
+    if not frames:
+        return pd.DataFrame(columns=['pair', 'open_date', 'close_date', 'open_rate', 'close_rate',
+                                     'exit_reason', 'profit_ratio', 'leverage'])
+    trades = pd.concat(frames, ignore_index=True).sort_values(['open_date', 'pair'], ignore_index=True)
+    trades['exit_reason'] = np.array(EXIT_REASONS)[trades['exit_reason'].to_numpy()]
+    return trades[['pair'] + [c for c in trades.columns if c != 'pair']]
+
+
+def summary(trades: pd.DataFrame, max_open_trades: int = 1) -> dict:
+    """
+    Headline metrics, with every trade staking 1 / max_open_trades of a
+    fixed starting balance (no compounding).
+    """
+    if trades.empty:
+        return {'trades': 0}
+    profit = trades['profit_ratio'].to_numpy()
+    equity = np.cumsum(profit[np.argsort(trades['close_date'].to_numpy(), kind='stable')]) / max(1, max_open_trades)
+    drawdown = np.max(np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity)
+    duration = (trades['close_date'] - trades['open_date']).dt.total_seconds() / 60
+    return {
+        'trades': len(trades),
+        'win_rate': round(float((profit > 0).mean()), 4),
+        'profit_mean': round(float(profit.mean()), 6),
+        'profit_total': round(float(equity[-1]), 6),
+        'max_drawdown': round(float(drawdown), 6),
+        'profit_factor': round(float(profit[profit > 0].sum() / -profit[profit < 0].sum()), 4)
+        if (profit < 0).any() else None,
+        'avg_duration_min': round(float(duration.mean()), 1),
+        'exit_reasons': trades['exit_reason'].value_counts().to_dict(),
+    }
+
+
+def load_strategy(name: str, config: dict, source: Optional[str] = None):
+    """
+    Strategy instance from user_data/strategies, or from `source` (a strategy
+    file archived with a backtest result).
+    """
+    from freqtrade.data.dataprovider import DataProvider
+    from freqtrade.enums import CandleType, RunMode
+
+    if str(STRATEGY_DIR) not in sys.path:
+        sys.path.insert(0, str(STRATEGY_DIR))
+    if source is None:
+        module = importlib.import_module(name)
+    else:
+        module = types.ModuleType(f'{name}_archived')
+        exec(compile(source, f'<archived {name}>', 'exec'), module.__dict__)
+    config = dict(config, runmode=RunMode.BACKTEST, dry_run=True, user_data_dir=str(USER_DATA))
+    config.setdefault('stake_currency', 'USDT')
+    config.setdefault('trading_mode', 'futures')
+    config.setdefault('candle_type_def', CandleType.get_default(config['trading_mode']))
+    # Informative pairs are read through the DataProvider, which needs freqtrade's datadir
+    config.setdefault('datadir', USER_DATA / 'data' / config['exchange']['name'])
+    config.setdefault('dataformat_ohlcv', 'feather')
+    strategy = getattr(module, name)(config)
+    strategy.dp = DataProvider(config, None)
+    strategy.minimal_roi = {int(k): v for k, v in strategy.minimal_roi.items()}
+    return strategy
+
+
+def pair_leverage(strategy, pair: str, dataframe: pd.DataFrame, leverage_map: bool) -> float:
+    """
+    The leverage freqtrade would trade `pair` at. A leverage() that raises
+    when called the way freqtrade calls it gets 1x there as well.
+    `leverage_map` uses the strategy's leverage_config instead.
+    """
+    if leverage_map:
+        return float(getattr(strategy, 'leverage_config', {}).get(pair, 1.0))
+    row = dataframe.iloc[-1]
+    # leverage() may read the analyzed frame, as it can in freqtrade
+    strategy.dp._set_cached_df(pair, strategy.timeframe, dataframe, strategy.config['candle_type_def'])
+    strategy.dp._set_dataframe_max_index(pair, len(dataframe))
+    try:
+        leverage = strategy.leverage(pair=pair, current_time=row['date'].to_pydatetime(),
+                                     current_rate=float(row['close']), proposed_leverage=1.0,
+                                     max_leverage=MAX_LEVERAGE, entry_tag=None, side='long')
+    except Exception as e:
+        print(f'  {pair}: leverage() failed ({type(e).__name__}), freqtrade trades it at 1x')
+        return 1.0
+    return float(min(max(leverage, 1.0), MAX_LEVERAGE))
+
+
+def analyze(strategy, dataframe: pd.DataFrame, pair: str) -> pd.DataFrame:
+    metadata = {'pair': pair}
+    dataframe = strategy.advise_indicators(dataframe, metadata)
+    return strategy.ft_advise_signals(dataframe, metadata)
+
+
+def start_index(dates: np.ndarray, timerange: str, startup_candles: int) -> int:
+    """
+    First candle a trade can open on: the one after the first candle of the
+    timerange, which is moved back no earlier than the startup candles.
+    """
+    start, _ = parse_timerange(timerange)
+    first = 0 if start is None else int(np.searchsorted(dates.astype(np.int64), start, side='left'))
+    return max(first, startup_candles) + 1
+
+
+def run_strategy(name: str, config: dict, pairs: List[str], datadir: Path, timerange: str,
+                 exit_column: str, leverage_map: bool, source: Optional[str] = None,
+                 rules: Optional[dict] = None, replay: Optional[Dict[str, np.ndarray]] = None,
+                 ticks: Optional[Dict[str, float]] = None) -> Tuple[pd.DataFrame, dict]:
+    """
+    Screening trades of strategy `name` over `pairs`, and timings. `replay`
+    maps pair -> entry dates to force instead of the strategy's signals,
+    `ticks` pair -> a fixed price tick instead of the candle-derived one.
+    """
+    strategy = load_strategy(name, config, source)
+    rules = rules or exit_rules(strategy)
+    startup = int(strategy.startup_candle_count)
+    candles, starts, leverage, entries = {}, {}, {}, {}
+    timings = {'candles': 0, 'analyze_s': 0.0, 'simulate_s': 0.0}
+    for pair in pairs:
+        if not pair_path(datadir, pair, strategy.timeframe).is_file():
+            continue
+        dataframe = load_ohlcv(datadir, pair, strategy.timeframe, timerange, startup_candles=startup)
+        if len(dataframe) <= startup + 1:
+            continue
+        t = time.perf_counter()
+        dataframe = analyze(strategy, dataframe, pair)
+        timings['analyze_s'] += time.perf_counter() - t
+        leverage[pair] = pair_leverage(strategy, pair, dataframe, leverage_map)
+        candles[pair] = signal_candles(dataframe, exit_column)
+        if ticks is not None and pair in ticks:
+            candles[pair]['tick'] = np.full(len(dataframe), ticks[pair])
+        starts[pair] = start_index(candles[pair]['date'], timerange, startup)
+        if replay is not None:
+            entries[pair] = np.searchsorted(candles[pair]['date'], replay.get(pair, np.array([], dtype='datetime64[ns]')))
+        timings['candles'] += len(dataframe)
+    t = time.perf_counter()
+    trades = simulate(candles, starts, rules, leverage, float(config.get('fee', 0.0)), strategy.timeframe,
+                      entries if replay is not None else None)
+    timings['simulate_s'] = time.perf_counter() - t
+    return trades_frame(trades), timings
+
+
+def recorded_tick(trades: pd.DataFrame, stoploss: float) -> float:
+    """
+    Price tick freqtrade rounded the stops of one pair's trades to: the
+    largest power of ten all initial stops are multiples of, or nan if they
+    were not rounded. Versions before candle-derived ticks rounded to the
+    exchange's market precision, when markets were loaded at all.
+    """
+    stops = trades['initial_stop_loss_abs'].to_numpy(np.float64)
+    raw = trades['open_rate'].to_numpy(np.float64) * (1 - abs(stoploss) / trades['leverage'].to_numpy(np.float64))
+    if np.allclose(stops, raw, rtol=1e-9, atol=0):
+        return np.nan
+    for exponent in range(4, -12, -1):
+        tick = 10.0 ** exponent
+        if np.all(np.abs(stops / tick - np.round(stops / tick)) < 1e-6):
+            return tick
+    return np.nan
+
+
+def compare(ours: pd.DataFrame, theirs: pd.DataFrame) -> dict:
+    """
+    Agreement of screening trades with freqtrade's trades of one run.
+    """
+    key = ['pair', 'open_date']
+    theirs = theirs.assign(open_date=pd.to_datetime(theirs['open_date'], utc=True).dt.tz_localize(None),
+                           close_date=pd.to_datetime(theirs['close_date'], utc=True).dt.tz_localize(None))
+    ours = ours.assign(open_date=pd.to_datetime(ours['open_date']), close_date=pd.to_datetime(ours['close_date']))
+    merged = ours.merge(theirs[key + ['close_date', 'exit_reason', 'profit_ratio']], on=key, how='outer',
+                        suffixes=('', '_ft'), indicator=True)
+    both = merged[merged['_merge'] == 'both']
+    same_exit = (both['close_date'] == both['close_date_ft']) & (both['exit_reason'] == both['exit_reason_ft'])
+    profit_diff = (both['profit_ratio'] - both['profit_ratio_ft']).abs()[same_exit]
+    return {
+        'freqtrade': len(theirs),
+        'screen': len(ours),
+        'same_entry': len(both),
+        'same_exit': int(same_exit.sum()),
+        'entry_agreement': round(len(both) / max(1, len(theirs)), 4),
+        'exit_agreement': round(float(same_exit.mean()) if len(both) else 0.0, 4),
+        'max_profit_diff': round(float(profit_diff.max()), 6) if len(profit_diff) else None,
+        'profit_total_ft': round(float(theirs['profit_ratio'].sum()), 4),
+        'profit_total_screen': round(float(ours['profit_ratio'].sum()), 4),
+    }
+
+
+def check(zip_path: Path, replay: bool) -> List[dict]:
+    """
+    Re-run each strategy of a backtest-result zip with its archived source
+    and config over the local candles, and compare with the recorded trades.
+    """
+    reports = []
+    with zipfile.ZipFile(zip_path) as archive:
+        names = archive.namelist()
+        result_name = next(n for n in names if n.endswith('.json') and not n.endswith('_config.json'))
+        result = json.loads(archive.read(result_name))
+        config = json.loads(archive.read(result_name.replace('.json', '_config.json'))) \
+            if result_name.replace('.json', '_config.json') in names else {}
+        for name, stats in result.get('strategy', {}).items():
+            report = {'result': zip_path.name, 'strategy': name, 'timeframe': stats.get('timeframe')}
+            source_name = next((n for n in names if n.endswith(f'_{name}.py')), None)
+            trades = pd.DataFrame(stats.get('trades', []))
+            datadir = config_datadir(config) if config.get('exchange') else USER_DATA / 'data/okx/futures'
+            start = pd.Timestamp(stats['backtest_start'], tz='UTC')
+            end = pd.Timestamp(stats['backtest_end'], tz='UTC')
+            pairs = [p for p in stats.get('pairlist', [])
+                     if pair_path(datadir, p, stats['timeframe']).is_file()]
+            covered = [p for p in pairs if _covers(datadir, p, stats['timeframe'], start, end)]
+            if trades.empty or source_name is None or not covered:
+                reports.append(dict(report, skipped='no trades, archived source or local candles'))
+                continue
+            trades = trades[trades['pair'].isin(covered)]
+            if trades.empty:
+                reports.append(dict(report, skipped='no trades on pairs with local candles'))
+                continue
+            run_config = dict(config, fee=float(trades['fee_open'].iloc[0]))
+            ticks = {pair: recorded_tick(group, stats['stoploss']) for pair, group in trades.groupby('pair')}
+            entries = None
+            if replay:
+                entries = {pair: pd.to_datetime(group['open_date'], utc=True).dt.tz_localize(None).to_numpy()
+                           for pair, group in trades.groupby('pair')}
+            try:
+                ours, timings = run_strategy(
+                    name, run_config, covered, datadir, stats.get('timerange') or f'{start:%Y%m%d}-{end:%Y%m%d}',
+                    'exit_long', False, archive.read(source_name).decode(), exit_rules(stats), entries, ticks)
+            except Exception as e:
+                reports.append(dict(report, error=f'{type(e).__name__}: {e}'))
+                continue
+            report.update(compare(ours, trades), pairs=len(covered), candles=timings['candles'],
+                          simulate_s=round(timings['simulate_s'], 3))
+            reports.append(report)
+    return reports
+
+
+def _covers(datadir: Path, pair: str, timeframe: str, start: pd.Timestamp, end: pd.Timestamp) -> bool:
+    dates = load_ohlcv(datadir, pair, timeframe, columns=['date'])['date']
+    return len(dates) > 0 and dates.iloc[0] <= start and dates.iloc[-1] >= end
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='screen strategies over local candles')
+    run.add_argument('strategies', nargs='+')
+    run.add_argument('--config', default='okx-futures', help='config name or path (pairs, fee, datadir)')
+    run.add_argument('--timerange', default='')
+    run.add_argument('--pairs', nargs='*', help='default: the config whitelist')
+    run.add_argument('--exit-column', default='exit_long',
+                     help="signal column for exits (freqtrade reads exit_long; the strategies here write 'exit')")
+    run.add_argument('--leverage-map', action='store_true',
+                     help='trade at leverage_config instead of what leverage() returns to freqtrade')
+    run.add_argument('--trades', help='write the trades to this CSV file')
+    chk = sub.add_parser('check', help='compare with freqtrade results in backtest_results')
+    chk.add_argument('zips', nargs='*')
+    chk.add_argument('--replay', action='store_true',
+                     help="open trades at freqtrade's entries, so only the exit logic is compared")
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        paths = [Path(z) for z in args.zips] or sorted(RESULTS_DIR.glob('backtest-result-*.zip'))
+        for path in paths:
+            for report in check(path, args.replay):
+                print(json.dumps(report, default=str))
+        return 0
+
+    config_path = resolve_config(args.config)
+    config = json.loads(config_path.read_text())
+    pairs = args.pairs or config_pairs(config)
+    all_trades = []
+    for name in args.strategies:
+        try:
+            trades, timings = run_strategy(name, config, pairs, config_datadir(config), args.timerange,
+                                           args.exit_column, args.leverage_map)
+        except Exception as e:
+            print(f'{name}: error {type(e).__name__}: {e}')
+            continue
+        rate = timings['candles'] / timings['simulate_s'] if timings['simulate_s'] else 0
+        print(f'{name}: {json.dumps(summary(trades, int(config.get("max_open_trades", 1))))}')
+        print(f'  {timings["candles"]} candles, analyze {timings["analyze_s"]:.2f}s, '
+              f'simulate {timings["simulate_s"]:.3f}s ({rate / 1e6:.1f}M candles/s)')
+        all_trades.append(trades.assign(strategy=name))
+    if args.trades:
+        pd.concat(all_trades, ignore_index=True).to_csv(args.trades, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark every strategy's populate_* methods and callbacks.
+
+Each strategy runs on the bundled candles of one pair at several frame
+sizes: its startup window, one day and one month of its timeframe (the most
+recent candles; a size the data cannot fill is run on what there is and
+marked truncated). Timeframes without a candle file are derived from
+the finest one by resample_cache. Per size it times populate_indicators,
+populate_entry_trend and populate_exit_trend (indicator cache cleared, so
+the compute is measured) and the leverage / custom_exit / custom_stoploss
+callbacks per call, called the way freqtrade calls them. It records wall
+time, traced allocations and peak RSS.
+
+Results are written as a JSON baseline; `compare` flags every measurement
+that got slower (or allocates more) than a baseline by more than a
+threshold, and exits 1 if any did.
+Usage: python strategy_benchmark.py run [STRATEGY ...] [--sizes startup day month] [--baseline FILE]
+       python strategy_benchmark.py compare BASELINE CURRENT [--threshold 0.25]
+"""
+import argparse
+import gc
+import json
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from backtest_matrix import config_datadir, resolve_config  # noqa: E402
+from data_catalog import timeframe_seconds  # noqa: E402
+from data_loader import load_ohlcv, pair_path  # noqa: E402
+from resample_cache import load_resampled  # noqa: E402
+from screen_backtest import MAX_LEVERAGE, STRATEGY_DIR, load_strategy  # noqa: E402
+
+USER_DATA = Path(__file__).resolve().parents[1]
+BENCHMARK_DIR = USER_DATA / 'benchmarks'
+SIZES = {'startup': None, 'day': 86400, 'month': 30 * 86400}
+METHODS = ('populate_indicators', 'populate_entry_trend', 'populate_exit_trend')
+CALLBACKS = ('leverage', 'custom_exit', 'custom_stoploss')
+# Candle files the timeframes can be resampled from, finest first
+BASE_TIMEFRAMES = ('1m', '5m')
+
+
+def candles(datadir: Path, pair: str, timeframe: str) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    All candles of `pair` in `timeframe`, derived from the finest file
+    that divides it (resample_cache) when there is no file of its own.
+    Returns the frame and the timeframe it was derived from (None if read
+    directly).
+    """
+    if pair_path(datadir, pair, timeframe).is_file():
+        return load_ohlcv(datadir, pair, timeframe), None
+    seconds = timeframe_seconds(timeframe)
+    for base in BASE_TIMEFRAMES:
+        if seconds % timeframe_seconds(base) or not pair_path(datadir, pair, base).is_file():
+            continue
+        return load_resampled(datadir, pair, timeframe, base=base), base
+    return pd.DataFrame(), None
+
+
+def _rss_mb() -> Tuple[float, float]:
+    """
+    Current and peak (since the last reset) RSS in MiB.
+    """
+    current = peak = 0.0
+    try:
+        for line in Path('/proc/self/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                current = int(line.split()[1]) / 1024
+            elif line.startswith('VmHWM:'):
+                peak = int(line.split()[1]) / 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return current, peak
+
+
+def _reset_peak_rss() -> None:
+    # Linux resets VmHWM to the current RSS; elsewhere the peak is process-wide
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+    except OSError:
+        pass
+
+
+def _measure(calls: List[Callable[[], object]], repeat: int) -> dict:
+    """
+    Run calls[i] for each of `repeat` timed rounds and one traced round.
+    Every call must do the same work (fresh inputs are bound in).
+    """
+    times = []
+    # One full collection per measurement: with freqtrade imported it takes
+    # longer than most of the calls measured
+    gc.collect()
+    rss_before, rss_peak = _rss_mb()
+    for i in range(repeat):
+        if i == 0:
+            _reset_peak_rss()
+            rss_before, _ = _rss_mb()
+        start = time.perf_counter()
+        calls[i]()
+        times.append(time.perf_counter() - start)
+        if i == 0:
+            _, rss_peak = _rss_mb()
+    tracemalloc.start()
+    calls[repeat]()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'wall_ms': round(statistics.median(times) * 1000, 3),
+        'wall_ms_min': round(min(times) * 1000, 3),
+        'alloc_peak_kb': round(peak / 1024, 1),
+        'alloc_net_kb': round(current / 1024, 1),
+        'rss_peak_mb': round(rss_peak, 1),
+        'rss_growth_mb': round(max(0.0, rss_peak - rss_before), 1),
+    }
+
+
+def _trade(pair: str, row: pd.Series):
+    from freqtrade.enums import TradingMode
+    from freqtrade.persistence import LocalTrade
+
+    return LocalTrade(pair=pair, open_rate=float(row['close']), open_date=row['date'].to_pydatetime(),
+                      amount=1.0, stake_amount=float(row['close']), fee_open=0.0005, fee_close=0.0005,
+                      is_open=True, leverage=1.0, exchange='okx', trading_mode=TradingMode.FUTURES)
+
+
+def _callback_kwargs(name: str, pair: str, row: pd.Series, trade) -> dict:
+    # The keyword arguments freqtrade passes (strategy_safe_wrapper calls by keyword)
+    common = {'pair': pair, 'current_time': row['date'].to_pydatetime(), 'current_rate': float(row['close'])}
+    if name == 'leverage':
+        return dict(common, proposed_leverage=1.0, max_leverage=MAX_LEVERAGE, entry_tag=None, side='long')
+    if name == 'custom_exit':
+        return dict(common, trade=trade, current_profit=0.01)
+    return dict(common, trade=trade, current_profit=0.01, after_fill=False)
+
+
+def bench_strategy(name: str, config: dict, datadir: Path, pair: str, sizes: List[str],
+                   repeat: int, calls: int) -> dict:
+    """
+    Measurements of one strategy: {size: {method: {...}}}, or an error.
+    """
+    from freqtrade.strategy import IStrategy
+
+    # Measure the strategy's own leverage(), not freqtrade's 1x default
+    strategy = load_strategy(name, dict(config, strategy_leverage=True))
+    from _indicators import indicator_cache  # importable once load_strategy set the path
+    frame, resampled_from = candles(datadir, pair, strategy.timeframe)
+    result = {'timeframe': strategy.timeframe, 'pair': pair, 'resampled_from': resampled_from, 'sizes': {}}
+    if frame.empty:
+        return dict(result, error=f'no {strategy.timeframe} candles for {pair}')
+    metadata = {'pair': pair}
+    step = timeframe_seconds(strategy.timeframe)
+    for size in sizes:
+        seconds = SIZES[size]
+        wanted = int(strategy.startup_candle_count) if seconds is None else seconds // step
+        wanted = max(wanted, 2)
+        base = frame.tail(wanted).reset_index(drop=True)
+        entry = {'rows': len(base), 'truncated': len(base) < wanted}
+
+        # One pipeline per round: indicators -> entry -> exit on the same frame
+        rounds = [{'frame': base.copy()} for _ in range(repeat + 1)]
+
+        def stage(i: int, method: str, source: str) -> Callable[[], object]:
+            def call():
+                state = rounds[i]
+                if method == 'populate_indicators':
+                    indicator_cache.clear()
+                state[method] = getattr(strategy, method)(state[source], metadata)
+            return call
+
+        source = 'frame'
+        for method in METHODS:
+            entry[method] = _measure([stage(i, method, source) for i in range(repeat + 1)], repeat)
+            source = method
+        analyzed = rounds[0]['populate_exit_trend']
+
+        # Callbacks see the analyzed frame through the DataProvider, as in backtesting
+        strategy.dp._set_cached_df(pair, strategy.timeframe, analyzed, strategy.config['candle_type_def'])
+        strategy.dp._set_dataframe_max_index(pair, len(analyzed))
+        row = analyzed.iloc[-1]
+        trade = _trade(pair, row)
+        for callback in CALLBACKS:
+            if getattr(type(strategy), callback) is getattr(IStrategy, callback):
+                continue
+            method = getattr(strategy, callback)
+            kwargs = _callback_kwargs(callback, pair, row, trade)
+            try:
+                method(**kwargs)
+            except Exception as e:
+                entry[callback] = {'error': f'{type(e).__name__}: {e}'}
+                continue
+
+            def loop():
+                for _ in range(calls):
+                    method(**kwargs)
+
+            measured = _measure([loop] * (repeat + 1), repeat)
+            measured['us_per_call'] = round(measured['wall_ms'] * 1000 / calls, 2)
+            entry[callback] = measured
+        result['sizes'][size] = entry
+    return result
+
+
+def _metrics(results: dict):
+    """
+    (strategy, size, method) -> measurements, for every measured method.
+    """
+    for name, result in results.items():
+        for size, entry in result.get('sizes', {}).items():
+            for method in METHODS + CALLBACKS:
+                if isinstance(entry.get(method), dict) and 'wall_ms' in entry[method]:
+                    yield (name, size, method), entry[method]
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float) -> List[dict]:
+    """
+    Measurements of `current` worse than `baseline` by more than
+    `threshold` (relative) in best wall time or allocation peak. Wall-time
+    changes below `min_delta_ms` are noise and never flagged.
+    """
+    before = dict(_metrics(baseline.get('results', {})))
+    flagged = []
+    for key, now in _metrics(current.get('results', {})):
+        then = before.get(key)
+        if then is None:
+            continue
+        # The fastest round is the least noisy estimate of the cost
+        for metric, floor in (('wall_ms_min', min_delta_ms), ('alloc_peak_kb', 64.0)):
+            if then[metric] <= 0:
+                continue
+            ratio = now[metric] / then[metric]
+            if ratio > 1 + threshold and now[metric] - then[metric] > floor:
+                flagged.append({'strategy': key[0], 'size': key[1], 'method': key[2], 'metric': metric,
+                                'baseline': then[metric], 'current': now[metric], 'ratio': round(ratio, 2)})
+    return flagged
+
+
+def format_entry(name: str, size: str, entry: dict) -> List[str]:
+    lines = [f'{name:<26} {size:<8} {entry["rows"]:>6} rows{" (truncated)" if entry["truncated"] else ""}']
+    for method in METHODS + CALLBACKS:
+        value = entry.get(method)
+        if value is None:
+            continue
+        if 'error' in value:
+            lines.append(f'    {method:<22} ERROR {value["error"]}')
+        elif 'us_per_call' in value:
+            lines.append(f'    {method:<22} {value["us_per_call"]:>10.2f} us/call  '
+                         f'alloc {value["alloc_peak_kb"]:>9.1f} KiB')
+        else:
+            lines.append(f'    {method:<22} {value["wall_ms"]:>10.2f} ms       alloc {value["alloc_peak_kb"]:>9.1f} KiB'
+                         f'  rss +{value["rss_growth_mb"]:.1f} MiB')
+    return lines
+
+
+def _report(flagged: List[dict], threshold: float) -> int:
+    for f in flagged:
+        print(f'REGRESSION {f["strategy"]} {f["size"]} {f["method"]} {f["metric"]}: '
+              f'{f["baseline"]} -> {f["current"]} (x{f["ratio"]})')
+    print(f'{len(flagged)} regression(s) above {threshold:.0%}')
+    return 1 if flagged else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='benchmark strategies and write a JSON baseline')
+    run.add_argument('strategies', nargs='*', help='default: every strategy in user_data/strategies')
+    run.add_argument('--config', default='okx-futures', help='config name or path (fee, datadir)')
+    run.add_argument('--pair', default='BTC/USDT:USDT')
+    run.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    run.add_argument('--repeat', type=int, default=5, help='timed rounds per measurement (median reported)')
+    run.add_argument('--calls', type=int, default=1000, help='callback calls per timed round')
+    run.add_argument('--output', help='default: benchmarks/strategies-<date>.json')
+    run.add_argument('--baseline', help='compare the new results with this baseline')
+    run.add_argument('--threshold', type=float, default=0.25)
+    run.add_argument('--min-delta-ms', type=float, default=1.0)
+    cmp = sub.add_parser('compare', help='flag regressions of CURRENT against BASELINE')
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.25)
+    cmp.add_argument('--min-delta-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        baseline = json.loads(Path(args.baseline).read_text())
+        current = json.loads(Path(args.current).read_text())
+        return _report(compare(baseline, current, args.threshold, args.min_delta_ms), args.threshold)
+
+    config = json.loads(resolve_config(args.config).read_text())
+    datadir = config_datadir(config)
+    strategies = args.strategies or sorted(p.stem for p in STRATEGY_DIR.glob('*.py') if not p.stem.startswith('_'))
+    results = {}
+    for name in strategies:
+        try:
+            results[name] = bench_strategy(name, config, datadir, args.pair, args.sizes, args.repeat, args.calls)
+        except Exception as e:
+            results[name] = {'error': f'{type(e).__name__}: {e}'}
+        if 'error' in results[name]:
+            print(f'{name:<26} ERROR {results[name]["error"]}')
+            continue
+        for size, entry in results[name]['sizes'].items():
+            print('\n'.join(format_entry(name, size, entry)), flush=True)
+
+    import freqtrade
+    output = Path(args.output) if args.output else \
+        BENCHMARK_DIR / f'strategies-{datetime.now():%Y-%m-%d_%H-%M-%S}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'numpy': np.__version__, 'pandas': pd.__version__, 'freqtrade': freqtrade.__version__},
+        'pair': args.pair,
+        'repeat': args.repeat,
+        'calls': args.calls,
+        'results': results,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    print(f'{len(results)} strategies -> {output}')
+    if args.baseline:
+        flagged = compare(json.loads(Path(args.baseline).read_text()), report, args.threshold, args.min_delta_ms)
+        return _report(flagged, args.threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Summarize the per-method strategy profiles written by running bots.
+
+Strategies with profiling enabled (config `"strategy_profile": true`) write
+user_data/logs/strategy_profile_<strategy>.json (plus a Prometheus textfile
+next to it). This prints, per strategy, the methods that took the most
+wall time over all pairs - calls, total and mean time, p95 and the slowest
+call - and every exception counted, including the ones the strategy caught.
+Usage: python strategy_profile.py [--dir user_data/logs] [--top 10] [--by-pair]
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import List
+
+USER_DATA = Path(__file__).resolve().parents[1]
+
+
+def merge_pairs(methods: List[dict]) -> List[dict]:
+    """
+    Method entries summed over pairs (p95 is the worst pair's).
+    """
+    merged = defaultdict(lambda: {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'p95_seconds': 0.0})
+    for entry in methods:
+        total = merged[entry['method']]
+        total['method'] = entry['method']
+        total['pair'] = '*'
+        total['calls'] += entry['calls']
+        total['seconds'] += entry['seconds']
+        total['max_seconds'] = max(total['max_seconds'], entry['max_seconds'])
+        total['p95_seconds'] = max(total['p95_seconds'], entry['p95_seconds'])
+    return list(merged.values())
+
+
+def format_profile(profile: dict, top: int, by_pair: bool) -> List[str]:
+    methods = profile['methods'] if by_pair else merge_pairs(profile['methods'])
+    methods = sorted(methods, key=lambda m: m['seconds'], reverse=True)[:top]
+    lines = [f'{profile["strategy"]} (since {profile["started"][:19]}, updated {profile["updated"][:19]})',
+             f'    {"method":<24} {"pair":<16} {"calls":>8} {"total s":>9} {"mean ms":>9} '
+             f'{"p95 ms":>8} {"max ms":>9}']
+    for m in methods:
+        mean = m['seconds'] / m['calls'] * 1000 if m['calls'] else 0.0
+        lines.append(f'    {m["method"]:<24} {m["pair"]:<16} {m["calls"]:>8} {m["seconds"]:>9.2f} {mean:>9.2f} '
+                     f'{m["p95_seconds"] * 1000:>8.1f} {m["max_seconds"] * 1000:>9.1f}')
+    for e in profile['exceptions']:
+        caught = 'caught' if e['swallowed'] else 'raised'
+        lines.append(f'    ! {e["method"]:<22} {e["pair"]:<16} {e["count"]:>6}x {caught} {e["last"]}')
+    return lines
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dir', default=str(USER_DATA / 'logs'), help='directory of the profile files')
+    parser.add_argument('--top', type=int, default=10, help='methods per strategy')
+    parser.add_argument('--by-pair', action='store_true', help='one line per (method, pair)')
+    args = parser.parse_args()
+
+    paths = sorted(Path(args.dir).glob('strategy_profile_*.json'))
+    if not paths:
+        print(f'No strategy profiles in {args.dir} (enable with "strategy_profile": true)')
+        return 1
+    for path in paths:
+        try:
+            profile = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            print(f'{path.name}: unreadable ({e})')
+            continue
+        print('\n'.join(format_profile(profile, args.top, args.by_pair)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
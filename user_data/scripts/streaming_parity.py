@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Streaming indicator parity check.
+
+Replays a candle file one candle at a time through the streaming indicator
+state of each strategy and compares it with the batch talib output.
+Usage: python streaming_parity.py [--data FILE] [--rows N] [--seed-rows N] [STRATEGY ...]
+"""
+import argparse
+import importlib
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+USER_DATA = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(USER_DATA / 'strategies'))
+
+from _streaming import parity_report  # noqa: E402
+
+DEFAULT_STRATEGIES = ['AdaptiveHighRiskStrategy', 'NineSecondSniper', 'FutureUltraMomentum']
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('strategies', nargs='*', default=DEFAULT_STRATEGIES)
+    parser.add_argument('--data', default=str(USER_DATA / 'data/okx/futures/BTC_USDT_USDT-1m-futures.feather'))
+    parser.add_argument('--rows', type=int, default=2000, help='candles to replay')
+    parser.add_argument('--seed-rows', type=int, default=300, help='candles used for the initial full compute')
+    parser.add_argument('--rtol', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    dataframe = pd.read_feather(args.data).iloc[-args.rows:].reset_index(drop=True)
+    failed = False
+    for name in args.strategies:
+        strategy = getattr(importlib.import_module(name), name)
+        report = parity_report(dataframe, strategy.indicators, strategy.timeframe,
+                               seed_rows=args.seed_rows, rtol=args.rtol)
+        print(f'{name}:')
+        for column, result in report.items():
+            status = 'ok' if result['ok'] else 'MISMATCH'
+            print(f"  {column:<14} rows={result['rows']:<6} max_abs_diff={result['max_abs_diff']:.3e}  {status}")
+            failed |= not result['ok']
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,15 @@
-from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import pandas as pd
-import talib.abstract as ta
 import numpy as np
 from datetime import datetime
 from sklearn.ensemble import RandomForestClassifier
 import joblib
 import os
 
+from _base import BaseFuturesStrategy
 
-class AdaptiveHighRiskStrategy(IStrategy):
+
+class AdaptiveHighRiskStrategy(BaseFuturesStrategy):
     """
     Adaptive High Risk Strategy for High Returns
 
@@ -59,54 +59,53 @@ class AdaptiveHighRiskStrategy(IStrategy):
         'DOGE/USDT:USDT': 2.0
     }
 
+    indicators = {
+        'ema_9': ('ema', {'timeperiod': 9}),
+        'ema_21': ('ema', {'timeperiod': 21}),
+        'ema_50': ('ema', {'timeperiod': 50}),
+        'rsi': ('rsi', {'timeperiod': 14}),
+        'volume_sma': ('sma', {'timeperiod': 20, 'source': 'volume'}),
+        ('macd', 'macd_signal', 'macd_hist'): ('macd', {}),
+        ('bb_upper', 'bb_middle', 'bb_lower'): ('bbands', {}),
+    }
+    streaming_indicators = True
+
     def informative_pairs(self) -> list:
         return []
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
-
-        # Core indicators for winter market
-        df['ema_9'] = ta.EMA(df['close'].values, timeperiod=9)
-        df['ema_21'] = ta.EMA(df['close'].values, timeperiod=21)
-        df['ema_50'] = ta.EMA(df['close'].values, timeperiod=50)
-        df['rsi'] = ta.RSI(df['close'].values, timeperiod=14)
-        df['volume_sma'] = ta.SMA(df['volume'].values, timeperiod=20)
+        df = dataframe
+
+        # Core indicators for winter market (EMA/RSI/MACD/BBANDS from the shared cache)
+        df = self.add_indicators(df, metadata)
         df['volume_ratio'] = df['volume'] / df['volume_sma']
 
         # Momentum indicators
         df['momentum'] = df['close'] / df['close'].shift(3) - 1
 
-        # Market regime detection (simplified)
-        df['returns'] = df['close'].pct_change()
-        df['volatility'] = df['returns'].rolling(20).std()
-        df['trend_strength'] = abs(df['ema_9'] - df['ema_21']) / df['close']
+        # Market regime detection (trend_strength > 0.5%: trending, volatility
+        # > 1.1x its 50-candle mean: volatile, else ranging), shared per candle
+        # by every pair of the whitelist
+        df = self.add_regime_columns(df, metadata)
 
-        # Very lenient regime detection for current market
-        # Allow trading in any regime with basic trend
-        df['regime'] = np.where(df['trend_strength'] > 0.005, 2,  # Very low threshold for trending
-                               np.where(df['volatility'] > df['volatility'].rolling(50).mean() * 1.1, 1, 0))  # Volatile, Ranging
-
-        # MACD for timing
-        macd, macdsignal, macdhist = ta.MACD(df['close'].values)
-        df['macd'] = macd
-        df['macd_signal'] = macdsignal
-        df['macd_hist'] = macdhist
-
-        # Bollinger Bands
-        df['bb_upper'], df['bb_middle'], df['bb_lower'] = ta.BBANDS(df['close'].values)
+        # Bollinger Bands position
         df['bb_position'] = (df['close'] - df['bb_lower']) / (df['bb_upper'] - df['bb_lower'])
 
+        # Highest leverage whose liquidation stays out of the ATR's reach
+        df = self.add_risk_columns(df, metadata)
+
         return df
 
     def leverage(self, pair: str, current_time: datetime, current_rate: float,
-                 current_profit: float, min_stops: float, max_stops: float,
-                 current_time_rows: DataFrame, **kwargs) -> float:
+                 proposed_leverage: float, max_leverage: float, entry_tag, side: str,
+                 **kwargs) -> float:
         base_leverage = self.leverage_config.get(pair, 25.0)
 
-        # Adjust leverage based on market regime
-        if not current_time_rows.empty:
-            regime = current_time_rows['regime'].iloc[-1] if 'regime' in current_time_rows.columns else 0
-            volatility = current_time_rows['natr'].iloc[-1] if 'natr' in current_time_rows.columns else 0.02
+        # Adjust leverage based on market regime of the last analyzed candle
+        last = self.regime_at(pair, current_time)
+        if last is not None:
+            regime = last['regime']
+            volatility = 0.02 if np.isnan(last['natr']) else last['natr']
 
             # High volatility = lower leverage
             if regime == 1 or volatility > 0.03:
@@ -115,16 +114,13 @@ class AdaptiveHighRiskStrategy(IStrategy):
             elif regime == 2:
                 base_leverage *= 1.2
 
-        # Adjust based on current profit
-        if current_profit > 0.05:
-            base_leverage *= 1.1  # Increase leverage when winning
-        elif current_profit < -0.05:
-            base_leverage *= 0.9  # Decrease when losing
+        # Never past the level the liquidation risk columns allow
+        base_leverage = self.risk_leverage(pair, current_time, base_leverage)
 
-        return min(base_leverage, 50.0)  # Cap at 50x
+        return min(base_leverage, 50.0, max_leverage)  # Cap at 50x
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['enter_long'] = 0
 
         if len(df) < self.startup_candle_count:
@@ -175,7 +171,7 @@ class AdaptiveHighRiskStrategy(IStrategy):
         return df
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['exit'] = 0
 
         # Dynamic exit conditions based on regime
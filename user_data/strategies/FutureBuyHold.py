@@ -1,10 +1,11 @@
-from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import pandas as pd
 from datetime import datetime
 
+from _base import BaseFuturesStrategy
 
-class FutureBuyHold(IStrategy):
+
+class FutureBuyHold(BaseFuturesStrategy):
     timeframe = '1m'
     max_open_trades = 3
     stake_amount = 0.30
@@ -49,18 +50,18 @@ class FutureBuyHold(IStrategy):
         return []
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
-        df['ema_20'] = pd.Series(df['close']).ewm(span=20, adjust=False).mean()
-        df['ema_50'] = pd.Series(df['close']).ewm(span=50, adjust=False).mean()
+        df = dataframe
+        df['ema_20'] = self.indicator(df, metadata, 'ewm', span=20)
+        df['ema_50'] = self.indicator(df, metadata, 'ewm', span=50)
         return df
 
     def leverage(self, pair: str, current_time: datetime, current_rate: float,
-                 current_profit: float, min_stops: float, max_stops: float,
-                 current_time_rows: DataFrame, **kwargs) -> float:
-        return self.leverage_config.get(pair, 3.0)
+                 proposed_leverage: float, max_leverage: float, entry_tag, side: str,
+                 **kwargs) -> float:
+        return min(self.leverage_config.get(pair, 3.0), max_leverage)
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['enter_long'] = 0
 
         if len(df) < self.startup_candle_count:
@@ -72,7 +73,7 @@ class FutureBuyHold(IStrategy):
         return df
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['exit'] = 0
 
         strong_down = df['close'] < df['ema_20']
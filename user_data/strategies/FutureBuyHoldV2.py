@@ -1,10 +1,12 @@
-from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import pandas as pd
+import numpy as np
 from datetime import datetime
 
+from _base import BaseFuturesStrategy
+from _kernels import rolling_mean, true_range
 
-class FutureBuyHoldV2(IStrategy):
+
+class FutureBuyHoldV2(BaseFuturesStrategy):
     timeframe = '1m'
     max_open_trades = 3
     stake_amount = 100
@@ -49,49 +51,30 @@ class FutureBuyHoldV2(IStrategy):
         return []
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
-
-        close = df['close'].values
+        df = dataframe
 
-        df['ema_20'] = pd.Series(close).ewm(span=20, adjust=False).mean().values
-        df['ema_50'] = pd.Series(close).ewm(span=50, adjust=False).mean().values
+        df['ema_20'] = self.indicator(df, metadata, 'ewm', span=20)
+        df['ema_50'] = self.indicator(df, metadata, 'ewm', span=50)
 
         df['atr'] = self._calculate_atr(df, 14)
 
         return df
 
-    def _calculate_atr(self, df: DataFrame, period: int) -> list:
-        high = df['high'].values
-        low = df['low'].values
-        close = df['close'].values
-
-        tr = []
-        for i in range(len(close)):
-            if i == 0:
-                tr.append(high[i] - low[i])
-            else:
-                hl = high[i] - low[i]
-                hc = abs(high[i] - close[i-1])
-                lc = abs(low[i] - close[i-1])
-                tr.append(max(hl, hc, lc))
-
-        atr = pd.Series(tr).rolling(period).mean().values
-        return atr
+    def _calculate_atr(self, df: DataFrame, period: int) -> np.ndarray:
+        # Simple moving average of the true range (not talib's Wilder ATR)
+        tr = true_range(df['high'].values, df['low'].values, df['close'].values)
+        return rolling_mean(tr, period)
 
     def leverage(self, pair: str, current_time: datetime, current_rate: float,
-                 current_profit: float, min_stops: float, max_stops: float,
-                 current_time_rows: DataFrame, **kwargs) -> float:
+                 proposed_leverage: float, max_leverage: float, entry_tag, side: str,
+                 **kwargs) -> float:
+        # leverage() only runs before entry, so there is no trade profit to
+        # scale it down by
         leverage = self.leverage_config.get(pair, 3.0)
-
-        if current_profit < -0.03:
-            leverage = leverage * 0.5
-        elif current_profit < -0.02:
-            leverage = leverage * 0.75
-
-        return min(leverage, 5.0)
+        return min(leverage, 5.0, max_leverage)
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['enter_long'] = 0
 
         if len(df) < self.startup_candle_count:
@@ -104,7 +87,7 @@ class FutureBuyHoldV2(IStrategy):
         return df
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['exit'] = 0
 
         strong_down = df['close'] < df['ema_20']
@@ -114,8 +97,7 @@ class FutureBuyHoldV2(IStrategy):
         return df
 
     def custom_stoploss(self, pair: str, current_time: datetime, current_rate: float,
-                        current_profit: float, min_stops: float, max_stops: float,
-                        current_time_rows: DataFrame, **kwargs) -> float:
+                        current_profit: float, **kwargs) -> float:
         if current_profit > 0.02:
             return 0
         if current_profit > 0.01:
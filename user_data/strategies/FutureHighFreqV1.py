@@ -1,11 +1,12 @@
-from freqtrade.strategy import IStrategy
+from freqtrade.strategy import IntParameter
 from pandas import DataFrame
 from datetime import datetime
 from typing import List
-import talib.abstract as ta
 
+from _base import BaseFuturesStrategy
 
-class FutureHighFreqV1(IStrategy):
+
+class FutureHighFreqV1(BaseFuturesStrategy):
     """
     Simple Trend Following Strategy
 
@@ -51,13 +52,13 @@ class FutureHighFreqV1(IStrategy):
         'unit': 'seconds'
     }
 
-    # ===== Parameters =====
-    fast_ema = 9
-    slow_ema = 21
-    ema50_period = 50
-    rsi_period = 14
-    rsi_buy = 60
-    rsi_sell = 75
+    # ===== Parameters (hyperoptable, periods searched with --analyze-per-epoch) =====
+    fast_ema = IntParameter(5, 15, default=9, space='buy')
+    slow_ema = IntParameter(16, 40, default=21, space='buy')
+    ema50_period = IntParameter(41, 100, default=50, space='buy')
+    rsi_period = IntParameter(7, 21, default=14, space='buy')
+    rsi_buy = IntParameter(40, 70, default=60, space='buy')
+    rsi_sell = IntParameter(65, 90, default=75, space='sell')
 
     cooldown_period = 5
 
@@ -65,10 +66,10 @@ class FutureHighFreqV1(IStrategy):
         return []
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe['fast_ema'] = ta.EMA(dataframe, timeperiod=self.fast_ema)
-        dataframe['slow_ema'] = ta.EMA(dataframe, timeperiod=self.slow_ema)
-        dataframe['ema50'] = ta.EMA(dataframe, timeperiod=self.ema50_period)
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=self.rsi_period)
+        dataframe['fast_ema'] = self.indicator(dataframe, metadata, 'ema', timeperiod=self.fast_ema.value)
+        dataframe['slow_ema'] = self.indicator(dataframe, metadata, 'ema', timeperiod=self.slow_ema.value)
+        dataframe['ema50'] = self.indicator(dataframe, metadata, 'ema', timeperiod=self.ema50_period.value)
+        dataframe['rsi'] = self.indicator(dataframe, metadata, 'rsi', timeperiod=self.rsi_period.value)
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -79,7 +80,7 @@ class FutureHighFreqV1(IStrategy):
         )
 
         # RSI not overbought
-        rsi_ok = dataframe['rsi'] < self.rsi_buy
+        rsi_ok = dataframe['rsi'] < self.rsi_buy.value
 
         conditions = strong_trend & rsi_ok & (dataframe['volume'] > 0)
         dataframe.loc[conditions, 'enter_long'] = 1
@@ -90,7 +91,7 @@ class FutureHighFreqV1(IStrategy):
         trend_reversal = dataframe['fast_ema'] < dataframe['slow_ema']
 
         # Or RSI overbought
-        overbought = dataframe['rsi'] > self.rsi_sell
+        overbought = dataframe['rsi'] > self.rsi_sell.value
 
         conditions = (trend_reversal | overbought) & (dataframe['volume'] > 0)
         dataframe.loc[conditions, 'exit'] = 1
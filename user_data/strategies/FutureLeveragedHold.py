@@ -1,10 +1,11 @@
-from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import pandas as pd
 from datetime import datetime
 
+from _base import BaseFuturesStrategy
 
-class FutureLeveragedHold(IStrategy):
+
+class FutureLeveragedHold(BaseFuturesStrategy):
     timeframe = '1h'
     max_open_trades = 3
     stake_amount = 0.30
@@ -57,20 +58,21 @@ class FutureLeveragedHold(IStrategy):
         return dataframe
 
     def leverage(self, pair: str, current_time: datetime, current_rate: float,
-                 current_profit: float, min_stops: float, max_stops: float,
-                 current_time_rows: DataFrame, **kwargs) -> float:
+                 proposed_leverage: float, max_leverage: float, entry_tag, side: str,
+                 **kwargs) -> float:
         leverage = self.leverage_config.get(pair, 3.0)
-        return min(leverage, 5.0)
+        return min(leverage, 5.0, max_leverage)
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['enter_long'] = 0
 
         if len(df) < self.startup_candle_count:
             return df
 
-        df['ema_9'] = pd.Series(df['close']).ewm(span=9, adjust=False).mean()
-        df['ema_21'] = pd.Series(df['close']).ewm(span=21, adjust=False).mean()
+        # Entry and exit share the cached EMAs instead of recomputing them
+        df['ema_9'] = self.indicator(df, metadata, 'ewm', span=9)
+        df['ema_21'] = self.indicator(df, metadata, 'ewm', span=21)
 
         df['trend_up'] = df['ema_9'] > df['ema_21']
 
@@ -79,11 +81,12 @@ class FutureLeveragedHold(IStrategy):
         return df
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['exit'] = 0
 
-        df['ema_9'] = pd.Series(df['close']).ewm(span=9, adjust=False).mean()
-        df['ema_21'] = pd.Series(df['close']).ewm(span=21, adjust=False).mean()
+        # Entry and exit share the cached EMAs instead of recomputing them
+        df['ema_9'] = self.indicator(df, metadata, 'ewm', span=9)
+        df['ema_21'] = self.indicator(df, metadata, 'ewm', span=21)
 
         df['trend_down'] = df['ema_9'] < df['ema_21']
 
@@ -1,14 +1,18 @@
-from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import numpy as np
-import pandas as pd
-import talib.abstract as ta
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-import os
+from datetime import datetime, timedelta
+from typing import Optional
+from freqtrade.enums import RunMode
 
+from _base import BaseFuturesStrategy
+from _features import FeatureStore
+from _indicators import frame_key
+from _kernels import diff, pct_change, rolling_std
+from _ml_models import (BackgroundTrainer, ModelRegistry, ModelStore, feature_drift, fit_model,
+                        walk_forward_cache)
 
-class FutureMLV1(IStrategy):
+
+class FutureMLV1(BaseFuturesStrategy):
     timeframe = '5m'
     max_open_trades = 5
     stake_amount = 0.20
@@ -40,69 +44,100 @@ class FutureMLV1(IStrategy):
         'unit': 'seconds'
     }
 
+    indicators = {
+        'rsi': ('rsi', {'timeperiod': 14}),
+        'rsi_6': ('rsi', {'timeperiod': 6}),
+        'rsi_24': ('rsi', {'timeperiod': 24}),
+        'ema_9': ('ema', {'timeperiod': 9}),
+        'ema_21': ('ema', {'timeperiod': 21}),
+        'ema_50': ('ema', {'timeperiod': 50}),
+        'ema_200': ('ema', {'timeperiod': 200}),
+        ('macd', 'macd_signal', 'macd_hist'): ('macd', {}),
+        ('bb_upper', 'bb_middle', 'bb_lower'): ('bbands', {}),
+        'atr': ('atr', {'timeperiod': 14}),
+        'volume_sma': ('sma', {'timeperiod': 20, 'source': 'volume'}),
+    }
+
+    feature_columns = [
+        'rsi', 'rsi_6', 'rsi_24',
+        'ema_trend', 'ema_trend_2',
+        'macd', 'macd_signal', 'macd_hist',
+        'bb_position', 'bb_width',
+        'atr_percent',
+        'volume_ratio',
+        'momentum', 'momentum_6', 'momentum_3',
+        'rsi_trend',
+        'volatility',
+        'price_position',
+        'candle_range',
+        'return_1', 'return_3', 'return_6'
+    ]
+
+    model_params = {
+        'n_estimators': 100,
+        'max_depth': 10,
+        'min_samples_split': 20,
+        'min_samples_leaf': 10,
+        'random_state': 42,
+        'n_jobs': -1
+    }
+
     model_path = '/freqtrade/user_data/ml_models'
+    # Live models are retrained in the background once their training window
+    # is older than this, or when the recent features drift from it
+    model_max_age_hours = 24
+    # Artifacts kept on disk per pair (and regime) after each retrain
+    models_kept = 3
+    drift_window = 100
+    drift_threshold = 1.0
+    # Cores for background fits - the bot process keeps the rest - and for the
+    # walk-forward fits in hyperopt, whose -j workers already use every core
+    background_n_jobs = 1
+    # Byte budget for resident per-pair models (config: ml_model_memory_mb)
+    model_memory_mb = 512
     confidence_threshold = 0.55
 
+    # Backtesting: retrain on a rolling window and score the next block out of sample
+    walk_forward_train_candles = 2000
+    walk_forward_test_candles = 576
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.model = None
-        self.scaler = None
-        self.feature_names = None
-        os.makedirs(self.model_path, exist_ok=True)
+        self.model_store = ModelStore(self.model_path, keep=self.models_kept)
+        self.models = ModelRegistry(
+            self.model_store, self.timeframe,
+            max_bytes=int(self.config.get('ml_model_memory_mb', self.model_memory_mb) * 1024 * 1024))
+        self.trainer = BackgroundTrainer(self.models)
+        self.feature_store = FeatureStore(self.feature_columns, self.timeframe)
 
     def informative_pairs(self) -> list:
         return []
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
-
-        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+        df = dataframe
 
-        df['rsi'] = ta.RSI(df['close'].values, timeperiod=14)
-        df['rsi_6'] = ta.RSI(df['close'].values, timeperiod=6)
-        df['rsi_24'] = ta.RSI(df['close'].values, timeperiod=24)
-
-        df['ema_9'] = ta.EMA(df['close'].values, timeperiod=9)
-        df['ema_21'] = ta.EMA(df['close'].values, timeperiod=21)
-        df['ema_50'] = ta.EMA(df['close'].values, timeperiod=50)
-        df['ema_200'] = ta.EMA(df['close'].values, timeperiod=200)
-
-        macd = ta.MACD(df['close'].values)
-        df['macd'] = macd[0]
-        df['macd_signal'] = macd[1]
-        df['macd_hist'] = macd[2]
-
-        df['bb_upper'] = ta.BBANDS(df['close'].values)[0]
-        df['bb_middle'] = ta.BBANDS(df['close'].values)[1]
-        df['bb_lower'] = ta.BBANDS(df['close'].values)[2]
-
-        df['atr'] = ta.ATR(df['high'].values, df['low'].values, df['close'].values, timeperiod=14)
-
-        df['volume_sma'] = ta.SMA(df['volume'].values, timeperiod=20)
+        df = self.add_indicators(df, metadata)
 
         close_arr = df['close'].values
 
-        df['momentum'] = close_arr / np.roll(close_arr, 12) - 1
-        df['momentum_6'] = close_arr / np.roll(close_arr, 6) - 1
-        df['momentum_3'] = close_arr / np.roll(close_arr, 3) - 1
+        df['momentum'] = pct_change(close_arr, 12)
+        df['momentum_6'] = pct_change(close_arr, 6)
+        df['momentum_3'] = pct_change(close_arr, 3)
 
         df['ema_trend'] = (df['ema_9'] - df['ema_50']) / close_arr
         df['ema_trend_2'] = (df['ema_21'] - df['ema_50']) / close_arr
 
-        df['rsi_trend'] = df['rsi'] - np.roll(df['rsi'], 6)
+        df['rsi_trend'] = diff(df['rsi'].values, 6)
 
-        df['volatility'] = pd.Series(close_arr).pct_change().rolling(12).std().values
+        df['volatility'] = rolling_std(pct_change(close_arr), 12)
 
         df['price_position'] = close_arr / df['ema_200'] - 1
 
         df['candle_range'] = (df['high'] - df['low']) / close_arr
 
-        df['return_1'] = pd.Series(close_arr).pct_change(1).values
-        df['return_3'] = pd.Series(close_arr).pct_change(3).values
-        df['return_6'] = pd.Series(close_arr).pct_change(6).values
+        df['return_1'] = pct_change(close_arr, 1)
+        df['return_3'] = pct_change(close_arr, 3)
+        df['return_6'] = pct_change(close_arr, 6)
 
         df['volume_ratio'] = df['volume'] / df['volume_sma']
 
@@ -113,29 +148,12 @@ class FutureMLV1(IStrategy):
 
         return df
 
-    def create_features(self, df: DataFrame) -> tuple:
-        feature_columns = [
-            'rsi', 'rsi_6', 'rsi_24',
-            'ema_trend', 'ema_trend_2',
-            'macd', 'macd_signal', 'macd_hist',
-            'bb_position', 'bb_width',
-            'atr_percent',
-            'volume_ratio',
-            'momentum', 'momentum_6', 'momentum_3',
-            'rsi_trend',
-            'volatility',
-            'price_position',
-            'candle_range',
-            'return_1', 'return_3', 'return_6'
-        ]
-
-        available_cols = [c for c in feature_columns if c in df.columns]
-        df_features = df[available_cols].copy()
-
-        df_features = df_features.replace([np.inf, -np.inf], np.nan)
-        df_features = df_features.fillna(0)
-
-        return df_features.values, available_cols
+    def create_features(self, df: DataFrame, pair: str) -> tuple:
+        """
+        Read-only feature matrix of the frame (non-finite values as 0) and the
+        feature names, built once per candle and shared by training, entry and exit.
+        """
+        return self.feature_store.matrix(df, pair)
 
     def create_labels(self, df: DataFrame, lookahead: int = 3) -> np.ndarray:
         close = df['close'].values
@@ -150,63 +168,152 @@ class FutureMLV1(IStrategy):
 
         return labels
 
-    def train_model(self, df: DataFrame):
-        features, feature_names = self.create_features(df)
+    def training_data(self, df: DataFrame, features: np.ndarray, feature_names: list):
+        """
+        Features and labels of the labelled, finite rows of the frame.
+        `features` holds the feature rows of `df`.
+        Returns (features, labels, feature_names), or None if fewer than 100 rows.
+        """
         labels = self.create_labels(df)
+        # The last `lookahead` candles have no label yet
+        features = features[:len(labels)]
 
         valid_idx = np.isfinite(features).all(axis=1) & np.isfinite(labels)
         features = features[valid_idx]
         labels = labels[valid_idx]
 
         if len(features) < 100:
+            return None
+
+        return features, labels, feature_names
+
+    def train_model(self, df: DataFrame, features: np.ndarray, feature_names: list,
+                    model_params: Optional[dict] = None):
+        """
+        Fit scaler and forest on the frame (with `model_params`, default
+        the strategy's). Returns the model artifact dict, or None if there
+        are not enough valid rows.
+        """
+        data = self.training_data(df, features, feature_names)
+        if data is None:
+            return None
+        features, labels, feature_names = data
+
+        artifact = fit_model(features, labels, model_params or self.model_params)
+        artifact['feature_names'] = feature_names
+        return artifact
+
+    def get_model(self, pair: str, feature_names: list) -> dict:
+        """
+        This pair's current model from the registry, lazily loaded from disk.
+        None if no model was trained yet.
+        """
+        return self.models.get(pair, feature_names)
+
+    def needs_retrain(self, dataframe: DataFrame, features: np.ndarray, artifact: dict) -> bool:
+        """
+        Retrain when there is no model, when it was trained on data older
+        than `model_max_age_hours`, or when the recent features drifted away
+        from its training distribution.
+        """
+        if artifact is None:
+            return True
+        train_end = datetime.fromisoformat(artifact['manifest']['train_end'])
+        if dataframe['date'].iloc[-1] - train_end > timedelta(hours=self.model_max_age_hours):
+            return True
+        return feature_drift(features[-self.drift_window:], artifact['scaler']) > self.drift_threshold
+
+    def schedule_training(self, dataframe: DataFrame, features: np.ndarray, feature_names: list,
+                          pair: str) -> bool:
+        """
+        Queue a background fit on the frame (minus the last 10 candles).
+        The current model keeps serving until the new one is published.
+        """
+        if self.trainer.is_training(pair):
             return False
-
-        self.scaler = StandardScaler()
-        features_scaled = self.scaler.fit_transform(features)
-
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            min_samples_split=20,
-            min_samples_leaf=10,
-            random_state=42,
-            n_jobs=-1
-        )
-
-        self.model.fit(features_scaled, labels)
-        self.feature_names = feature_names
-
-        return True
-
-    def predict(self, df: DataFrame) -> tuple:
-        if self.model is None:
-            return 0.5, 0
-
-        features, _ = self.create_features(df)
-        features = features[-1:]
-
-        if not np.isfinite(features).all():
-            return 0.5, 0
-
-        try:
-            features_scaled = self.scaler.transform(features)
-        except:
-            return 0.5, 0
+        df_train = dataframe.iloc[:-10]
+        # Boolean row selection copies, so the worker never sees the reused buffer
+        data = self.training_data(df_train, features[:-10], feature_names)
+        if data is None:
+            return False
+        features, labels, feature_names = data
+        return self.trainer.submit(
+            pair, features, labels, feature_names,
+            df_train['date'].iloc[0].to_pydatetime(), df_train['date'].iloc[-1].to_pydatetime(),
+            {**self.model_params, 'n_jobs': self.background_n_jobs})
+
+    def predict_batch(self, features: np.ndarray, artifact: dict) -> tuple:
+        """
+        Score a block of feature rows with one predict_proba call.
+        Returns (confidence, signal) arrays; rows that cannot be scored get
+        confidence 0.5 and signal 0.
+        """
+        confidence = np.full(len(features), 0.5)
+        signal = np.zeros(len(features), dtype=int)
+        if artifact is None or len(features) == 0:
+            return confidence, signal
+
+        model = artifact['model']
+        classes = list(model.classes_)
+        if len(classes) < 3:
+            return confidence, signal
+
+        valid = np.isfinite(features).all(axis=1)
+        if not valid.any():
+            return confidence, signal
 
         try:
-            proba = self.model.predict_proba(features_scaled)[0]
-        except:
-            return 0.5, 0
+            proba = model.predict_proba(artifact['scaler'].transform(features[valid]))
+        except ValueError:
+            return confidence, signal
 
-        if len(proba) < 3:
-            return 0.5, 0
+        up_prob = proba[:, classes.index(1)]
+        down_prob = proba[:, classes.index(-1)]
 
-        up_prob = proba[2] if len(proba) == 3 else proba[1]
-        down_prob = proba[0] if len(proba) == 3 else proba[0]
+        confidence[valid] = np.abs(up_prob - down_prob)
+        signal[valid] = np.where(up_prob > down_prob, 1, -1)
 
-        confidence = abs(up_prob - down_prob)
-        signal = 1 if up_prob > down_prob else -1
+        return confidence, signal
 
+    def predict(self, features: np.ndarray, artifact: dict) -> tuple:
+        """
+        Confidence and signal for the latest candle.
+        """
+        confidence, signal = self.predict_batch(features[-1:], artifact)
+        return confidence[0], signal[0]
+
+    def walk_forward_predict(self, dataframe: DataFrame, features: np.ndarray, feature_names: list,
+                             pair: str) -> tuple:
+        """
+        Walk-forward scoring for backtesting: retrain on the previous
+        `walk_forward_train_candles` rows every `walk_forward_test_candles`
+        rows and score the following out-of-sample block in one batch.
+        Rows before the first block stay at confidence 0.5 / signal 0.
+        The fits are deterministic, so the (read-only) result is kept in
+        walk_forward_cache and reused for the same candle window, e.g. by
+        every hyperopt epoch.
+        """
+        window = frame_key(dataframe, pair, self.timeframe)
+        key = None if window is None else (type(self).__name__,) + window
+        cached = None if key is None else walk_forward_cache.get(key)
+        if cached is not None:
+            return cached
+
+        model_params = self.model_params
+        if self.config.get('runmode') == RunMode.HYPEROPT:
+            model_params = {**model_params, 'n_jobs': self.background_n_jobs}
+
+        confidence = np.full(len(dataframe), 0.5)
+        signal = np.zeros(len(dataframe), dtype=int)
+
+        for start in range(self.walk_forward_train_candles, len(dataframe), self.walk_forward_test_candles):
+            end = min(start + self.walk_forward_test_candles, len(dataframe))
+            train = slice(start - self.walk_forward_train_candles, start)
+            artifact = self.train_model(dataframe.iloc[train], features[train], feature_names, model_params)
+            confidence[start:end], signal[start:end] = self.predict_batch(features[start:end], artifact)
+
+        if key is not None:
+            return walk_forward_cache.put(key, confidence, signal)
         return confidence, signal
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -216,17 +323,30 @@ class FutureMLV1(IStrategy):
             return dataframe
 
         try:
-            if self.model is None:
-                df_train = dataframe.iloc[:-10].copy()
-                self.train_model(df_train)
-
-            confidence, signal = self.predict(dataframe)
-
-            strong_buy = (confidence > self.confidence_threshold) & (signal == 1)
+            features, feature_names = self.create_features(dataframe, metadata['pair'])
+            if self.config.get('runmode') in (RunMode.BACKTEST, RunMode.HYPEROPT):
+                confidence, signal = self.walk_forward_predict(dataframe, features, feature_names,
+                                                                metadata['pair'])
+            else:
+                # Live: publish finished retrains, predict with the current
+                # model and queue a retrain off the candle path if needed.
+                # Only the latest candle is acted upon.
+                self.trainer.poll()
+                artifact = self.get_model(metadata['pair'], feature_names)
+                if self.needs_retrain(dataframe, features, artifact):
+                    self.schedule_training(dataframe, features, feature_names, metadata['pair'])
+                confidence = np.full(len(dataframe), np.nan)
+                signal = np.zeros(len(dataframe), dtype=int)
+                confidence[-1], signal[-1] = self.predict(features, artifact)
+
+            dataframe['ml_confidence'] = confidence
+            dataframe['ml_signal'] = signal
+
+            strong_buy = (dataframe['ml_confidence'] > self.confidence_threshold) & (dataframe['ml_signal'] == 1)
             dataframe.loc[strong_buy, 'enter_long'] = 1
 
-        except Exception:
-            pass
+        except Exception as e:
+            self.record_exception(metadata, 'populate_entry_trend', e)
 
         return dataframe
 
@@ -237,19 +357,24 @@ class FutureMLV1(IStrategy):
             return dataframe
 
         try:
-            if self.model is None:
-                return dataframe
-
-            confidence, signal = self.predict(dataframe)
-
-            strong_sell = (confidence > self.confidence_threshold) & (signal == -1)
+            if 'ml_signal' not in dataframe.columns:
+                features, feature_names = self.create_features(dataframe, metadata['pair'])
+                artifact = self.get_model(metadata['pair'], feature_names)
+                if artifact is None:
+                    return dataframe
+                dataframe['ml_confidence'] = np.nan
+                dataframe['ml_signal'] = 0
+                confidence, signal = self.predict(features, artifact)
+                dataframe.loc[dataframe.index[-1], ['ml_confidence', 'ml_signal']] = [confidence, signal]
+
+            strong_sell = (dataframe['ml_confidence'] > self.confidence_threshold) & (dataframe['ml_signal'] == -1)
             dataframe.loc[strong_sell, 'exit'] = 1
 
             if 'rsi' in dataframe.columns:
                 overbought = dataframe['rsi'] > 80
                 dataframe.loc[overbought, 'exit'] = 1
 
-        except Exception:
-            pass
+        except Exception as e:
+            self.record_exception(metadata, 'populate_exit_trend', e)
 
         return dataframe
@@ -1,11 +1,10 @@
-from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import numpy as np
-import pandas as pd
-import talib.abstract as ta
 
+from _base import BaseFuturesStrategy
+from _kernels import diff, pct_change, rolling_std
 
-class FutureMLV2(IStrategy):
+
+class FutureMLV2(BaseFuturesStrategy):
     timeframe = '5m'
     max_open_trades = 5
     stake_amount = 0.20
@@ -37,35 +36,38 @@ class FutureMLV2(IStrategy):
         'unit': 'seconds'
     }
 
+    indicators = {
+        'rsi': ('rsi', {'timeperiod': 14}),
+        'rsi_6': ('rsi', {'timeperiod': 6}),
+        'ema_9': ('ema', {'timeperiod': 9}),
+        'ema_21': ('ema', {'timeperiod': 21}),
+        'ema_50': ('ema', {'timeperiod': 50}),
+    }
+
     def informative_pairs(self) -> list:
         return []
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
 
         close_arr = df['close'].values
 
-        df['rsi'] = ta.RSI(close_arr, timeperiod=14)
-        df['rsi_6'] = ta.RSI(close_arr, timeperiod=6)
-
-        df['ema_9'] = ta.EMA(close_arr, timeperiod=9)
-        df['ema_21'] = ta.EMA(close_arr, timeperiod=21)
-        df['ema_50'] = ta.EMA(close_arr, timeperiod=50)
+        df = self.add_indicators(df, metadata)
 
         df['ema_trend'] = (df['ema_9'] - df['ema_21']) / close_arr
         df['ema_trend_strong'] = ((df['ema_9'] - df['ema_50']) / close_arr)
 
-        df['momentum'] = close_arr / np.roll(close_arr, 12) - 1
-        df['momentum_6'] = close_arr / np.roll(close_arr, 6) - 1
+        df['momentum'] = pct_change(close_arr, 12)
+        df['momentum_6'] = pct_change(close_arr, 6)
 
-        df['volatility'] = pd.Series(close_arr).pct_change().rolling(12).std().values
+        df['volatility'] = rolling_std(pct_change(close_arr), 12)
 
-        df['rsi_trend'] = df['rsi'] - np.roll(df['rsi'], 6)
+        df['rsi_trend'] = diff(df['rsi'].values, 6)
 
         return df
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['enter_long'] = 0
 
         if len(df) < self.startup_candle_count:
@@ -92,13 +94,13 @@ class FutureMLV2(IStrategy):
 
             df.loc[strong_buy, 'enter_long'] = 1
 
-        except Exception:
-            pass
+        except Exception as e:
+            self.record_exception(metadata, 'populate_entry_trend', e)
 
         return df
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['exit'] = 0
 
         if len(df) < self.startup_candle_count:
@@ -118,7 +120,7 @@ class FutureMLV2(IStrategy):
 
             df.loc[sell, 'exit'] = 1
 
-        except Exception:
-            pass
+        except Exception as e:
+            self.record_exception(metadata, 'populate_exit_trend', e)
 
         return df
@@ -1,10 +1,11 @@
-from freqtrade.strategy import IStrategy
+from freqtrade.strategy import DecimalParameter, IntParameter
 from pandas import DataFrame
 from typing import List
-import talib.abstract as ta
 
+from _base import BaseFuturesStrategy
 
-class FutureMeanRevV1(IStrategy):
+
+class FutureMeanRevV1(BaseFuturesStrategy):
     """
     Futures Mean Reversion Strategy V1
 
@@ -39,12 +40,14 @@ class FutureMeanRevV1(IStrategy):
         'unit': 'seconds'
     }
 
-    # Strategy-specific parameters
-    bb_period = 20
-    bb_std = 2.0
-    rsi_period = 14
-    rsi_oversold = 35
-    rsi_overbought = 75
+    # Strategy-specific parameters (hyperoptable). The band and RSI periods
+    # shape the populate_indicators columns, so hyperopt searches them with
+    # --analyze-per-epoch (hyperopt.sh passes it for this strategy)
+    bb_period = IntParameter(10, 40, default=20, space='buy')
+    bb_std = DecimalParameter(1.5, 3.0, decimals=1, default=2.0, space='buy')
+    rsi_period = IntParameter(7, 21, default=14, space='buy')
+    rsi_oversold = IntParameter(20, 45, default=35, space='buy')
+    rsi_overbought = IntParameter(60, 85, default=75, space='sell')
 
     def informative_pairs(self) -> List[tuple]:
         """
@@ -56,12 +59,13 @@ class FutureMeanRevV1(IStrategy):
         """
         Calculate indicators for the strategy.
         """
-        bb = ta.BBANDS(dataframe, timeperiod=self.bb_period, nbdevup=self.bb_std, nbdevdn=self.bb_std)
-        dataframe['bb_lower'] = bb['lowerband']
-        dataframe['bb_middle'] = bb['middleband']
-        dataframe['bb_upper'] = bb['upperband']
+        bb_upper, bb_middle, bb_lower = self.indicator(dataframe, metadata, 'bbands', timeperiod=self.bb_period.value,
+                                                       nbdevup=self.bb_std.value, nbdevdn=self.bb_std.value)
+        dataframe['bb_lower'] = bb_lower
+        dataframe['bb_middle'] = bb_middle
+        dataframe['bb_upper'] = bb_upper
 
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=self.rsi_period)
+        dataframe['rsi'] = self.indicator(dataframe, metadata, 'rsi', timeperiod=self.rsi_period.value)
 
         dataframe['bb_position'] = (dataframe['close'] - dataframe['bb_lower']) / (dataframe['bb_upper'] - dataframe['bb_lower'])
 
@@ -73,7 +77,7 @@ class FutureMeanRevV1(IStrategy):
         """
         dataframe.loc[
             (dataframe['bb_position'] < 0.05) &
-            (dataframe['rsi'] < self.rsi_oversold) &
+            (dataframe['rsi'] < self.rsi_oversold.value) &
             (dataframe['volume'] > 0),
             'enter_long'
         ] = 1
@@ -87,7 +91,7 @@ class FutureMeanRevV1(IStrategy):
         dataframe.loc[
             (
                 (dataframe['bb_position'] > 0.95) |
-                (dataframe['rsi'] > self.rsi_overbought)
+                (dataframe['rsi'] > self.rsi_overbought.value)
             ) &
             (dataframe['volume'] > 0),
             'exit'
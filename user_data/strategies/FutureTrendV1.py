@@ -1,10 +1,10 @@
-from freqtrade.strategy import IStrategy
+from freqtrade.strategy import BooleanParameter, IntParameter
 from pandas import DataFrame
-from typing import List
-import talib.abstract as ta
 
+from _base import BaseFuturesStrategy
 
-class FutureTrendV1(IStrategy):
+
+class FutureTrendV1(BaseFuturesStrategy):
     """
     Futures Trend Following Strategy V1
 
@@ -12,6 +12,7 @@ class FutureTrendV1(IStrategy):
     - Uses EMA crossover and RSI for trend identification
     - Buy when fast EMA crosses above slow EMA and RSI < 70
     - Sell when fast EMA crosses below slow EMA or RSI > 80
+    - Optionally (leader_filter) only enter alt-coins while BTC and ETH trend up
     """
 
     # Base configuration from BaseFuturesStrategy
@@ -39,25 +40,36 @@ class FutureTrendV1(IStrategy):
         'unit': 'seconds'
     }
 
-    # Strategy-specific parameters
-    fast_ema = 12
-    slow_ema = 26
-    rsi_period = 14
+    # Strategy-specific parameters (hyperoptable). The indicator periods
+    # shape the populate_indicators columns, so hyperopt searches them with
+    # --analyze-per-epoch (hyperopt.sh passes it)
+    fast_ema = IntParameter(5, 20, default=12, space='buy')
+    slow_ema = IntParameter(21, 60, default=26, space='buy')
+    rsi_period = IntParameter(7, 21, default=14, space='buy')
+    leader_filter = BooleanParameter(default=False, space='buy')
 
-    def informative_pairs(self) -> List[tuple]:
-        """
-        Define informative pairs.
-        """
-        return []
+    # BTC/ETH trend, joined onto every pair once per candle (see add_informative_indicators)
+    leader_pairs = ('BTC/USDT:USDT', 'ETH/USDT:USDT')
+    informative_indicators = {
+        ('BTC/USDT:USDT', '5m'): {
+            'btc_ema_50': ('ema', {'timeperiod': 50}),
+            'btc_ema_200': ('ema', {'timeperiod': 200}),
+        },
+        ('ETH/USDT:USDT', '5m'): {
+            'eth_ema_50': ('ema', {'timeperiod': 50}),
+            'eth_ema_200': ('ema', {'timeperiod': 200}),
+        },
+    }
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """
         Calculate indicators for strategy.
         """
-        dataframe['fast_ema'] = ta.EMA(dataframe, timeperiod=self.fast_ema)
-        dataframe['slow_ema'] = ta.EMA(dataframe, timeperiod=self.slow_ema)
+        dataframe['fast_ema'] = self.indicator(dataframe, metadata, 'ema', timeperiod=self.fast_ema.value)
+        dataframe['slow_ema'] = self.indicator(dataframe, metadata, 'ema', timeperiod=self.slow_ema.value)
 
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=self.rsi_period)
+        dataframe['rsi'] = self.indicator(dataframe, metadata, 'rsi', timeperiod=self.rsi_period.value)
+        dataframe = self.add_informative_indicators(dataframe, metadata)
 
         return dataframe
 
@@ -71,6 +83,11 @@ class FutureTrendV1(IStrategy):
             (dataframe['rsi'] < 70) &
             (dataframe['volume'] > 0)
         )
+        if self.leader_filter.value and metadata['pair'] not in self.leader_pairs:
+            entry_conditions &= (
+                (dataframe['btc_ema_50'] > dataframe['btc_ema_200']) &
+                (dataframe['eth_ema_50'] > dataframe['eth_ema_200'])
+            )
 
         dataframe.loc[entry_conditions, 'enter_long'] = 1
 
@@ -1,11 +1,11 @@
-from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import pandas as pd
-import talib.abstract as ta
 from datetime import datetime
 
+from _base import BaseFuturesStrategy
 
-class FutureUltraMomentum(IStrategy):
+
+class FutureUltraMomentum(BaseFuturesStrategy):
     timeframe = '1m'
     max_open_trades = 1
     stake_amount = 100
@@ -42,20 +42,26 @@ class FutureUltraMomentum(IStrategy):
         'DOGE/USDT:USDT': 25.0
     }
 
+    indicators = {
+        'rsi': ('rsi', {'timeperiod': 14}),
+        'rsi_6': ('rsi', {'timeperiod': 6}),
+        'volume_sma': ('sma', {'timeperiod': 20, 'source': 'volume'}),
+        'ema_12': ('ema', {'timeperiod': 12}),
+        'ema_26': ('ema', {'timeperiod': 26}),
+        'atr': ('atr', {'timeperiod': 14}),
+    }
+    streaming_indicators = True
+
     def informative_pairs(self) -> list:
         return []
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
 
-        # Core indicators
-        df['rsi'] = ta.RSI(df['close'].values, timeperiod=14)
-        df['rsi_6'] = ta.RSI(df['close'].values, timeperiod=6)
-        df['volume_sma'] = ta.SMA(df['volume'].values, timeperiod=20)
+        # Core, trend and volatility indicators from the shared cache
+        df = self.add_indicators(df, metadata)
 
         # Trend indicators
-        df['ema_12'] = ta.EMA(df['close'].values, timeperiod=12)
-        df['ema_26'] = ta.EMA(df['close'].values, timeperiod=26)
         df['ema_trend'] = (df['ema_12'] - df['ema_26']) / df['close']
 
         # Momentum indicators
@@ -63,7 +69,6 @@ class FutureUltraMomentum(IStrategy):
         df['momentum_6'] = df['close'] / df['close'].shift(6) - 1
 
         # Volatility
-        df['atr'] = ta.ATR(df['high'].values, df['low'].values, df['close'].values, timeperiod=14)
         df['atr_percent'] = df['atr'] / df['close']
 
         # Volume indicators
@@ -74,15 +79,19 @@ class FutureUltraMomentum(IStrategy):
         df['high_5m'] = pd.Series(df['high']).rolling(5).max().values
         df['close_change'] = df['close'].pct_change(3)
 
+        # Highest leverage whose liquidation stays out of the ATR's reach
+        df = self.add_risk_columns(df, metadata)
+
         return df
 
     def leverage(self, pair: str, current_time: datetime, current_rate: float,
-                 current_profit: float, min_stops: float, max_stops: float,
-                 current_time_rows: DataFrame, **kwargs) -> float:
-        return self.leverage_config.get(pair, 25.0)
+                 proposed_leverage: float, max_leverage: float, entry_tag, side: str,
+                 **kwargs) -> float:
+        leverage = self.risk_leverage(pair, current_time, self.leverage_config.get(pair, 25.0))
+        return min(leverage, max_leverage)
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['enter_long'] = 0
 
         if len(df) < self.startup_candle_count:
@@ -111,7 +120,7 @@ class FutureUltraMomentum(IStrategy):
         return df
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['exit'] = 0
 
         # Trend reversal exits
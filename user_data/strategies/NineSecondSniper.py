@@ -1,12 +1,12 @@
-from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import pandas as pd
-import talib.abstract as ta
 from datetime import datetime
 import numpy as np
 
+from _base import BaseFuturesStrategy
+from _kernels import pct_change, shift
 
-class NineSecondSniper(IStrategy):
+
+class NineSecondSniper(BaseFuturesStrategy):
     """
     9秒狙击手策略 - 真实实现
 
@@ -52,67 +52,54 @@ class NineSecondSniper(IStrategy):
         'DOGE/USDT:USDT': 4.0
     }
 
-    # 9秒价格缓冲区（环形缓冲区）
+    indicators = {
+        'sar': ('sar', {'acceleration': 0.02, 'maximum': 0.2}),
+        'volume_sma': ('sma', {'timeperiod': 10, 'source': 'volume'}),
+    }
+    streaming_indicators = True
+
+    # 缓冲区动量窗口（最近9根K线）
     price_buffer_size = 9
-    price_buffers = {}  # 为每个交易对维护缓冲区
 
     def informative_pairs(self) -> list:
         return []
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
-        pair = metadata['pair']
+        df = dataframe
 
-        # SAR指标 - 恢复标准参数
-        df['sar'] = ta.SAR(df['high'].values, df['low'].values,
-                          acceleration=0.02, maximum=0.2)
+        # SAR指标 - 恢复标准参数 (成交量SMA一并计算, 实盘为增量更新)
+        df = self.add_indicators(df, metadata)
 
         # SAR压制判断：价格在SAR下方
         df['sar_suppression'] = df['close'] < df['sar']
 
         # 9秒价格对比（当前价格 vs 9秒前价格）
-        df['price_9sec_ago'] = df['close'].shift(9)  # 9根K线前 = 9分钟 ≈ 9秒概念
-        df['price_change_9sec'] = (df['close'] - df['price_9sec_ago']) / df['price_9sec_ago']
+        close = df['close'].values
+        df['price_9sec_ago'] = shift(close, 9)  # 9根K线前 = 9分钟 ≈ 9秒概念
+        df['price_change_9sec'] = pct_change(close, 9)
 
         # 波动幅度要求（动能判断）
         df['volatility_9sec'] = abs(df['price_change_9sec'])
 
         # 成交量确认
-        df['volume_sma'] = ta.SMA(df['volume'].values, timeperiod=10)
         df['volume_ratio'] = df['volume'] / df['volume_sma']
 
-        # 环形缓冲区维护（模拟代码的高级设计）
-        if pair not in self.price_buffers:
-            self.price_buffers[pair] = np.zeros(self.price_buffer_size)
-
-        # 更新缓冲区（存储最近9秒价格）
-        buffer = self.price_buffers[pair]
-        for i in range(len(df)):
-            if i >= self.price_buffer_size:
-                # 环形缓冲区逻辑： oldest -> newest
-                buffer[:-1] = buffer[1:]
-                buffer[-1] = df['close'].iloc[i]
-
-        # 从缓冲区计算9秒动量
-        df['buffer_momentum'] = 0.0
-        if len(buffer) >= self.price_buffer_size:
-            df['buffer_momentum'] = (buffer[-1] - buffer[0]) / buffer[0]
+        # 缓冲区动量（逐行向量化）：每一行 = 最近9根K线 oldest -> newest 的涨幅
+        buffer_momentum = pct_change(close, self.price_buffer_size - 1)
+        buffer_momentum[np.isnan(buffer_momentum)] = 0.0
+        df['buffer_momentum'] = buffer_momentum
 
         return df
 
     def leverage(self, pair: str, current_time: datetime, current_rate: float,
-                 current_profit: float, min_stops: float, max_stops: float,
-                 current_time_rows: DataFrame, **kwargs) -> float:
+                 proposed_leverage: float, max_leverage: float, entry_tag, side: str,
+                 **kwargs) -> float:
+        # leverage() 只在开仓前调用，没有持仓盈利可供减半杠杆
         base_leverage = self.leverage_config.get(pair, 5.0)
-
-        # 恢复仓位减半机制：盈利时自动减半仓位（降低风险）
-        if current_profit > 0.005:  # 0.5%盈利就开始减仓
-            base_leverage *= 0.5  # 减半杠杆
-
-        return min(base_leverage, 15.0)
+        return min(base_leverage, 15.0, max_leverage)
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['enter_long'] = 0
 
         if len(df) < self.startup_candle_count:
@@ -136,7 +123,7 @@ class NineSecondSniper(IStrategy):
         return df
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        df = dataframe.copy()
+        df = dataframe
         df['exit'] = 0
 
         # SAR反转：SAR跌破价格（原压制失效）
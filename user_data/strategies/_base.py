@@ -1,6 +1,27 @@
+import sys
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+from freqtrade.enums import RunMode
+from freqtrade.exchange import timeframe_to_seconds
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from _frames import CandleGuard
+from _indicators import indicator_cache
+from _informative import add_informative
+from _panel import _dates, panel_service, whitelist
+from _profiling import MethodProfiler
+from _regime import regime_service
+from _risk import DEFAULT_LIQUIDATION_BUFFER, DEFAULT_TAKER_FEE, risk_columns
+from _streaming import StreamingIndicators
+# freqtrade's resolver puts this directory on sys.path only while importing a
+# strategy (and then removes its first entry): keep our own entry, so the
+# helper modules above (and _base) stay importable by reference in
+# hyperopt's worker processes, which inherit sys.path
+sys.path.append(str(Path(__file__).resolve().parent))
 
 
 class BaseFuturesStrategy(IStrategy):
@@ -48,11 +69,198 @@ class BaseFuturesStrategy(IStrategy):
         'unit': 'seconds'
     }
 
+    # Shared indicators as {column or (columns...): (indicator name, params)},
+    # filled in by add_indicators() from the process-wide indicator cache
+    indicators: Dict = {}
+
+    # Leader-pair columns joined onto every pair as
+    # {(pair, timeframe): {column: (indicator name, params) or candle column}},
+    # filled in by add_informative_indicators() once per leader candle
+    informative_indicators: Dict = {}
+
+    # Overrides of _regime.DEFAULT_PARAMS for add_regime_columns(), which
+    # computes the regime of the whole whitelist at once per candle
+    regime_params: Dict = {}
+
+    # Keep per-pair recursive indicator state in live/dry-run and update it
+    # with each new candle instead of recomputing the startup window
+    streaming_indicators = False
+
+    # Compute `indicators` for the whole whitelist at once on (time x pairs)
+    # arrays and hand each pair views of its columns (config: panel_indicators)
+    panel_indicators = False
+
+    # ATRs of adverse move the liquidation price must stay beyond for
+    # risk_leverage() to allow a leverage level (see add_risk_columns)
+    risk_atr_multiple = 10.0
+
+    # Trade at the leverage the strategy's leverage() returns instead of
+    # freqtrade's 1x (config: strategy_leverage). Off by default: until
+    # leverage() took freqtrade's arguments it raised and every trade ran at
+    # 1x, and turning this on multiplies position sizes up to the strategy's
+    # leverage_config (3-50x)
+    strategy_leverage = False
+
+    # Record per-pair wall time, calls and exceptions of populate_* and the
+    # callbacks below, exported to <user_data>/logs/strategy_profile_<name>.*
+    # (config: strategy_profile, strategy_profile_dir, strategy_profile_interval)
+    profile_methods = False
+    profile_interval = 60.0
+    profiled_callbacks = ('leverage', 'custom_exit', 'custom_stoploss', 'custom_stake_amount',
+                          'custom_entry_price', 'custom_exit_price', 'confirm_trade_entry',
+                          'confirm_trade_exit', 'adjust_trade_position')
+    _profiler = None
+
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        if not config.get('strategy_leverage', self.strategy_leverage):
+            self.leverage = partial(IStrategy.leverage, self)
+        if not config.get('strategy_profile', self.profile_methods):
+            return
+        directory = config.get('strategy_profile_dir') or \
+            Path(config.get('user_data_dir') or 'user_data') / 'logs'
+        self._profiler = MethodProfiler(type(self).__name__, Path(directory),
+                                        float(config.get('strategy_profile_interval', self.profile_interval)))
+        # Only callbacks the strategy overrides: freqtrade's defaults stay untouched
+        for name in self.profiled_callbacks:
+            if getattr(type(self), name) is not getattr(IStrategy, name):
+                setattr(self, name, self._profiler.wrap(name, getattr(self, name)))
+
+    def record_exception(self, metadata: dict, method: str, error: Exception) -> None:
+        """
+        Count an exception the strategy caught and carried on from.
+        """
+        if self._profiler is not None:
+            self._profiler.record_exception(metadata['pair'], method, error)
+
+    def indicator(self, dataframe: DataFrame, metadata: dict, name: str, **params):
+        """
+        Return indicator `name` for this frame.
+        Computed once per (pair, timeframe, candle window, params) and shared
+        with every other strategy analysing the same candles.
+        """
+        return indicator_cache.compute(dataframe, metadata['pair'], self.timeframe, name, params)
+
+    def add_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """
+        Add the columns declared in `indicators` to the dataframe.
+        """
+        if self.streaming_indicators and self.config.get('runmode') in (RunMode.LIVE, RunMode.DRY_RUN):
+            if getattr(self, '_streaming', None) is None:
+                self._streaming = StreamingIndicators(self.indicators, self.timeframe)
+            for column, values in self._streaming.compute(dataframe, metadata['pair']).items():
+                dataframe[column] = values
+            return dataframe
+
+        if self.config.get('panel_indicators', self.panel_indicators) and self.dp is not None:
+            pair = metadata['pair']
+            columns = panel_service.columns(dataframe, pair, self.dp, whitelist(self.dp, self.config, pair),
+                                            self.timeframe, self.indicators)
+            # None when the frame is not the pair's candle window in the panel
+            if columns is not None:
+                for column, values in columns.items():
+                    dataframe[column] = values
+                return dataframe
+
+        for columns, (name, params) in self.indicators.items():
+            values = self.indicator(dataframe, metadata, name, **params)
+            if isinstance(columns, tuple):
+                for column, column_values in zip(columns, values):
+                    dataframe[column] = column_values
+            else:
+                dataframe[columns] = values
+        return dataframe
+
+    def add_informative_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """
+        Add the columns declared in `informative_indicators`, as-of joined
+        without look-ahead. Computed once per leader candle window and
+        shared by every pair analysed on the same candles.
+        """
+        return add_informative(dataframe, self.timeframe, self.dp, self.informative_indicators)
+
+    def add_regime_columns(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """
+        Add the market regime columns (trend_strength, volatility,
+        volatility_mean, natr, regime) from the whitelist-wide regime panel,
+        computed once per candle for all pairs.
+        """
+        pair = metadata['pair']
+        columns = regime_service.columns(dataframe, pair, self.dp, whitelist(self.dp, self.config, pair),
+                                         self.timeframe, self.regime_params)
+        for column, values in columns.items():
+            dataframe[column] = values
+        return dataframe
+
+    def regime_at(self, pair: str, current_time) -> Optional[Dict[str, float]]:
+        """
+        The regime columns of `pair`'s last closed candle, looked up in the
+        latest regime panel (None before add_regime_columns() ran). O(1),
+        so it is safe to call from leverage() and other callbacks.
+        """
+        return regime_service.at(self.dp, pair, self.timeframe, current_time)
+
+    def add_risk_columns(self, dataframe: DataFrame, metadata: dict, liquidation_levels=()) -> DataFrame:
+        """
+        Add the isolated-margin risk columns (risk_max_leverage,
+        risk_liq_distance, liq_price_<L>x) for every candle in one pass.
+        Uses the frame's `atr` column when it has one. The pair's
+        risk_max_leverage is also kept by candle date for risk_leverage().
+        """
+        atr = dataframe['atr'].to_numpy() if 'atr' in dataframe else \
+            self.indicator(dataframe, metadata, 'atr', timeperiod=14)
+        natr = atr / dataframe['close'].to_numpy()
+        columns = risk_columns(dataframe, metadata['pair'], natr, self.risk_atr_multiple,
+                               float(self.config.get('fee') or DEFAULT_TAKER_FEE),
+                               float(self.config.get('liquidation_buffer', DEFAULT_LIQUIDATION_BUFFER)),
+                               liquidation_levels=liquidation_levels)
+        for column, values in columns.items():
+            dataframe[column] = values
+        if getattr(self, '_risk_max_leverage', None) is None:
+            self._risk_max_leverage = {}
+        self._risk_max_leverage[metadata['pair']] = (_dates(dataframe), columns['risk_max_leverage'])
+        return dataframe
+
+    def risk_leverage(self, pair: str, current_time, leverage: float) -> float:
+        """
+        `leverage` capped at the risk_max_leverage of `pair`'s last candle
+        closed at `current_time` (what get_analyzed_dataframe's last row
+        holds), looked up in the columns add_risk_columns() kept. No frame
+        is fetched, so it is safe to call from leverage().
+        """
+        dates, values = (getattr(self, '_risk_max_leverage', None) or {}).get(pair, (None, None))
+        if dates is None:
+            return leverage
+        moment = int(current_time.timestamp() * 10 ** 9) - timeframe_to_seconds(self.timeframe) * 10 ** 9
+        row = int(np.searchsorted(dates, moment, side='right')) - 1
+        if row < 0 or np.isnan(values[row]):
+            return leverage
+        return min(leverage, float(values[row]))
+
+    def _advise(self, method: str, advise, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        guard = CandleGuard(dataframe)
+        if self._profiler is None:
+            return guard.check(advise(dataframe, metadata), method)
+        return guard.check(self._profiler.call(metadata['pair'], method, advise, dataframe, metadata), method)
+
+    def advise_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """
+        populate_* work on the candle frame itself (no copy) and may only
+        add columns: a change to a candle column raises CandleColumnError.
+        """
+        return self._advise('populate_indicators', super().advise_indicators, dataframe, metadata)
+
+    def advise_entry(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        return self._advise('populate_entry_trend', super().advise_entry, dataframe, metadata)
+
+    def advise_exit(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        return self._advise('populate_exit_trend', super().advise_exit, dataframe, metadata)
+
     def informative_pairs(self) -> List[tuple]:
         """
-        Define additional informative pairs.
+        Define additional informative pairs: those of `informative_indicators`.
         """
-        return []
+        return list(self.informative_indicators)
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """
@@ -0,0 +1,96 @@
+"""
+Per-candle feature store for the ML strategies.
+
+The feature matrix of a pair is built once per candle window into a
+preallocated float64 buffer (rows x features) that is reused for the next
+candle, and the same read-only view is handed to training, entry and exit.
+Non-finite values are stored as 0, as `create_features` always did.
+"""
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from _indicators import frame_key
+
+
+def fill_features(out: np.ndarray, dataframe: DataFrame, columns: List[str]) -> np.ndarray:
+    """
+    Write the columns into `out` (len(dataframe) x len(columns)), with
+    inf/nan replaced by 0. Returns `out`.
+    """
+    for j, column in enumerate(columns):
+        np.copyto(out[:, j], dataframe[column].to_numpy(dtype=np.float64, na_value=np.nan))
+    np.nan_to_num(out, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return out
+
+
+class FeatureStore:
+    """
+    One reusable feature buffer per pair, bounded by total bytes
+    (least recently used pair released first).
+    A view returned by `matrix` is only valid until the next candle of that
+    pair is stored - callers that keep rows must copy them.
+    """
+
+    def __init__(self, columns: List[str], timeframe: str, maxbytes: int = 128 * 1024 * 1024):
+        self.columns = list(columns)
+        self.timeframe = timeframe
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.builds = 0
+        self.allocations = 0
+        self._nbytes = 0
+        # pair -> [frame key, buffer, read-only view, feature names]
+        self._pairs: 'OrderedDict[str, list]' = OrderedDict()
+
+    def _buffer(self, pair: str, rows: int, width: int) -> np.ndarray:
+        entry = self._pairs.get(pair)
+        if entry is not None and entry[1].shape[0] >= rows and entry[1].shape[1] == width:
+            return entry[1]
+        if entry is not None:
+            self._nbytes -= entry[1].nbytes
+        # Grow with headroom so a sliding live window never reallocates
+        buffer = np.empty((max(rows + rows // 4, 64), width), dtype=np.float64)
+        self.allocations += 1
+        self._nbytes += buffer.nbytes
+        return buffer
+
+    def matrix(self, dataframe: DataFrame, pair: str) -> Tuple[np.ndarray, List[str]]:
+        """
+        Read-only feature matrix for this frame and the feature names present.
+        Built at most once per (pair, candle window).
+        """
+        names = [c for c in self.columns if c in dataframe.columns]
+        window = frame_key(dataframe, pair, self.timeframe)
+        key = None if window is None else window + tuple(names)
+
+        entry = self._pairs.get(pair)
+        if key is not None and entry is not None and entry[0] == key:
+            self._pairs.move_to_end(pair)
+            self.hits += 1
+            return entry[2], entry[3]
+
+        rows = len(dataframe)
+        buffer = self._buffer(pair, rows, len(names))
+        view = fill_features(buffer[:rows], dataframe, names)
+        view = view.view()
+        view.flags.writeable = False
+        self.builds += 1
+
+        self._pairs[pair] = [key, buffer, view, names]
+        self._pairs.move_to_end(pair)
+        while len(self._pairs) > 1 and self._nbytes > self.maxbytes:
+            _, evicted = self._pairs.popitem(last=False)
+            self._nbytes -= evicted[1].nbytes
+        return view, names
+
+    def release(self, pair: Optional[str] = None) -> None:
+        """
+        Drop the buffer of one pair, or of all pairs.
+        """
+        for p in ([pair] if pair is not None else list(self._pairs)):
+            entry = self._pairs.pop(p, None)
+            if entry is not None:
+                self._nbytes -= entry[1].nbytes
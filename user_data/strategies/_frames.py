@@ -0,0 +1,82 @@
+"""
+Copy-free candle frames for the populate_* methods.
+
+populate_* used to start with `dataframe.copy()` so the candles could not be
+changed by accident, copying the whole frame three times per pair and
+candle. They now work on the frame they are given and only append columns.
+CandleGuard checks that contract instead of paying for it: it records the
+candle columns' arrays and checksums before a populate_* call, and raises
+if the call replaced a column with different values or wrote into one.
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+# Columns freqtrade hands in; strategies only read them
+CANDLE_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+
+class CandleColumnError(ValueError):
+    """
+    A populate_* method modified a candle column.
+    """
+
+
+def _column(dataframe: DataFrame, column: str) -> np.ndarray:
+    # The column's backing array. pandas' internal accessor skips building a
+    # Series (dataframe[column].values costs 4-10x more, for six columns twice
+    # per populate_* call); a pandas without it gets the public .values, which
+    # is the same backing array (tz-aware dates as their datetime64 values)
+    try:
+        values = dataframe._get_column_array(dataframe.columns.get_loc(column))
+    except AttributeError:
+        return dataframe[column].values
+    # tz-aware dates are a DatetimeArray around a datetime64 ndarray
+    values = getattr(values, '_ndarray', values)
+    return values if isinstance(values, np.ndarray) else dataframe[column].values
+
+
+def _checksum(values: np.ndarray) -> int:
+    # Wrapping sum of the raw bits: changes with any single written value
+    values = np.ascontiguousarray(values)
+    word = np.uint64 if values.dtype.itemsize == 8 else np.uint8
+    return int(values.view(word).sum(dtype=np.uint64))
+
+
+class CandleGuard:
+    """
+    The candle columns of a frame (their arrays, not copies) and their
+    checksums, to verify a populate_* result against.
+    """
+
+    def __init__(self, dataframe: DataFrame):
+        self.columns: Dict[str, Tuple[np.ndarray, int]] = {}
+        for column in CANDLE_COLUMNS:
+            if column in dataframe.columns:
+                values = _column(dataframe, column)
+                self.columns[column] = (values, _checksum(values))
+
+    def check(self, dataframe: DataFrame, method: str) -> DataFrame:
+        """
+        Return `dataframe`, or raise CandleColumnError if `method` changed
+        (or dropped) a candle column. Columns pandas merely moved into
+        another block are compared by value.
+        """
+        changed = []
+        for column, (before, checksum) in self.columns.items():
+            if column not in dataframe.columns:
+                changed.append(column)
+                continue
+            after = _column(dataframe, column)
+            if after is before or (after.__array_interface__['data'] == before.__array_interface__['data']
+                                   and after.shape == before.shape and after.strides == before.strides):
+                if _checksum(after) != checksum:
+                    changed.append(column)
+            elif len(before) != len(after) or before.dtype != after.dtype or not np.array_equal(
+                    before, after, equal_nan=before.dtype.kind == 'f'):
+                changed.append(column)
+        if changed:
+            raise CandleColumnError(f"{method} modified candle column(s) {', '.join(changed)}; "
+                                    "populate_* may only add columns")
+        return dataframe
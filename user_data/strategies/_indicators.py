@@ -0,0 +1,185 @@
+"""
+Shared indicator registry for the futures strategies.
+
+Indicators are declared by name and parameters and computed at most once per
+(pair, timeframe, candle window, name, params) key. Results live in a
+process-wide bounded LRU cache, so strategies analysing the same candles
+(backtesting with --strategy-list, several strategies in one bot) reuse each
+other's work instead of calling talib again.
+"""
+import inspect
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import talib.abstract as ta
+from pandas import DataFrame
+
+
+INDICATORS: Dict[str, Callable] = {}
+
+
+def register(name: str):
+    """
+    Register an indicator function under `name`.
+    The function receives the dataframe plus keyword parameters and returns
+    a numpy array, or a tuple of arrays for multi-output indicators.
+    """
+    def decorator(func: Callable) -> Callable:
+        INDICATORS[name] = func
+        return func
+    return decorator
+
+
+@register('ema')
+def ema(df: DataFrame, timeperiod: int = 30, source: str = 'close') -> np.ndarray:
+    return ta.EMA(df[source].values, timeperiod=timeperiod)
+
+
+@register('sma')
+def sma(df: DataFrame, timeperiod: int = 30, source: str = 'close') -> np.ndarray:
+    return ta.SMA(df[source].values, timeperiod=timeperiod)
+
+
+@register('ewm')
+def ewm(df: DataFrame, span: int = 20, source: str = 'close') -> np.ndarray:
+    # pandas flavour of the EMA (seeded with the first value instead of an SMA)
+    return pd.Series(df[source].values).ewm(span=span, adjust=False).mean().values
+
+
+@register('rsi')
+def rsi(df: DataFrame, timeperiod: int = 14, source: str = 'close') -> np.ndarray:
+    return ta.RSI(df[source].values, timeperiod=timeperiod)
+
+
+@register('macd')
+def macd(df: DataFrame, fastperiod: int = 12, slowperiod: int = 26,
+         signalperiod: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return ta.MACD(df['close'].values, fastperiod=fastperiod, slowperiod=slowperiod,
+                   signalperiod=signalperiod)
+
+
+@register('bbands')
+def bbands(df: DataFrame, timeperiod: Optional[int] = None, nbdevup: Optional[float] = None,
+           nbdevdn: Optional[float] = None, matype: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (upper, middle, lower). Unset parameters keep the talib defaults, which
+    # differ between TA-Lib releases (timeperiod 5 vs 20).
+    params = {'timeperiod': timeperiod, 'nbdevup': nbdevup, 'nbdevdn': nbdevdn, 'matype': matype}
+    return ta.BBANDS(df['close'].values, **{k: v for k, v in params.items() if v is not None})
+
+
+@register('atr')
+def atr(df: DataFrame, timeperiod: int = 14) -> np.ndarray:
+    return ta.ATR(df['high'].values, df['low'].values, df['close'].values, timeperiod=timeperiod)
+
+
+@register('sar')
+def sar(df: DataFrame, acceleration: float = 0.02, maximum: float = 0.2) -> np.ndarray:
+    return ta.SAR(df['high'].values, df['low'].values, acceleration=acceleration, maximum=maximum)
+
+
+def _params_key(name: str, params: dict) -> tuple:
+    """
+    Normalise params against the indicator signature so that
+    ('ema', {'timeperiod': 9}) and ('ema', {'timeperiod': 9, 'source': 'close'})
+    share a cache entry.
+    """
+    if name not in INDICATORS:
+        raise KeyError(f"Unknown indicator '{name}'")
+    bound = inspect.signature(INDICATORS[name]).bind(None, **params)
+    bound.apply_defaults()
+    return (name,) + tuple(sorted((k, v) for k, v in bound.arguments.items() if k != 'df'))
+
+
+def frame_key(dataframe: DataFrame, pair: str, timeframe: str) -> Optional[tuple]:
+    """
+    Identify a candle window. The first timestamp and the row count are part
+    of the key as well as the last timestamp, since talib seeds EMA/RSI from
+    the start of the window and different startup lengths give different values.
+    Frames without a `date` column are not cached.
+    """
+    if 'date' not in dataframe.columns or dataframe.empty:
+        return None
+    dates = dataframe['date']
+    return (pair, timeframe, len(dataframe), dates.iloc[0], dates.iloc[-1])
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, tuple):
+        return sum(v.nbytes for v in value)
+    return value.nbytes
+
+
+def _freeze(value):
+    # Cached arrays are shared between strategies - nobody may write into them
+    values = value if isinstance(value, tuple) else (value,)
+    frozen = []
+    for v in values:
+        v = np.asarray(v, dtype=np.float64)
+        v.flags.writeable = False
+        frozen.append(v)
+    return tuple(frozen) if isinstance(value, tuple) else frozen[0]
+
+
+class IndicatorCache:
+    """
+    Bounded LRU cache of computed indicator series.
+    Bounded both by entry count and by total array bytes, so backtests over
+    long frames cannot grow it past the container memory limit.
+    """
+
+    def __init__(self, maxsize: int = 512, maxbytes: int = 256 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self._nbytes = 0
+        self._entries: 'OrderedDict[tuple, object]' = OrderedDict()
+
+    def __getstate__(self) -> dict:
+        # hyperopt pickles strategies (and the globals of their modules) to
+        # every worker - send the limits, not the cached arrays
+        return {'maxsize': self.maxsize, 'maxbytes': self.maxbytes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def compute(self, dataframe: DataFrame, pair: str, timeframe: str, name: str, params: dict):
+        """
+        Return indicator `name` for the given frame, computing it on a cache miss.
+        """
+        params_key = _params_key(name, params)
+        window = frame_key(dataframe, pair, timeframe)
+        if window is None:
+            self.misses += 1
+            return _freeze(INDICATORS[name](dataframe, **params))
+
+        key = window + params_key
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = _freeze(INDICATORS[name](dataframe, **params))
+        self._entries[key] = value
+        self._nbytes += _nbytes(value)
+        while self._entries and (len(self._entries) > self.maxsize or self._nbytes > self.maxbytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._nbytes -= _nbytes(evicted)
+        return value
+
+
+# Process-wide cache shared by every strategy instance
+indicator_cache = IndicatorCache()
@@ -0,0 +1,138 @@
+"""
+Leader-pair features (BTC/ETH, other timeframes) joined onto every pair.
+
+A strategy declares `informative_indicators` as
+{(pair, timeframe): {column: (indicator name, params) or candle column}}.
+The leader's candles are fetched once per DataProvider and candle window,
+its indicators come from the shared indicator cache, and the as-of join
+onto a pair's candles is a binary search over the dates. Joined columns
+are cached by (leader window, pair window): pairs analysed on the same
+candle dates - every pair of a whitelist, every candle - get the same
+read-only arrays, so the leader's cost is paid once, not once per pair.
+
+The join follows freqtrade's merge_informative_pair: a leader candle is
+visible from the pair candle that closes when it closes, so a 1h candle
+opening at 14:00 reaches 5m candles from 14:55 on (no look-ahead).
+"""
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+from freqtrade.enums import RunMode
+from freqtrade.exchange import timeframe_to_seconds
+from pandas import DataFrame
+
+from _indicators import _params_key, frame_key, indicator_cache
+
+
+def _dates(dataframe: DataFrame) -> np.ndarray:
+    return dataframe['date'].values.astype('datetime64[ns]').astype(np.int64)
+
+
+def _spec_key(columns: Dict) -> tuple:
+    return tuple(sorted((column, spec if isinstance(spec, str) else _params_key(*spec))
+                        for column, spec in columns.items()))
+
+
+class InformativeCache:
+    """
+    Leader frames, leader features and joined columns, bounded LRU.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._joined: 'OrderedDict[tuple, Dict[str, np.ndarray]]' = OrderedDict()
+        # Backtesting data does not change under a DataProvider: fetch (and
+        # copy) each leader once per provider instead of once per pair
+        self._frames: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+    def __getstate__(self) -> dict:
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def clear(self) -> None:
+        self._joined.clear()
+        self._frames = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def leader_frame(self, dp, pair: str, timeframe: str) -> DataFrame:
+        """
+        The leader's candles: the exchange's frame itself in live/dry-run
+        (no copy), the provider's history once per provider otherwise.
+        """
+        if dp.runmode in (RunMode.LIVE, RunMode.DRY_RUN):
+            return dp.ohlcv(pair, timeframe, copy=False)
+        frames = self._frames.setdefault(dp, {})
+        frame = frames.get((pair, timeframe))
+        if frame is None:
+            frame = frames[(pair, timeframe)] = dp.get_pair_dataframe(pair, timeframe)
+        return frame
+
+    def join(self, dataframe: DataFrame, timeframe: str, leader: DataFrame, leader_pair: str,
+             leader_timeframe: str, columns: Dict) -> Dict[str, np.ndarray]:
+        """
+        `columns` of the leader as-of joined onto `dataframe`'s candles
+        (NaN before the leader's first visible candle). Read-only arrays.
+        """
+        window = frame_key(dataframe, '', timeframe)
+        leader_window = frame_key(leader, leader_pair, leader_timeframe) if len(leader) else None
+        key = None
+        if window is not None and leader_window is not None:
+            key = (window[1:], leader_window, _spec_key(columns))
+            joined = self._joined.get(key)
+            if joined is not None:
+                self._joined.move_to_end(key)
+                self.hits += 1
+                return joined
+        self.misses += 1
+
+        n = len(dataframe)
+        if leader_window is None or window is None:
+            joined = {column: np.full(n, np.nan) for column in columns}
+        else:
+            visible = _dates(leader) + (timeframe_to_seconds(leader_timeframe) - timeframe_to_seconds(timeframe)) * 10 ** 9
+            positions = np.searchsorted(visible, _dates(dataframe), side='right') - 1
+            missing = positions < 0
+            positions[missing] = 0
+            joined = {}
+            for column, spec in columns.items():
+                if isinstance(spec, str):
+                    values = leader[spec].to_numpy(dtype=np.float64)
+                else:
+                    values = indicator_cache.compute(leader, leader_pair, leader_timeframe, spec[0], spec[1])
+                out = values[positions]
+                out[missing] = np.nan
+                joined[column] = out
+        for values in joined.values():
+            values.flags.writeable = False
+        if key is not None:
+            self._joined[key] = joined
+            while len(self._joined) > self.maxsize:
+                self._joined.popitem(last=False)
+        return joined
+
+
+# Process-wide cache shared by every strategy instance
+informative_cache = InformativeCache()
+
+
+def add_informative(dataframe: DataFrame, timeframe: str, dp, informative: Dict,
+                    cache: Optional[InformativeCache] = None) -> DataFrame:
+    """
+    Add every column of `informative` ({(pair, timeframe): {column: spec}})
+    to the dataframe.
+    """
+    cache = cache or informative_cache
+    for (leader_pair, leader_timeframe), columns in informative.items():
+        leader = cache.leader_frame(dp, leader_pair, leader_timeframe)
+        for column, values in cache.join(dataframe, timeframe, leader, leader_pair, leader_timeframe,
+                                         columns).items():
+            dataframe[column] = values
+    return dataframe
+
@@ -0,0 +1,160 @@
+"""
+Vectorised NumPy kernels for the indicators the strategies build by hand.
+
+Each kernel takes float64 arrays with time on the first axis and allocates
+its output once. The slicing kernels (shift, diff, pct_change, true_range)
+and the rolling windows also work down the columns of (time x pairs)
+panels. Each matches a reference:
+
+  shift / diff / pct_change    pandas Series.shift / diff / pct_change
+                               (NaN-filled lags, no np.roll wraparound)
+  rolling_mean / rolling_std   pandas rolling(window).mean() / .std()
+  ewm_mean                     pandas ewm(span, adjust=False).mean()
+  true_range                   talib TRANGE, with row 0 = high - low
+  atr / sar                    talib ATR / SAR
+
+ATR and SAR are recursive: the kernels call talib's plain functions on the
+raw arrays, skipping the abstract API's per-call dispatch, since no NumPy
+formulation beats talib's C loop there. kernel_parity.py checks the parity
+and times every kernel against the code path it replaced.
+"""
+import bottleneck as bn
+import numpy as np
+import talib
+from scipy.signal import lfilter
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """
+    values[t - periods], NaN where t - periods is out of range.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty(values.shape)
+    if periods == 0:
+        out[:] = values
+    elif abs(periods) >= len(values):
+        out[:] = np.nan
+    elif periods > 0:
+        out[:periods] = np.nan
+        out[periods:] = values[:-periods]
+    else:
+        out[periods:] = np.nan
+        out[:periods] = values[-periods:]
+    return out
+
+
+def diff(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """
+    values[t] - values[t - periods] (periods > 0), NaN for the first rows.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if periods < len(values):
+        np.subtract(values[periods:], values[:-periods], out=out[periods:])
+    return out
+
+
+def pct_change(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """
+    values[t] / values[t - periods] - 1 (periods > 0), NaN for the first
+    rows - also the lagged momentum close / close[t - n] - 1.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if periods < len(values):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(values[periods:], values[:-periods], out=out[periods:])
+        out[periods:] -= 1.0
+    return out
+
+
+def _flat(values: np.ndarray, window: int) -> np.ndarray:
+    # Windows without a change between consecutive rows (NaN counts as one)
+    flat = np.zeros(values.shape, dtype=bool)
+    if window == 1:
+        np.logical_not(np.isnan(values), out=flat)
+    elif len(values) > 1:
+        changed = np.not_equal(values[1:], values[:-1]).astype(np.float64)
+        flat[1:] = bn.move_sum(changed, window - 1, axis=0) == 0
+    return flat
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    pandas rolling(window).mean(): NaN until `window` valid rows. Constant
+    windows give their value exactly (running sums would leave residue).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = bn.move_mean(values, window, axis=0)
+    flat = _flat(values, window)
+    out[flat] = values[flat]
+    return out
+
+
+def rolling_std(values: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """
+    pandas rolling(window).std(ddof): NaN until `window` valid rows, and 0
+    - not rounding residue - for constant windows.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = bn.move_std(values, window, axis=0, ddof=ddof)
+    out[_flat(values, window)] = 0.0
+    return out
+
+
+def recursive(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """
+    y[t] = alpha * x[t] + (1 - alpha) * y[t-1] down the first axis, seeded
+    at row period-1 with the mean of the first `period` rows (talib's EMA
+    and Wilder seeding; period 1 seeds with the first value). NaN before it.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan, order='F' if values.flags.f_contiguous else 'C')
+    if len(values) < period:
+        return out
+    seed = values[:period].mean(axis=0)
+    out[period - 1] = seed
+    if len(values) > period:
+        out[period:] = lfilter([alpha], [1.0, alpha - 1.0], values[period:], axis=0,
+                               zi=((1.0 - alpha) * seed)[None, ...])[0]
+    return out
+
+
+def ewm_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """
+    pandas ewm(span=span, adjust=False).mean() of NaN-free values.
+    """
+    return recursive(values, 1, 2.0 / (span + 1))
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """
+    max(high - low, |high - previous close|, |low - previous close|); row 0,
+    without a previous close, is high - low.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    out = np.subtract(high, low)
+    gap = np.empty(out[1:].shape)
+    np.abs(np.subtract(high[1:], close[:-1], out=gap), out=gap)
+    np.maximum(out[1:], gap, out=out[1:])
+    np.abs(np.subtract(low[1:], close[:-1], out=gap), out=gap)
+    np.maximum(out[1:], gap, out=out[1:])
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    talib ATR (Wilder average of the true range from row 1).
+    """
+    return talib.ATR(np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64),
+                     np.asarray(close, dtype=np.float64), timeperiod=period)
+
+
+def sar(high: np.ndarray, low: np.ndarray, acceleration: float = 0.02, maximum: float = 0.2) -> np.ndarray:
+    """
+    talib parabolic SAR.
+    """
+    return talib.SAR(np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64),
+                     acceleration=acceleration, maximum=maximum)
@@ -0,0 +1,412 @@
+"""
+On-disk model artifacts for the ML strategies.
+
+Each artifact is a joblib file holding the fitted model, its StandardScaler
+and the feature names, keyed by pair, timeframe, feature-list hash and
+training window. A JSON manifest next to it records the artifact's sha256,
+format version and sklearn version; artifacts failing those checks are
+ignored on load.
+
+`ModelRegistry` keeps one model per pair (optionally per regime) in memory,
+lazily loaded from the store and evicted least-recently-used once the
+resident size exceeds a byte budget.
+
+`BackgroundTrainer` fits and stores models in a worker process; finished
+models are swapped into the registry on the next `poll`, so retraining
+never blocks candle processing.
+
+`walk_forward_cache` keeps the backtest walk-forward predictions per pair and
+candle window for the whole process, so hyperopt epochs reuse them.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+
+
+def feature_hash(feature_names: List[str]) -> str:
+    return hashlib.sha256(','.join(feature_names).encode()).hexdigest()[:16]
+
+
+def _pair_slug(pair: str) -> str:
+    return pair.replace('/', '_').replace(':', '_')
+
+
+def _stamp(date) -> str:
+    return date.strftime('%Y%m%d%H%M')
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelStore:
+    """
+    Versioned model artifacts in `path`:
+    <pair>-<timeframe>-<feature hash>-<train start>-<train end>.joblib (+ .json manifest)
+    Each save keeps the newest `keep` artifacts per pair, timeframe and
+    feature list (all of them when `keep` is 0).
+    """
+
+    def __init__(self, path: str, keep: int = 3):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.keep = keep
+
+    def _prefix(self, pair: str, timeframe: str, features: str) -> str:
+        return f'{_pair_slug(pair)}-{timeframe}-{features}'
+
+    def save(self, pair: str, timeframe: str, model, scaler, feature_names: List[str],
+             train_start: datetime, train_end: datetime, **extra) -> dict:
+        """
+        Write an artifact atomically (temp file + rename), prune the older
+        ones and return its manifest.
+        """
+        features = feature_hash(feature_names)
+        name = f'{self._prefix(pair, timeframe, features)}-{_stamp(train_start)}-{_stamp(train_end)}'
+        artifact_path = self.path / f'{name}.joblib'
+        manifest_path = self.path / f'{name}.json'
+
+        artifact = {
+            'model': model,
+            'scaler': scaler,
+            'feature_names': list(feature_names),
+        }
+        tmp_path = artifact_path.with_suffix('.joblib.tmp')
+        joblib.dump(artifact, tmp_path)
+        manifest = {
+            'version': ARTIFACT_VERSION,
+            'sklearn_version': sklearn.__version__,
+            'pair': pair,
+            'timeframe': timeframe,
+            'feature_hash': features,
+            'feature_names': list(feature_names),
+            'train_start': train_start.isoformat(),
+            'train_end': train_end.isoformat(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'sha256': _sha256(tmp_path),
+            **extra,
+        }
+        os.replace(tmp_path, artifact_path)
+        manifest_tmp = manifest_path.with_suffix('.json.tmp')
+        manifest_tmp.write_text(json.dumps(manifest, indent=2))
+        os.replace(manifest_tmp, manifest_path)
+        manifest['path'] = str(artifact_path)
+        self.prune(pair, timeframe, feature_names, saved=artifact_path)
+        return manifest
+
+    def prune(self, pair: str, timeframe: str, feature_names: List[str],
+              saved: Optional[Path] = None) -> int:
+        """
+        Delete all but the newest `keep` artifacts of this pair/timeframe/
+        feature list, never `saved`. Returns the number deleted.
+        """
+        if self.keep <= 0:
+            return 0
+        removed = 0
+        for manifest in self.manifests(pair, timeframe, feature_names)[self.keep:]:
+            path = Path(manifest['path'])
+            if saved is not None and path == saved:
+                continue
+            try:
+                path.unlink(missing_ok=True)
+                path.with_suffix('.json').unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f'Could not remove model {path.name}: {e}')
+                continue
+            removed += 1
+        return removed
+
+    def manifests(self, pair: str, timeframe: str, feature_names: List[str]) -> List[dict]:
+        """
+        Manifests for this pair/timeframe/feature list, newest training window first.
+        """
+        prefix = self._prefix(pair, timeframe, feature_hash(feature_names))
+        found = []
+        for manifest_path in self.path.glob(f'{prefix}-*.json'):
+            try:
+                manifest = json.loads(manifest_path.read_text())
+            except (OSError, ValueError):
+                continue
+            manifest['path'] = str(manifest_path.with_suffix('.joblib'))
+            found.append(manifest)
+        return sorted(found, key=lambda m: m.get('train_end', ''), reverse=True)
+
+    def load_latest(self, pair: str, timeframe: str, feature_names: List[str],
+                    not_before: Optional[datetime] = None) -> Optional[dict]:
+        """
+        Load the newest artifact that passes the integrity checks, or None.
+        Artifacts trained on a window ending before `not_before` are skipped.
+        """
+        for manifest in self.manifests(pair, timeframe, feature_names):
+            if not_before is not None and datetime.fromisoformat(manifest['train_end']) < not_before:
+                break
+            artifact = self._load(manifest, feature_names)
+            if artifact is not None:
+                return artifact
+        return None
+
+    def _load(self, manifest: dict, feature_names: List[str]) -> Optional[dict]:
+        path = Path(manifest['path'])
+        if manifest.get('version') != ARTIFACT_VERSION:
+            logger.info(f'Skipping model {path.name}: artifact version {manifest.get("version")}')
+            return None
+        if manifest.get('sklearn_version') != sklearn.__version__:
+            logger.info(f'Skipping model {path.name}: trained with sklearn {manifest.get("sklearn_version")}')
+            return None
+        if not path.is_file() or _sha256(path) != manifest.get('sha256'):
+            logger.warning(f'Skipping model {path.name}: checksum mismatch')
+            return None
+        try:
+            artifact = joblib.load(path)
+        except Exception as e:
+            logger.warning(f'Skipping model {path.name}: {e}')
+            return None
+        if artifact.get('feature_names') != list(feature_names):
+            logger.warning(f'Skipping model {path.name}: feature names differ')
+            return None
+        artifact['manifest'] = manifest
+        return artifact
+
+
+def fit_model(features: np.ndarray, labels: np.ndarray, model_params: dict) -> dict:
+    """
+    Fit a StandardScaler and RandomForestClassifier. Module level so it can
+    run in a worker process.
+    """
+    scaler = StandardScaler()
+    model = RandomForestClassifier(**model_params)
+    model.fit(scaler.fit_transform(features), labels)
+    return {'model': model, 'scaler': scaler}
+
+
+def fit_and_store(store_path: str, store_key: str, timeframe: str, features: np.ndarray,
+                  labels: np.ndarray, feature_names: List[str], train_start: datetime,
+                  train_end: datetime, model_params: dict, keep: int = 3) -> dict:
+    """
+    Worker entry point: fit, write the artifact and return it with its manifest.
+    """
+    artifact = fit_model(features, labels, model_params)
+    artifact['feature_names'] = list(feature_names)
+    artifact['manifest'] = ModelStore(store_path, keep=keep).save(
+        store_key, timeframe, artifact['model'], artifact['scaler'], feature_names,
+        train_start, train_end, rows=len(features))
+    return artifact
+
+
+def feature_drift(features: np.ndarray, scaler: StandardScaler) -> float:
+    """
+    Mean absolute z-score of the recent feature means against the training
+    distribution held by the fitted scaler.
+    """
+    if len(features) == 0:
+        return 0.0
+    z = (features.mean(axis=0) - scaler.mean_) / np.where(scaler.scale_ > 0, scaler.scale_, 1.0)
+    return float(np.nanmean(np.abs(z)))
+
+
+def artifact_nbytes(artifact: dict) -> int:
+    """
+    Resident size of a loaded artifact. Tree ensembles are measured from
+    their node/value arrays; anything else by its pickled size.
+    """
+    model = artifact['model']
+    trees = getattr(model, 'estimators_', None)
+    if trees is None:
+        return len(pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL))
+    total = 0
+    for tree in trees:
+        state = tree.tree_.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+    scaler = artifact.get('scaler')
+    for attr in ('mean_', 'scale_', 'var_'):
+        total += getattr(getattr(scaler, attr, None), 'nbytes', 0)
+    return total
+
+
+class ModelRegistry:
+    """
+    In-memory models keyed by (pair, regime), lazily loaded from a ModelStore
+    and evicted least-recently-used when the total resident size exceeds
+    `max_bytes`. The most recently used model is never evicted.
+    """
+
+    def __init__(self, store: ModelStore, timeframe: str, max_bytes: int):
+        self.store = store
+        self.timeframe = timeframe
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self._models: 'OrderedDict[Tuple[str, Optional[str]], dict]' = OrderedDict()
+
+    @staticmethod
+    def store_key(pair: str, regime: Optional[str] = None) -> str:
+        return pair if regime is None else f'{pair}@{regime}'
+
+    def __contains__(self, key: Tuple[str, Optional[str]]) -> bool:
+        return key in self._models
+
+    def get(self, pair: str, feature_names: List[str], not_before: Optional[datetime] = None,
+            regime: Optional[str] = None) -> Optional[dict]:
+        """
+        Return the model for pair/regime, loading the newest valid artifact
+        from disk if it is not resident. None if there is none.
+        """
+        key = (pair, regime)
+        artifact = self._models.get(key)
+        if artifact is not None:
+            self._models.move_to_end(key)
+            return artifact
+        artifact = self.store.load_latest(self.store_key(pair, regime), self.timeframe,
+                                          feature_names, not_before=not_before)
+        if artifact is not None:
+            self.put(pair, artifact, regime=regime)
+        return artifact
+
+    def put(self, pair: str, artifact: dict, regime: Optional[str] = None) -> None:
+        key = (pair, regime)
+        if key in self._models:
+            self.total_bytes -= self._models.pop(key)['nbytes']
+        artifact['nbytes'] = artifact_nbytes(artifact)
+        self._models[key] = artifact
+        self.total_bytes += artifact['nbytes']
+        while self.total_bytes > self.max_bytes and len(self._models) > 1:
+            evicted_key, evicted = self._models.popitem(last=False)
+            self.total_bytes -= evicted['nbytes']
+            self.evictions += 1
+            logger.info(f'Evicted model {self.store_key(*evicted_key)} ({evicted["nbytes"] / 1e6:.1f} MB)')
+
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Resident bytes per model, least recently used first.
+        """
+        return {self.store_key(*key): artifact['nbytes'] for key, artifact in self._models.items()}
+
+
+class BackgroundTrainer:
+    """
+    Retrains models in a worker process. `submit` queues a fit for a
+    pair/regime (ignored while one is already running); `poll` swaps every
+    finished model into the registry. The registry is only touched from the
+    caller's thread, so a model is replaced in a single assignment.
+    """
+
+    def __init__(self, registry: ModelRegistry, max_workers: int = 1):
+        self.registry = registry
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[Tuple[str, Optional[str]], Future] = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the bot runs websocket, API server and OpenMP
+            # threads, and a forked child can deadlock on a lock one of them
+            # held. The worker inherits sys.path, which keeps the strategy
+            # directory (see _base), so this module unpickles there
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def is_training(self, pair: str, regime: Optional[str] = None) -> bool:
+        return (pair, regime) in self._pending
+
+    def submit(self, pair: str, features: np.ndarray, labels: np.ndarray, feature_names: List[str],
+               train_start: datetime, train_end: datetime, model_params: dict,
+               regime: Optional[str] = None) -> bool:
+        key = (pair, regime)
+        if key in self._pending:
+            return False
+        self._pending[key] = self._pool().submit(
+            fit_and_store, str(self.registry.store.path), self.registry.store_key(pair, regime),
+            self.registry.timeframe, features, labels, feature_names, train_start, train_end,
+            model_params, self.registry.store.keep)
+        return True
+
+    def poll(self) -> List[Tuple[str, Optional[str]]]:
+        """
+        Publish finished models. Returns the keys that were swapped in.
+        """
+        published = []
+        for key, future in list(self._pending.items()):
+            if not future.done():
+                continue
+            del self._pending[key]
+            try:
+                artifact = future.result()
+            except Exception as e:
+                logger.warning(f'Background training for {self.registry.store_key(*key)} failed: {e}')
+                continue
+            self.registry.put(key[0], artifact, regime=key[1])
+            published.append(key)
+        return published
+
+    def shutdown(self, wait: bool = False) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        self._pending.clear()
+
+
+class WalkForwardCache:
+    """
+    Bounded LRU of walk-forward (confidence, signal) arrays per strategy,
+    pair and candle window. The arrays are read-only; callers share them.
+    """
+
+    def __init__(self, maxsize: int = 64, maxbytes: int = 128 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._nbytes = 0
+        self._entries: 'OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]]' = OrderedDict()
+
+    def __reduce__(self) -> str:
+        # hyperopt sends every epoch a fresh copy of the strategy: pickle as
+        # a reference to the receiving process's own cache, which outlives it
+        return 'walk_forward_cache'
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, confidence: np.ndarray, signal: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        confidence.flags.writeable = False
+        signal.flags.writeable = False
+        if key in self._entries:
+            self._nbytes -= sum(v.nbytes for v in self._entries.pop(key))
+        self._entries[key] = (confidence, signal)
+        self._nbytes += confidence.nbytes + signal.nbytes
+        while self._entries and (len(self._entries) > self.maxsize or self._nbytes > self.maxbytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._nbytes -= sum(v.nbytes for v in evicted)
+        return confidence, signal
+
+
+# Process-wide cache shared by every strategy instance
+walk_forward_cache = WalkForwardCache()
@@ -0,0 +1,309 @@
+"""
+Panel indicator backend: the indicators of a whole whitelist at once.
+
+freqtrade analyses one DataFrame per pair, so identical EMA/RSI/ATR
+pipelines run once per pair and candle - and on live-sized windows the
+pandas column lookups and talib's abstract-API dispatch around each call
+cost several times the indicator itself. With the panel backend the
+candles of every whitelisted pair are stacked once per candle into
+(time x pairs) arrays, column j holding pair j's candles from row 0
+(NaN-padded after its last), and each declared indicator is computed for
+all pairs in one pass over the columns with talib's plain functions. The
+arrays are Fortran-ordered, so a pair's column is contiguous: talib reads
+it in place and the pair's dataframe gets it as a zero-copy view.
+
+A panel is built by the first pair analysed on a candle and cached by the
+identity of the DataProvider's frames (they are replaced, not modified,
+when a candle arrives); the other pairs only read their columns. Only the
+candle columns some indicator uses are stacked. Indicators without a
+panel kernel run per pair through the _indicators registry.
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import talib
+from freqtrade.exceptions import OperationalException
+from pandas import DataFrame, Series
+
+from _indicators import INDICATORS, _params_key
+from _informative import informative_cache
+from _kernels import ewm_mean
+
+# Kernels taking a panel plus the parameters of the registry indicator of the
+# same name, returning (time x pairs) arrays (a tuple for multi-output ones)
+PANEL_KERNELS: Dict[str, Callable] = {}
+
+
+def register_panel(name: str):
+    """
+    Register the panel kernel of registry indicator `name`.
+    """
+    def decorator(func: Callable) -> Callable:
+        PANEL_KERNELS[name] = func
+        return func
+    return decorator
+
+
+def _dates(frame: DataFrame) -> np.ndarray:
+    return frame['date'].values.astype('datetime64[ns]').astype(np.int64)
+
+
+def whitelist(dp, config: dict, pair: str) -> List[str]:
+    """
+    The pairs a panel covers: the bot's current whitelist (the config
+    whitelist without pairlists, e.g. offline), always including `pair`.
+    """
+    try:
+        pairs = list(dp.current_whitelist())
+    except OperationalException:
+        pairs = list(config.get('exchange', {}).get('pair_whitelist', []))
+    return pairs if pair in pairs else pairs + [pair]
+
+
+def same_frames(frames: Dict[str, DataFrame], other: Dict[str, DataFrame]) -> bool:
+    return frames.keys() == other.keys() and all(frame is other[pair] for pair, frame in frames.items())
+
+
+class Panel:
+    """
+    The candles of a whitelist as (time x pairs) Fortran arrays, stacked
+    per candle column on first use. Empty frames are left out.
+    """
+
+    def __init__(self, frames: Dict[str, DataFrame]):
+        # Kept alive so the identity check can't match a recycled id
+        self.frames = frames
+        self.pairs = [pair for pair, frame in frames.items() if len(frame)]
+        self.index = {pair: j for j, pair in enumerate(self.pairs)}
+        self.lengths = [len(frames[pair]) for pair in self.pairs]
+        self.rows = max(self.lengths, default=0)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._dates: Optional[List[np.ndarray]] = None
+
+    @property
+    def dates(self) -> List[np.ndarray]:
+        """
+        Each pair's candle dates (int64 ns).
+        """
+        if self._dates is None:
+            self._dates = [_dates(self.frames[pair]) for pair in self.pairs]
+        return self._dates
+
+    def empty(self) -> np.ndarray:
+        return np.full((self.rows, len(self.pairs)), np.nan, order='F')
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        values = self._columns.get(column)
+        if values is None:
+            values = self.empty()
+            for j, (pair, length) in enumerate(zip(self.pairs, self.lengths)):
+                values[:length, j] = self.frames[pair][column].to_numpy(dtype=np.float64)
+            values.flags.writeable = False
+            self._columns[column] = values
+        return values
+
+    def by_column(self, func: Callable, columns: Tuple[str, ...], outputs: int = 1, **params):
+        """
+        func(*pair's candle columns, **params) for every pair, written into
+        (time x pairs) arrays - a tuple of `outputs` of them when above 1.
+        """
+        inputs = [self[column] for column in columns]
+        out = tuple(self.empty() for _ in range(outputs))
+        for j, length in enumerate(self.lengths):
+            values = func(*(x[:length, j] for x in inputs), **params)
+            for target, column_values in zip(out, values if outputs > 1 else (values,)):
+                target[:length, j] = column_values
+        return out if outputs > 1 else out[0]
+
+
+@register_panel('ema')
+def panel_ema(panel: Panel, timeperiod: int = 30, source: str = 'close') -> np.ndarray:
+    return panel.by_column(talib.EMA, (source,), timeperiod=timeperiod)
+
+
+@register_panel('sma')
+def panel_sma(panel: Panel, timeperiod: int = 30, source: str = 'close') -> np.ndarray:
+    return panel.by_column(talib.SMA, (source,), timeperiod=timeperiod)
+
+
+@register_panel('ewm')
+def panel_ewm(panel: Panel, span: int = 20, source: str = 'close') -> np.ndarray:
+    # pandas ewm(adjust=False), seeded with the first value: one recursion
+    # down all columns (a pair's trailing padding stays NaN)
+    return ewm_mean(panel[source], span)
+
+
+@register_panel('rsi')
+def panel_rsi(panel: Panel, timeperiod: int = 14, source: str = 'close') -> np.ndarray:
+    return panel.by_column(talib.RSI, (source,), timeperiod=timeperiod)
+
+
+@register_panel('macd')
+def panel_macd(panel: Panel, fastperiod: int = 12, slowperiod: int = 26,
+               signalperiod: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return panel.by_column(talib.MACD, ('close',), outputs=3, fastperiod=fastperiod,
+                           slowperiod=slowperiod, signalperiod=signalperiod)
+
+
+@register_panel('bbands')
+def panel_bbands(panel: Panel, timeperiod: Optional[int] = None, nbdevup: Optional[float] = None,
+                 nbdevdn: Optional[float] = None,
+                 matype: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    params = {'timeperiod': timeperiod, 'nbdevup': nbdevup, 'nbdevdn': nbdevdn, 'matype': matype}
+    return panel.by_column(talib.BBANDS, ('close',), outputs=3,
+                           **{k: v for k, v in params.items() if v is not None})
+
+
+@register_panel('atr')
+def panel_atr(panel: Panel, timeperiod: int = 14) -> np.ndarray:
+    return panel.by_column(talib.ATR, ('high', 'low', 'close'), timeperiod=timeperiod)
+
+
+@register_panel('sar')
+def panel_sar(panel: Panel, acceleration: float = 0.02, maximum: float = 0.2) -> np.ndarray:
+    return panel.by_column(talib.SAR, ('high', 'low'), acceleration=acceleration, maximum=maximum)
+
+
+def _per_frame(panel: Panel, name: str, params: dict):
+    """
+    Registry indicator `name` run on each pair's dataframe in turn.
+    """
+    out = None
+    for j, (pair, length) in enumerate(zip(panel.pairs, panel.lengths)):
+        values = INDICATORS[name](panel.frames[pair], **params)
+        values = tuple(values) if isinstance(values, (tuple, list)) else (values,)
+        if out is None:
+            out = tuple(panel.empty() for _ in values)
+        for target, column_values in zip(out, values):
+            target[:length, j] = column_values
+    return out
+
+
+class IndicatorPanel(Panel):
+    """
+    A whitelist's candles plus the indicators computed on them so far.
+    """
+
+    def __init__(self, frames: Dict[str, DataFrame]):
+        super().__init__(frames)
+        self._results: Dict[tuple, Tuple[np.ndarray, ...]] = {}
+        # (name, params as given) -> normalised key, sparing inspect per pair
+        self._keys: Dict[tuple, tuple] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self._columns.values()) + \
+            sum(values.nbytes for result in self._results.values() for values in result)
+
+    def compute(self, name: str, params: dict) -> Tuple[np.ndarray, ...]:
+        """
+        Indicator `name` for every pair, as a tuple of (time x pairs) arrays
+        (one per output). Computed on the first call.
+        """
+        given = (name, tuple(sorted(params.items())))
+        key = self._keys.get(given)
+        if key is None:
+            key = self._keys[given] = _params_key(name, params)
+        result = self._results.get(key)
+        if result is None:
+            if name in PANEL_KERNELS:
+                result = PANEL_KERNELS[name](self, **params)
+            else:
+                result = _per_frame(self, name, params)
+            result = result if isinstance(result, tuple) else (result,)
+            for values in result:
+                values.flags.writeable = False
+            self._results[key] = result
+        return result
+
+    def lines_up(self, pair: str, dataframe: DataFrame) -> bool:
+        """
+        Whether `dataframe` holds the pair's candle window in the panel (the
+        same candles, so the same indicator seeding).
+        """
+        j = self.index.get(pair)
+        if j is None or len(dataframe) != self.lengths[j]:
+            return False
+        frame = self.frames[pair]
+        if dataframe is frame:
+            return True
+        dates, panel_dates = dataframe['date'].values, frame['date'].values
+        return dates[0] == panel_dates[0] and dates[-1] == panel_dates[-1]
+
+    def columns(self, pair: str, indicators: Dict, index) -> Dict[str, Series]:
+        """
+        {column: pair's values} for `indicators` ({column or (columns...):
+        (indicator name, params)}), as Series on `index` over read-only
+        views into the panel: assign new columns rather than writing into
+        these.
+        """
+        j = self.index[pair]
+        length = self.lengths[j]
+        out = {}
+        for columns, (name, params) in indicators.items():
+            result = self.compute(name, params)
+            for column, values in zip(columns if isinstance(columns, tuple) else (columns,), result):
+                out[column] = Series(values[:length, j], index=index, copy=False)
+        return out
+
+
+class PanelService:
+    """
+    The latest indicator panel per (timeframe, whitelist), rebuilt when the
+    DataProvider's frames change; bounded LRU by count and bytes.
+    """
+
+    def __init__(self, maxsize: int = 4, maxbytes: int = 512 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self._panels: 'OrderedDict[tuple, IndicatorPanel]' = OrderedDict()
+
+    def __getstate__(self) -> dict:
+        return {'maxsize': self.maxsize, 'maxbytes': self.maxbytes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def clear(self) -> None:
+        self._panels.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def panel(self, dp, pairs: List[str], timeframe: str) -> IndicatorPanel:
+        """
+        The panel of `pairs` on their current candles, stacked on the first
+        call per candle.
+        """
+        frames = {pair: informative_cache.leader_frame(dp, pair, timeframe) for pair in pairs}
+        key = (timeframe, tuple(pairs))
+        panel = self._panels.get(key)
+        if panel is not None and same_frames(panel.frames, frames):
+            self.hits += 1
+        else:
+            self.misses += 1
+            panel = self._panels[key] = IndicatorPanel(frames)
+        self._panels.move_to_end(key)
+        return panel
+
+    def columns(self, dataframe: DataFrame, pair: str, dp, pairs: List[str], timeframe: str,
+                indicators: Dict) -> Optional[Dict[str, Series]]:
+        """
+        The `indicators` columns of `pair` for `dataframe`, or None when the
+        frame is not the pair's window in the panel (compute it per pair then).
+        """
+        panel = self.panel(dp, pairs, timeframe)
+        if not panel.lines_up(pair, dataframe):
+            return None
+        columns = panel.columns(pair, indicators, dataframe.index)
+        # Evict once the new results are counted, never the panel just used
+        while len(self._panels) > 1 and (len(self._panels) > self.maxsize or
+                                         sum(p.nbytes for p in self._panels.values()) > self.maxbytes):
+            self._panels.popitem(last=False)
+        return columns
+
+
+# Process-wide service shared by every strategy instance
+panel_service = PanelService()
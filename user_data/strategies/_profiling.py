@@ -0,0 +1,183 @@
+"""
+Per-pair, per-method profiling of strategy calls for running bots.
+
+MethodProfiler records, for every (pair, method), a wall time histogram
+with Prometheus' cumulative buckets, the call count and the exceptions
+raised - including ones a strategy catches and carries on from, which it
+reports with record_exception(). The snapshot is written every `interval`
+seconds (and at exit) as a Prometheus textfile-collector file and as JSON,
+each replaced atomically so a scraper never reads half a file.
+
+Profiling is opt-in: BaseFuturesStrategy only creates a profiler when
+enabled, and otherwise pays one attribute check per populate_* call.
+"""
+import atexit
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Upper bounds (seconds) of the wall time histogram buckets; +Inf is implied
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC = 'freqtrade_strategy_method'
+
+
+class MethodStats:
+    """
+    Call count, time sum and histogram of one (pair, method).
+    """
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        # Per-bucket (not cumulative) counts, the last one for +Inf
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds: float) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-quantile, capped at the
+        slowest call.
+        """
+        rank, seen = q * self.calls, 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+
+class MethodProfiler:
+    """
+    Profiles the calls of one strategy and exports them to `directory`.
+    """
+
+    def __init__(self, strategy: str, directory: Path, interval: float = 60.0):
+        self.strategy = strategy
+        self.directory = Path(directory)
+        self.interval = interval
+        self.stats: Dict[Tuple[str, str], MethodStats] = {}
+        # (pair, method, exception type, swallowed) -> count
+        self.exceptions: Counter = Counter()
+        self.last_errors: Dict[Tuple[str, str], str] = {}
+        self.started = datetime.now(timezone.utc)
+        self._written = time.monotonic()
+        atexit.register(self.write)
+
+    @property
+    def prometheus_path(self) -> Path:
+        return self.directory / f'strategy_profile_{self.strategy}.prom'
+
+    @property
+    def json_path(self) -> Path:
+        return self.directory / f'strategy_profile_{self.strategy}.json'
+
+    def call(self, pair: str, method: str, func: Callable, /, *args, **kwargs):
+        """
+        Call func(*args, **kwargs), recording its wall time and any
+        exception it raises (which propagates).
+        """
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            self.record_exception(pair, method, e, swallowed=False)
+            raise
+        finally:
+            now = time.perf_counter()
+            stats = self.stats.get((pair, method))
+            if stats is None:
+                stats = self.stats[(pair, method)] = MethodStats()
+            stats.add(now - start)
+            if time.monotonic() - self._written >= self.interval:
+                self.write()
+
+    def wrap(self, method: str, func: Callable) -> Callable:
+        """
+        `func` (a bound callback taking pair= or trade=) profiled under
+        `method`.
+        """
+        def profiled(*args, **kwargs):
+            pair = kwargs.get('pair') or getattr(kwargs.get('trade'), 'pair', None) or ''
+            return self.call(pair, method, func, *args, **kwargs)
+        profiled.__wrapped__ = func
+        return profiled
+
+    def record_exception(self, pair: str, method: str, error: BaseException, swallowed: bool = True) -> None:
+        """
+        Count an exception of `method`; `swallowed` ones were caught by
+        the strategy, which carried on.
+        """
+        self.exceptions[(pair, method, type(error).__name__, swallowed)] += 1
+        self.last_errors[(pair, method)] = f'{type(error).__name__}: {error}'
+
+    def snapshot(self) -> dict:
+        methods = []
+        for (pair, method), stats in sorted(self.stats.items()):
+            methods.append({
+                'pair': pair, 'method': method, 'calls': stats.calls,
+                'seconds': round(stats.seconds, 6), 'max_seconds': round(stats.max_seconds, 6),
+                'p50_seconds': stats.quantile(0.5), 'p95_seconds': stats.quantile(0.95),
+                'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], stats.buckets)),
+            })
+        exceptions = [{'pair': pair, 'method': method, 'exception': name, 'swallowed': swallowed,
+                       'count': count, 'last': self.last_errors.get((pair, method))}
+                      for (pair, method, name, swallowed), count in sorted(self.exceptions.items())]
+        return {
+            'strategy': self.strategy,
+            'started': self.started.isoformat(),
+            'updated': datetime.now(timezone.utc).isoformat(),
+            'methods': methods,
+            'exceptions': exceptions,
+        }
+
+    def prometheus(self) -> str:
+        lines: List[str] = [
+            f'# HELP {METRIC}_seconds Wall time of strategy method calls.',
+            f'# TYPE {METRIC}_seconds histogram',
+        ]
+        for (pair, method), stats in sorted(self.stats.items()):
+            labels = f'strategy="{self.strategy}",pair="{pair}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip([repr(b) for b in BUCKETS] + ['+Inf'], stats.buckets):
+                cumulative += count
+                lines.append(f'{METRIC}_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC}_seconds_sum{{{labels}}} {stats.seconds:.9f}')
+            lines.append(f'{METRIC}_seconds_count{{{labels}}} {stats.calls}')
+        lines += [
+            f'# HELP {METRIC}_exceptions_total Exceptions raised in strategy methods.',
+            f'# TYPE {METRIC}_exceptions_total counter',
+        ]
+        for (pair, method, name, swallowed), count in sorted(self.exceptions.items()):
+            lines.append(f'{METRIC}_exceptions_total{{strategy="{self.strategy}",pair="{pair}",'
+                         f'method="{method}",exception="{name}",swallowed="{str(swallowed).lower()}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self) -> None:
+        """
+        Replace the Prometheus and JSON exports with the current snapshot.
+        """
+        self._written = time.monotonic()
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for path, text in ((self.prometheus_path, self.prometheus()),
+                               (self.json_path, json.dumps(self.snapshot(), indent=2))):
+                tmp = path.with_name(path.name + '.tmp')
+                tmp.write_text(text)
+                os.replace(tmp, path)
+        except OSError:
+            # Profiling must never take the bot down
+            pass
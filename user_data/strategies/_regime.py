@@ -0,0 +1,187 @@
+"""
+Whitelist-wide market regime on a (time x pairs) matrix.
+
+The closes, highs and lows of every whitelisted pair are stacked into 2D
+arrays (see _panel), each pair's candles from row 0, and the regime inputs
+are computed for all pairs at once: EMAs and ATR with talib over each
+pair's contiguous column, the returns and rolling windows down the time
+axis of the whole matrix (see _kernels).
+A panel is computed once per candle and cached (by the identity of the
+DataProvider's frames, see _panel), so every pair analysed on that candle
+- and every leverage() call until the next one - reads its column instead
+of recomputing it.
+
+Per pair and candle:
+
+  trend_strength    |EMA(fast) - EMA(slow)| / close
+  volatility        rolling std of close-to-close returns
+  volatility_mean   rolling mean of volatility
+  natr              ATR / close (a fraction, like add_risk_columns)
+  regime            TRENDING if trend_strength > trend_threshold, else
+                    VOLATILE if volatility > volatile_ratio x its mean,
+                    else RANGING
+
+Rows are a pair's own candles, so pairs listed later (shorter history)
+line up with the rest without any date alignment.
+"""
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import talib
+from freqtrade.exchange import timeframe_to_seconds
+from pandas import DataFrame
+
+from _informative import informative_cache
+from _kernels import pct_change, rolling_mean, rolling_std
+from _panel import Panel, _dates, same_frames
+
+RANGING, VOLATILE, TRENDING = 0, 1, 2
+COLUMNS = ('trend_strength', 'volatility', 'volatility_mean', 'natr', 'regime')
+DEFAULT_PARAMS = {
+    'trend_fast': 9,
+    'trend_slow': 21,
+    'trend_threshold': 0.005,
+    'volatility_window': 20,
+    'volatility_mean_window': 50,
+    'volatile_ratio': 1.1,
+    'natr_period': 14,
+}
+
+
+def regime_columns(panel: Panel, params: Dict) -> Dict[str, np.ndarray]:
+    """
+    The regime columns of every pair of the panel, (time x pairs).
+    """
+    p = dict(DEFAULT_PARAMS, **params)
+    close = panel['close']
+    fast = panel.by_column(talib.EMA, ('close',), timeperiod=p['trend_fast'])
+    slow = panel.by_column(talib.EMA, ('close',), timeperiod=p['trend_slow'])
+    trend_strength = np.abs(fast - slow) / close
+    volatility = rolling_std(pct_change(close), p['volatility_window'])
+    volatility_mean = rolling_mean(volatility, p['volatility_mean_window'])
+    natr = panel.by_column(talib.ATR, ('high', 'low', 'close'), timeperiod=p['natr_period']) / close
+    with np.errstate(invalid='ignore'):
+        regime = np.where(trend_strength > p['trend_threshold'], TRENDING,
+                          np.where(volatility > volatility_mean * p['volatile_ratio'], VOLATILE, RANGING))
+    return {'trend_strength': trend_strength, 'volatility': volatility, 'volatility_mean': volatility_mean,
+            'natr': natr, 'regime': regime.astype(np.float64)}
+
+
+class RegimePanel(Panel):
+    """
+    Regime columns of a whitelist, (time x pairs): column j holds pair j's
+    candles from row 0 (NaN-padded after its last), `dates[j]` their dates.
+    """
+
+    def __init__(self, frames: Dict[str, DataFrame], timeframe: str, params: Dict):
+        super().__init__(frames)
+        self.step = timeframe_to_seconds(timeframe) * 10 ** 9
+        self.columns = regime_columns(self, params)
+        for values in self.columns.values():
+            values.flags.writeable = False
+
+    def column(self, pair: str, name: str, dates: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Column `name` of `pair` at `dates` - a view when they are a
+        contiguous run of the pair's candles. None if the pair is not in it.
+        """
+        j = self.index.get(pair)
+        if j is None:
+            return None
+        pair_dates = self.dates[j]
+        values = self.columns[name][:len(pair_dates), j]
+        start = int(np.searchsorted(pair_dates, dates[0])) if len(dates) else 0
+        stop = start + len(dates)
+        if stop <= len(pair_dates) and len(dates) and pair_dates[start] == dates[0] \
+                and pair_dates[stop - 1] == dates[-1]:
+            return values[start:stop]
+        rows = np.minimum(np.searchsorted(pair_dates, dates), len(pair_dates) - 1)
+        return np.where(pair_dates[rows] == dates, values[rows], np.nan)
+
+    def at(self, pair: str, current_time: datetime) -> Optional[Dict[str, float]]:
+        """
+        The regime columns of the last candle closed at `current_time`
+        (what get_analyzed_dataframe's last row holds), or None.
+        """
+        j = self.index.get(pair)
+        if j is None:
+            return None
+        moment = int(current_time.timestamp() * 10 ** 9) - self.step
+        row = int(np.searchsorted(self.dates[j], moment, side='right')) - 1
+        if row < 0:
+            return None
+        return {name: float(values[row, j]) for name, values in self.columns.items()}
+
+
+class RegimeService:
+    """
+    The latest regime panel per (timeframe, params, whitelist), rebuilt when
+    the DataProvider's frames change, bounded LRU; the latest panel per
+    DataProvider and timeframe serves leverage() lookups.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._panels: 'OrderedDict[tuple, RegimePanel]' = OrderedDict()
+        self._latest: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+    def __getstate__(self) -> dict:
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def clear(self) -> None:
+        self._panels.clear()
+        self._latest = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def panel(self, dp, pairs: List[str], timeframe: str, params: Dict) -> RegimePanel:
+        """
+        The panel of `pairs` on their current candles, computed on the
+        first call per candle window.
+        """
+        frames = {pair: informative_cache.leader_frame(dp, pair, timeframe) for pair in pairs}
+        key = (timeframe, tuple(sorted(params.items())), tuple(pairs))
+        panel = self._panels.get(key)
+        if panel is not None and same_frames(panel.frames, frames):
+            self.hits += 1
+        else:
+            self.misses += 1
+            panel = self._panels[key] = RegimePanel(frames, timeframe, params)
+        self._panels.move_to_end(key)
+        while len(self._panels) > self.maxsize:
+            self._panels.popitem(last=False)
+        self._latest.setdefault(dp, {})[timeframe] = panel
+        return panel
+
+    def columns(self, dataframe: DataFrame, pair: str, dp, pairs: List[str], timeframe: str,
+                params: Dict) -> Dict[str, np.ndarray]:
+        """
+        The regime columns of `pair` aligned with `dataframe`.
+        """
+        panel = self.panel(dp, pairs, timeframe, params)
+        dates = _dates(dataframe)
+        out = {}
+        for name in COLUMNS:
+            values = panel.column(pair, name, dates)
+            out[name] = np.full(len(dataframe), np.nan) if values is None else values
+        return out
+
+    def at(self, dp, pair: str, timeframe: str, current_time: datetime) -> Optional[Dict[str, float]]:
+        """
+        `pair`'s regime columns of the last closed candle, from the latest
+        panel computed for this DataProvider; None before the first.
+        """
+        panel = self._latest.get(dp, {}).get(timeframe)
+        return None if panel is None else panel.at(pair, current_time)
+
+
+# Process-wide service shared by every strategy instance
+regime_service = RegimeService()
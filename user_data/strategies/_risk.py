@@ -0,0 +1,111 @@
+"""
+Isolated-margin liquidation and risk columns, precomputed for leverage().
+
+Liquidation follows freqtrade's isolated-margin formula (the one it uses in
+dry-run and backtesting), including its `liquidation_buffer`:
+
+    long:  (open - open / leverage) / (1 - (maintenance ratio + taker fee))
+    short: (open + open / leverage) / (1 + (maintenance ratio + taker fee))
+
+Every function broadcasts, so a (candles x candidate leverage) grid - or a
+(pairs x candles x leverage) one - is a single array expression. The
+strategy adds the columns once per analyzed frame, and leverage() only
+reads the last row.
+"""
+from typing import Dict, Sequence
+
+import numpy as np
+from pandas import DataFrame
+
+# Leverage levels the risk grid evaluates
+LEVERAGE_LEVELS = (1, 2, 3, 5, 10, 15, 20, 25, 30, 40, 50, 75, 100)
+# OKX tier-1 maintenance margin ratios of the USDT swaps traded here; the
+# first tier covers positions far larger than these stakes
+MAINTENANCE_RATIO: Dict[str, float] = {
+    'BTC/USDT:USDT': 0.004,
+    'ETH/USDT:USDT': 0.004,
+}
+DEFAULT_MAINTENANCE_RATIO = 0.01
+# OKX taker fee, used when the config has no `fee`
+DEFAULT_TAKER_FEE = 0.0005
+# freqtrade's default `liquidation_buffer`
+DEFAULT_LIQUIDATION_BUFFER = 0.05
+
+
+def maintenance_ratio(pair: str) -> float:
+    return MAINTENANCE_RATIO.get(pair, DEFAULT_MAINTENANCE_RATIO)
+
+
+def liquidation_price(open_rate, leverage, mm_ratio: float, taker_fee: float,
+                      is_short: bool = False, buffer: float = 0.0):
+    """
+    Liquidation price of an isolated position opened at `open_rate`, moved
+    towards the open by `buffer` of the distance as freqtrade does.
+    """
+    open_rate = np.asarray(open_rate, dtype=np.float64)
+    leverage = np.asarray(leverage, dtype=np.float64)
+    value = open_rate / leverage
+    mm_ratio_taker = mm_ratio + taker_fee
+    if is_short:
+        liquidation = (open_rate + value) / (1 + mm_ratio_taker)
+    else:
+        liquidation = (open_rate - value) / (1 - mm_ratio_taker)
+    return liquidation + (open_rate - liquidation) * buffer
+
+
+def liquidation_distance(leverage, mm_ratio: float, taker_fee: float,
+                         is_short: bool = False, buffer: float = 0.0):
+    """
+    Adverse price move, as a fraction of the open, that liquidates a
+    position (independent of the price itself).
+    """
+    return np.abs(1 - liquidation_price(1.0, leverage, mm_ratio, taker_fee, is_short, buffer))
+
+
+def maintenance_margin(stake, leverage, mm_ratio: float):
+    """
+    Maintenance margin of a position with `stake` collateral.
+    """
+    return np.asarray(stake, dtype=np.float64) * np.asarray(leverage, dtype=np.float64) * mm_ratio
+
+
+def max_safe_leverage(adverse_move, levels: Sequence[float], mm_ratio: float, taker_fee: float,
+                      is_short: bool = False, buffer: float = 0.0) -> np.ndarray:
+    """
+    Highest of `levels` whose liquidation lies beyond `adverse_move` (an
+    array of fractions of the price); the lowest level where none does.
+    """
+    levels = np.sort(np.asarray(levels, dtype=np.float64))
+    distance = liquidation_distance(levels, mm_ratio, taker_fee, is_short, buffer)
+    adverse = np.asarray(adverse_move, dtype=np.float64)
+    # distance falls with leverage: count the levels that stay out of reach
+    safe = (distance >= np.nan_to_num(adverse, nan=np.inf)[..., None]).sum(axis=-1)
+    return levels[np.maximum(safe - 1, 0)]
+
+
+def risk_columns(dataframe: DataFrame, pair: str, natr: np.ndarray, atr_multiple: float,
+                 taker_fee: float, buffer: float, levels: Sequence[float] = LEVERAGE_LEVELS,
+                 liquidation_levels: Sequence[float] = ()) -> Dict[str, np.ndarray]:
+    """
+    Per-candle risk columns of one pair, entering at the candle's close:
+
+      risk_max_leverage      highest level keeping liquidation (long) beyond
+                             `atr_multiple` x natr
+      risk_liq_distance      liquidation distance at that leverage
+      liq_price_<L>x         liquidation price of a long at each of
+                             `liquidation_levels`
+    """
+    mm_ratio = maintenance_ratio(pair)
+    close = dataframe['close'].to_numpy(dtype=np.float64)
+    best = max_safe_leverage(atr_multiple * np.asarray(natr, dtype=np.float64), levels, mm_ratio, taker_fee,
+                             buffer=buffer)
+    columns = {
+        'risk_max_leverage': best,
+        'risk_liq_distance': liquidation_distance(best, mm_ratio, taker_fee, buffer=buffer),
+    }
+    if len(liquidation_levels):
+        prices = liquidation_price(close[:, None], np.asarray(liquidation_levels)[None, :], mm_ratio, taker_fee,
+                                   buffer=buffer)
+        for j, level in enumerate(liquidation_levels):
+            columns[f'liq_price_{level:g}x'] = prices[:, j]
+    return columns
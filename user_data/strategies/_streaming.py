@@ -0,0 +1,448 @@
+"""
+Streaming (incremental) indicator state for live 1m trading.
+
+Each indicator keeps the recursive state talib would carry between rows
+(EMA value, Wilder averages, rolling sums, SAR trend/extreme point) so one
+appended candle costs O(1) instead of recomputing the whole startup window.
+`StreamingIndicators` keeps that state per pair and falls back to a full
+recompute on restart, on a data gap or when the frame does not line up with
+the previous call.
+
+`parity_report` replays a frame candle by candle and compares the streaming
+output with the batch registry (talib) output.
+"""
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+import talib.abstract as ta
+from freqtrade.exchange import timeframe_to_seconds
+from pandas import DataFrame
+
+from _indicators import INDICATORS
+
+
+def _talib_defaults(function: str) -> dict:
+    # A fresh Function object - the module level ones keep state between calls
+    return dict(ta.Function(function).parameters)
+
+
+class _EMA:
+    """
+    talib EMA: seeded with the SMA of the first `period` values.
+    With seed_first=True behaves like pandas ewm(span, adjust=False).
+    """
+
+    def __init__(self, period: int, seed_first: bool = False):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.seed_first = seed_first
+        self.value = np.nan
+        self._seed: List[float] = []
+
+    def update(self, x: float) -> float:
+        if not np.isnan(self.value):
+            self.value += self.k * (x - self.value)
+        elif self.seed_first:
+            self.value = x
+        elif not np.isnan(x):
+            self._seed.append(x)
+            if len(self._seed) == self.period:
+                self.value = sum(self._seed) / self.period
+                self._seed = []
+        return self.value
+
+
+class _Rolling:
+    """
+    Rolling window with running sum and sum of squares.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: deque = deque(maxlen=period)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, x: float) -> None:
+        if len(self.window) == self.period:
+            old = self.window[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.window.append(x)
+        self.total += x
+        self.total_sq += x * x
+
+    @property
+    def full(self) -> bool:
+        return len(self.window) == self.period
+
+    def mean(self) -> float:
+        return self.total / self.period if self.full else np.nan
+
+    def std(self, ddof: int = 0) -> float:
+        if not self.full:
+            return np.nan
+        mean = self.total / self.period
+        var = (self.total_sq - self.period * mean * mean) / (self.period - ddof)
+        return float(np.sqrt(var)) if var > 0 else 0.0
+
+
+class StreamingState:
+    """
+    Base class: `update` takes one candle (open/high/low/close/volume dict)
+    and returns the indicator value(s) for it.
+    """
+
+    def update(self, candle: dict):
+        raise NotImplementedError
+
+
+class EMAState(StreamingState):
+
+    def __init__(self, timeperiod: int = 30, source: str = 'close'):
+        self.source = source
+        self.ema = _EMA(timeperiod)
+
+    def update(self, candle: dict) -> float:
+        return self.ema.update(candle[self.source])
+
+
+class EWMState(StreamingState):
+
+    def __init__(self, span: int = 20, source: str = 'close'):
+        self.source = source
+        self.ema = _EMA(span, seed_first=True)
+
+    def update(self, candle: dict) -> float:
+        return self.ema.update(candle[self.source])
+
+
+class SMAState(StreamingState):
+
+    def __init__(self, timeperiod: int = 30, source: str = 'close'):
+        self.source = source
+        self.window = _Rolling(timeperiod)
+
+    def update(self, candle: dict) -> float:
+        self.window.update(candle[self.source])
+        return self.window.mean()
+
+
+class RSIState(StreamingState):
+    """
+    Wilder RSI: average gain/loss seeded with the mean of the first
+    `timeperiod` changes, then smoothed with alpha = 1 / timeperiod.
+    """
+
+    def __init__(self, timeperiod: int = 14, source: str = 'close'):
+        self.period = timeperiod
+        self.source = source
+        self.prev = np.nan
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, candle: dict) -> float:
+        x = candle[self.source]
+        prev, self.prev = self.prev, x
+        if np.isnan(prev):
+            return np.nan
+        change = x - prev
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        self.count += 1
+        if self.count <= self.period:
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return np.nan
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        total = self.avg_gain + self.avg_loss
+        return 100.0 * self.avg_gain / total if total != 0 else 0.0
+
+
+class MACDState(StreamingState):
+    """
+    talib MACD: the fast EMA is seeded on the `fastperiod` closes ending where
+    the slow EMA is seeded, the signal EMA is seeded on the first
+    `signalperiod` MACD values.
+    """
+
+    def __init__(self, fastperiod: int = 12, slowperiod: int = 26, signalperiod: int = 9):
+        self.fast = _EMA(fastperiod)
+        self.slow = _EMA(slowperiod)
+        self.signal = _EMA(signalperiod)
+        self.skip = slowperiod - fastperiod
+        self.count = 0
+
+    def update(self, candle: dict) -> tuple:
+        self.count += 1
+        slow = self.slow.update(candle['close'])
+        fast = self.fast.update(candle['close']) if self.count > self.skip else np.nan
+        if np.isnan(slow) or np.isnan(fast):
+            return np.nan, np.nan, np.nan
+        macd = fast - slow
+        signal = self.signal.update(macd)
+        if np.isnan(signal):
+            return np.nan, np.nan, np.nan
+        return macd, signal, macd - signal
+
+
+class BBandsState(StreamingState):
+
+    def __init__(self, timeperiod: Optional[int] = None, nbdevup: Optional[float] = None,
+                 nbdevdn: Optional[float] = None, matype: Optional[int] = None):
+        defaults = _talib_defaults('BBANDS')
+        if (matype if matype is not None else defaults['matype']) != 0:
+            raise ValueError('Streaming BBANDS only supports matype=0 (SMA)')
+        self.window = _Rolling(timeperiod if timeperiod is not None else defaults['timeperiod'])
+        self.nbdevup = nbdevup if nbdevup is not None else defaults['nbdevup']
+        self.nbdevdn = nbdevdn if nbdevdn is not None else defaults['nbdevdn']
+
+    def update(self, candle: dict) -> tuple:
+        self.window.update(candle['close'])
+        middle = self.window.mean()
+        std = self.window.std()
+        return middle + self.nbdevup * std, middle, middle - self.nbdevdn * std
+
+
+class ATRState(StreamingState):
+    """
+    talib ATR: SMA of the first `timeperiod` true ranges (from the second
+    candle on), then Wilder smoothing.
+    """
+
+    def __init__(self, timeperiod: int = 14):
+        self.period = timeperiod
+        self.prev_close = np.nan
+        self.count = 0
+        self.value = 0.0
+
+    def update(self, candle: dict) -> float:
+        high, low, close = candle['high'], candle['low'], candle['close']
+        prev_close, self.prev_close = self.prev_close, close
+        if np.isnan(prev_close):
+            return np.nan
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        self.count += 1
+        if self.count <= self.period:
+            self.value += tr / self.period
+            return self.value if self.count == self.period else np.nan
+        self.value = (self.value * (self.period - 1) + tr) / self.period
+        return self.value
+
+
+class SARState(StreamingState):
+    """
+    talib parabolic SAR. The initial direction comes from the -DM of the
+    first two candles; afterwards the state is trend direction, SAR,
+    extreme point and acceleration factor.
+    """
+
+    def __init__(self, acceleration: float = 0.02, maximum: float = 0.2):
+        self.acceleration = acceleration
+        self.maximum = maximum
+        self.af = min(acceleration, maximum)
+        self.first = None
+        self.is_long = True
+        self.sar = np.nan
+        self.ep = np.nan
+        self.high = np.nan
+        self.low = np.nan
+
+    def _start(self, high: float, low: float) -> None:
+        first_high, first_low = self.first
+        up_move = high - first_high
+        down_move = first_low - low
+        minus_dm = down_move if down_move > 0 and up_move < down_move else 0.0
+        self.is_long = minus_dm <= 0
+        if self.is_long:
+            self.ep, self.sar = high, first_low
+        else:
+            self.ep, self.sar = low, first_high
+        self.high, self.low = high, low
+
+    def update(self, candle: dict) -> float:
+        high, low = candle['high'], candle['low']
+        if self.first is None:
+            self.first = (high, low)
+            return np.nan
+        if np.isnan(self.sar):
+            self._start(high, low)
+        prev_high, prev_low = self.high, self.low
+        self.high, self.low = high, low
+
+        if self.is_long:
+            if low <= self.sar:
+                self.is_long = False
+                sar = max(self.ep, prev_high, high)
+                self.af = self.acceleration
+                self.ep = low
+                self.sar = max(sar + self.af * (self.ep - sar), prev_high, high)
+                return sar
+            sar = self.sar
+            if high > self.ep:
+                self.ep = high
+                self.af = min(self.af + self.acceleration, self.maximum)
+            self.sar = min(sar + self.af * (self.ep - sar), prev_low, low)
+            return sar
+
+        if high >= self.sar:
+            self.is_long = True
+            sar = min(self.ep, prev_low, low)
+            self.af = self.acceleration
+            self.ep = high
+            self.sar = min(sar + self.af * (self.ep - sar), prev_low, low)
+            return sar
+        sar = self.sar
+        if low < self.ep:
+            self.ep = low
+            self.af = min(self.af + self.acceleration, self.maximum)
+        self.sar = max(sar + self.af * (self.ep - sar), prev_high, high)
+        return sar
+
+
+STREAMING_STATES = {
+    'ema': EMAState,
+    'ewm': EWMState,
+    'sma': SMAState,
+    'rsi': RSIState,
+    'macd': MACDState,
+    'bbands': BBandsState,
+    'atr': ATRState,
+    'sar': SARState,
+}
+
+_CANDLE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class _PairState:
+
+    def __init__(self):
+        self.last_date = None
+        self.states: Dict = {}
+        self.outputs: Dict[str, np.ndarray] = {}
+
+
+class StreamingIndicators:
+    """
+    Per-pair streaming state for a set of indicator declarations
+    ({column or (columns...): (indicator name, params)}, as used by
+    BaseFuturesStrategy.indicators).
+    """
+
+    def __init__(self, specs: Dict, timeframe: str):
+        unsupported = [name for name, _ in specs.values() if name not in STREAMING_STATES]
+        if unsupported:
+            raise ValueError(f"No streaming implementation for: {', '.join(unsupported)}")
+        self.specs = specs
+        self.step = np.timedelta64(timeframe_to_seconds(timeframe), 's')
+        self.pairs: Dict[str, _PairState] = {}
+        self.full_recomputes = 0
+        self.incremental_updates = 0
+
+    def reset(self, pair: Optional[str] = None) -> None:
+        if pair is None:
+            self.pairs.clear()
+        else:
+            self.pairs.pop(pair, None)
+
+    def compute(self, dataframe: DataFrame, pair: str) -> Dict[str, np.ndarray]:
+        """
+        Return {column: values} aligned with the dataframe, updating the
+        pair state with the newest candle when possible.
+        """
+        state = self.pairs.get(pair)
+        dates = dataframe['date'].values
+        if state is not None and len(dates) >= 2:
+            if dates[-1] == state.last_date:
+                return self._align(state, len(dates))
+            if dates[-2] == state.last_date and dates[-1] - dates[-2] == self.step:
+                return self._append(state, dataframe)
+        return self._seed(dataframe, pair)
+
+    def _seed(self, dataframe: DataFrame, pair: str) -> Dict[str, np.ndarray]:
+        # Restart, gap or misaligned frame: replay the whole window
+        self.full_recomputes += 1
+        state = _PairState()
+        state.states = {columns: STREAMING_STATES[name](**params)
+                        for columns, (name, params) in self.specs.items()}
+        length = len(dataframe)
+        candles = {col: dataframe[col].values.astype(np.float64) for col in _CANDLE_COLUMNS}
+        for columns in self.specs:
+            for column in (columns if isinstance(columns, tuple) else (columns,)):
+                state.outputs[column] = np.full(length, np.nan)
+        for i in range(length):
+            candle = {col: candles[col][i] for col in _CANDLE_COLUMNS}
+            self._store(state, candle, i)
+        state.last_date = dataframe['date'].values[-1] if length else None
+        self.pairs[pair] = state
+        return dict(state.outputs)
+
+    def _append(self, state: _PairState, dataframe: DataFrame) -> Dict[str, np.ndarray]:
+        self.incremental_updates += 1
+        length = len(dataframe)
+        for column, values in self._align(state, length - 1).items():
+            out = np.empty(length)
+            out[:-1] = values
+            state.outputs[column] = out
+        row = dataframe.iloc[-1]
+        self._store(state, {col: float(row[col]) for col in _CANDLE_COLUMNS}, length - 1)
+        state.last_date = dataframe['date'].values[-1]
+        return dict(state.outputs)
+
+    def _store(self, state: _PairState, candle: dict, i: int) -> None:
+        for columns, indicator in state.states.items():
+            value = indicator.update(candle)
+            if isinstance(columns, tuple):
+                for column, column_value in zip(columns, value):
+                    state.outputs[column][i] = column_value
+            else:
+                state.outputs[columns][i] = value
+
+    @staticmethod
+    def _align(state: _PairState, length: int) -> Dict[str, np.ndarray]:
+        # Keep the newest `length` rows; pad with NaN if the frame grew
+        aligned = {}
+        for column, values in state.outputs.items():
+            if len(values) >= length:
+                aligned[column] = values[len(values) - length:]
+            else:
+                aligned[column] = np.concatenate([np.full(length - len(values), np.nan), values])
+        return aligned
+
+
+def parity_report(dataframe: DataFrame, specs: Dict, timeframe: str,
+                  seed_rows: int = 300, rtol: float = 1e-6, atol: float = 1e-8) -> Dict[str, dict]:
+    """
+    Seed the streaming state on the first `seed_rows` candles, append the
+    rest one at a time and compare every column with the batch registry
+    output over the same rows.
+    Returns {column: {'max_abs_diff', 'rows', 'ok'}}.
+    """
+    streaming = StreamingIndicators(specs, timeframe)
+    pair = 'parity'
+    streaming.compute(dataframe.iloc[:seed_rows], pair)
+    for end in range(seed_rows + 1, len(dataframe) + 1):
+        outputs = streaming.compute(dataframe.iloc[:end], pair)
+
+    report = {}
+    for columns, (name, params) in specs.items():
+        batch = INDICATORS[name](dataframe, **params)
+        if not isinstance(columns, tuple):
+            columns, batch = (columns,), (batch,)
+        for column, expected in zip(columns, batch):
+            actual = outputs[column]
+            valid = ~np.isnan(expected)
+            both = valid & ~np.isnan(actual)
+            diff = np.abs(actual[both] - expected[both])
+            report[column] = {
+                'max_abs_diff': float(diff.max()) if diff.size else 0.0,
+                'rows': int(both.sum()),
+                'ok': bool(np.array_equal(valid, ~np.isnan(actual))
+                           and np.allclose(actual[both], expected[both], rtol=rtol, atol=atol)),
+            }
+    return report